@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Compare the JSON codecs decoding an instance listing.
+
+The payload is a listing of instances as answered by GET /instance,
+either read from a file recorded from the API or generated. Each codec
+decodes the raw bytes of the answer, the `text` baseline decodes the
+string built by requests as the SDK did before.
+
+Usage: python benchmarks/codec.py [--count N] [--payload FILE]
+                                  [--repeat N] [--json]
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import timeit
+
+from runabove.codec import available_codecs, get_codec
+
+
+def make_payload(count):
+    """Generate the bytes of a listing of `count` instances."""
+    instances = []
+    for i in range(count):
+        instances.append({
+            'instanceId': '8c687d5d-a1c7-4670-aca8-%012d' % i,
+            'name': 'instance-%d' % i,
+            'ip': '192.168.%d.%d' % (i // 256 % 256, i % 256),
+            'flavorId': 'ab35df0e-4632-48b2-b6a5-c1f1d922bd43',
+            'imageId': '82a56d09-882d-48cc-82ce-eef59820879f',
+            'keyName': 'MyTestKey',
+            'status': 'ACTIVE',
+            'created': '2014-06-01T09:13:15Z',
+            'region': 'BHS-1'
+        })
+    return json.dumps(instances).encode('utf-8')
+
+
+def best_time(func, repeat):
+    """Get the best time of `repeat` runs of `func`, in seconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def run(payload, repeat=5):
+    """Time every codec on `payload`, returns a list of result dicts."""
+    stdlib = get_codec('json')
+    baseline = best_time(lambda: json.loads(payload.decode('utf-8')), repeat)
+    results = [{
+        'name': 'codec.text',
+        'payload_bytes': len(payload),
+        'decode_seconds': baseline,
+        'speedup': 1.0
+    }]
+    document = stdlib.decode(payload)
+    for name in available_codecs():
+        codec = get_codec(name)
+        decode = best_time(lambda: codec.decode(payload), repeat)
+        results.append({
+            'name': 'codec.%s' % name,
+            'payload_bytes': len(payload),
+            'decode_seconds': decode,
+            'encode_seconds': best_time(lambda: codec.encode(document),
+                                        repeat),
+            'speedup': round(baseline / decode, 2)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=10000,
+                        help='instances in the generated payload')
+    parser.add_argument('--payload', help='file of a recorded listing')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true',
+                        help='print results as JSON')
+    args = parser.parse_args()
+    if args.payload:
+        with open(args.payload, 'rb') as payload_file:
+            payload = payload_file.read()
+    else:
+        payload = make_payload(args.count)
+    results = run(payload, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('payload: %d bytes' % len(payload))
+    print('%-8s %12s %12s %8s' % ('codec', 'decode (ms)', 'encode (ms)',
+                                  'speedup'))
+    for result in results:
+        encode = result.get('encode_seconds')
+        print('%-8s %12.2f %12s %7.2fx' % (
+            result['name'].split('.', 1)[1],
+            result['decode_seconds'] * 1000,
+            '%.2f' % (encode * 1000) if encode is not None else '-',
+            result['speedup']))
+
+
+if __name__ == '__main__':
+    main()
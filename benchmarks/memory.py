@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Measure the memory used by resource objects.
+
+Compares the bytes used by each resource class of the SDK, which declare
+`__slots__`, with an equivalent class keeping its attributes in a
+per-instance dict as the SDK did before.
+
+Usage: python benchmarks/memory.py [--count N] [--json]
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import tracemalloc
+
+from runabove.flavor import Flavor
+from runabove.image import Image
+from runabove.instance import Instance
+from runabove.region import Region
+from runabove.ssh_key import SSHKey
+from runabove.storage import Container, ObjectStored
+
+REGION = Region(None, 'BHS-1')
+CONTAINER = Container(None, 'container', REGION)
+
+# Arguments used to build each resource, the manager is always None
+RESOURCES = [
+    (Instance, lambda i: (None, 'id-%d' % i, 'name-%d' % i, '10.0.0.1',
+                          REGION, 'flavor', 'image', 'key', 'ACTIVE',
+                          '2014-06-18T09:30:10Z')),
+    (Flavor, lambda i: (None, 'id-%d' % i, 200, 'ra.s', 2048, 1, 'ra.s',
+                        REGION)),
+    (Image, lambda i: (None, 'id-%d' % i, 'Debian', REGION, 'public')),
+    (SSHKey, lambda i: (None, 'key-%d' % i, 'fingerprint', 'ssh-rsa AAA',
+                        REGION)),
+    (Container, lambda i: (None, 'container-%d' % i, REGION)),
+    (ObjectStored, lambda i: (CONTAINER, 'object-%d' % i)),
+]
+
+
+def dict_based(cls):
+    """Build a class like `cls` but storing attributes in a dict."""
+    return type('Dict' + cls.__name__, (object,),
+                {'__init__': cls.__init__})
+
+
+def bytes_per_object(cls, make_args, count):
+    """Measure the average size of `count` objects of `cls`."""
+    args = [make_args(i) for i in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [cls(*arg) for arg in args]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return (after - before) / float(count)
+
+
+def run(count=100000):
+    """Measure every resource class, returns a list of result dicts."""
+    results = []
+    for cls, make_args in RESOURCES:
+        before = bytes_per_object(dict_based(cls), make_args, count)
+        after = bytes_per_object(cls, make_args, count)
+        results.append({
+            'name': 'memory.%s' % cls.__name__,
+            'count': count,
+            'bytes_per_object_dict': round(before, 1),
+            'bytes_per_object_slots': round(after, 1),
+            'saved_ratio': round(1 - after / before, 3)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--json', action='store_true',
+                        help='print results as JSON')
+    args = parser.parse_args()
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('%-14s %12s %12s %8s' % ('resource', 'dict (B)', 'slots (B)',
+                                   'saved'))
+    for result in results:
+        print('%-14s %12.1f %12.1f %7.0f%%' % (
+            result['name'].split('.', 1)[1],
+            result['bytes_per_object_dict'],
+            result['bytes_per_object_slots'],
+            result['saved_ratio'] * 100))
+
+
+if __name__ == '__main__':
+    main()
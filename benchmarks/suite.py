@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+"""Benchmark the hot paths of the SDK and track them over time.
+
+Each benchmark measures one path of the SDK without a RunAbove account:
+
+- signing: signing a query and a full `WrapperApi.raw_call`, over a
+  transport answering in memory and over the local stand-in of the API
+- mapping: `InstanceManager._dict_to_obj` on an instance listing
+- listing: `Container.list_objects` over a listing of many objects
+- token: `TokenManager._iso8601_to_datetime` parsing token dates
+- storage: upload and download throughput against the local stand-in
+
+Results are a JSON document with the environment they were measured in,
+so that runs can be stored and compared to catch regressions.
+
+Usage: python benchmarks/suite.py [--only NAME ...] [--quick]
+                                  [--repeat N] [--json] [--output FILE]
+                                  [--compare FILE] [--tolerance RATIO]
+"""
+
+from __future__ import print_function
+import argparse
+import datetime
+import io
+import json
+import platform
+import sys
+import time
+import timeit
+from collections import OrderedDict
+
+import runabove
+from runabove.local_server import LocalApiServer
+from runabove.storage import Container
+from runabove.token import TokenManager
+from runabove.transport import RecordedResponse, Transport
+from runabove.wrapper_api import WrapperApi
+
+# Sizes of the benchmarks, then of the quick runs
+SIZES = {
+    'calls': (20000, 2000),
+    'local_calls': (500, 50),
+    'instances': (10000, 1000),
+    'objects': (1000000, 100000),
+    'dates': (100000, 10000),
+    'storage_objects': (200, 20),
+    'object_size': (1024 * 1024, 64 * 1024),
+}
+
+
+class MemoryTransport(Transport):
+    """Transport answering every query at once with the same body."""
+
+    def __init__(self, content=b'[]'):
+        self.answer = RecordedResponse(200, {}, content, 0)
+        self.time = RecordedResponse(200, {}, str(int(time.time()))
+                                     .encode('utf-8'), 0)
+
+    def request(self, method, url, headers=None, data=None):
+        if url.endswith('/time'):
+            return self.time
+        return self.answer
+
+
+class ListingManager(object):
+    """Container manager answering `get_container` with a listing."""
+
+    def __init__(self, listing):
+        self.listing = listing
+
+    def _swift_call(self, region, action, *args, **kwargs):
+        return {}, self.listing
+
+
+def best_time(func, repeat, number=1):
+    """Get the best time of `repeat` runs of `number` calls to `func`."""
+    return min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def per_call(name, seconds, count, **extra):
+    """Build the result of `count` operations done in `seconds`."""
+    result = OrderedDict([
+        ('name', name),
+        ('count', count),
+        ('seconds', seconds),
+        ('per_second', round(count / seconds, 1) if seconds else None),
+        ('microseconds_each', round(seconds / count * 1e6, 3)),
+    ])
+    result.update(extra)
+    return result
+
+
+def make_instances(count):
+    """Generate a listing of `count` instances as answered by the API."""
+    return [{
+        'instanceId': '8c687d5d-a1c7-4670-aca8-%012d' % i,
+        'name': 'instance-%d' % i,
+        'ip': '192.168.%d.%d' % (i // 256 % 256, i % 256),
+        'flavorId': 'ab35df0e-4632-48b2-b6a5-c1f1d922bd43',
+        'imageId': '82a56d09-882d-48cc-82ce-eef59820879f',
+        'keyName': 'MyTestKey',
+        'status': 'ACTIVE',
+        'created': '2014-06-01T09:13:15Z',
+        'region': ('BHS-1', 'SBG-1')[i % 2]
+    } for i in range(count)]
+
+
+def bench_signing(sizes, repeat):
+    """Time signing queries and raw_call without network, then with."""
+    calls = sizes['calls']
+    api = WrapperApi('application-key', 'application-secret',
+                     'consumer-key', transport=MemoryTransport())
+    url = api.base_url + '/instance'
+    now = str(int(time.time()))
+    sign = best_time(lambda: [api._signed_headers('GET', url, '', now)
+                              for _ in range(calls)], repeat)
+    raw_call = best_time(lambda: [api.raw_call('GET', '/instance')
+                                  for _ in range(calls)], repeat)
+    results = [
+        per_call('signing.signed_headers', sign, calls),
+        per_call('signing.raw_call_memory', raw_call, calls,
+                 signing_share=round(sign / raw_call, 3)),
+    ]
+    calls = sizes['local_calls']
+    with LocalApiServer() as server:
+        api = WrapperApi(server.application_key, server.application_secret,
+                         server.consumer_key, base_url=server.base_url)
+        api.raw_call('GET', '/region')
+        local = best_time(lambda: [api.raw_call('GET', '/region')
+                                   for _ in range(calls)], repeat)
+        api.close()
+    results.append(per_call('signing.raw_call_local', local, calls,
+                            signing_share=round(sign / sizes['calls'] /
+                                                (local / calls), 4)))
+    return results
+
+
+def bench_mapping(sizes, repeat):
+    """Time mapping an instance listing to Instance objects."""
+    count = sizes['instances']
+    client = runabove.Runabove('application-key', 'application-secret',
+                               'consumer-key')
+    listing = make_instances(count)
+    to_obj = client.instances._dict_to_obj
+    seconds = best_time(lambda: [to_obj(ins) for ins in listing], repeat)
+    return [per_call('mapping.instance_dict_to_obj', seconds, count)]
+
+
+def bench_listing(sizes, repeat):
+    """Time listing a container of many objects."""
+    count = sizes['objects']
+    listing = [{
+        'name': 'logs/2015/%08d.gz' % i,
+        'bytes': 1024 + i % 4096,
+        'hash': 'd41d8cd98f00b204e9800998ecf8427e',
+        'content_type': 'application/gzip',
+        'last_modified': '2015-02-06T10:00:00.000000'
+    } for i in range(count)]
+    region = runabove.region.Region(None, 'BHS-1')
+    container = Container(ListingManager(listing), 'logs', region)
+    seconds = best_time(container.list_objects, repeat)
+    return [per_call('listing.list_objects', seconds, count)]
+
+
+def bench_token(sizes, repeat):
+    """Time parsing the dates of tokens."""
+    count = sizes['dates']
+    manager = TokenManager(None, None)
+    dates = ['2015-02-%02dT%02d:%02d:%02d.%06dZ' % (
+        1 + i % 28, i % 24, i % 60, i * 7 % 60, i % 1000000)
+        for i in range(count)]
+    parse = manager._iso8601_to_datetime
+    seconds = best_time(lambda: [parse(date) for date in dates], repeat)
+    return [per_call('token.iso8601_to_datetime', seconds, count)]
+
+
+def throughput(name, seconds, count, size, **extra):
+    """Build the result of transferring `count` objects of `size` bytes."""
+    return per_call(name, seconds, count, object_bytes=size,
+                    megabytes_per_second=round(
+                        count * size / seconds / 1e6, 2), **extra)
+
+
+def bench_storage(sizes, repeat):
+    """Time uploads and downloads against the local stand-in."""
+    count = sizes['storage_objects']
+    size = sizes['object_size']
+    content = b'x' * size
+    names = ['object-%d' % i for i in range(count)]
+    with LocalApiServer() as server:
+        client = server.client()
+        container = client.containers.create('BHS-1', 'benchmark')
+
+        def upload():
+            for name in names:
+                container.create_object(name, content, fetch=False)
+
+        def upload_many():
+            report = container.upload_many(
+                ((name, content) for name in names), max_workers=4)
+            if report.failed:
+                raise report.failed[0].error
+
+        def download():
+            for name in names:
+                container.get_object_by_name(name, download=True)
+
+        def stream():
+            for name in names:
+                obj = container._en_dict_to_obj(name, None)
+                obj.download_to(io.BytesIO())
+
+        results = [
+            throughput('storage.upload', best_time(upload, repeat), count,
+                       size),
+            throughput('storage.upload_many', best_time(upload_many, repeat),
+                       count, size, workers=4),
+            throughput('storage.download', best_time(download, repeat),
+                       count, size),
+            throughput('storage.download_to', best_time(stream, repeat),
+                       count, size),
+        ]
+    return results
+
+
+BENCHMARKS = OrderedDict([
+    ('signing', bench_signing),
+    ('mapping', bench_mapping),
+    ('listing', bench_listing),
+    ('token', bench_token),
+    ('storage', bench_storage),
+])
+
+
+def environment():
+    """Describe where the benchmarks run, to compare runs."""
+    return OrderedDict([
+        ('date', datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')),
+        ('sdk_version', runabove.__version__),
+        ('python', platform.python_version()),
+        ('implementation', platform.python_implementation()),
+        ('platform', platform.platform()),
+    ])
+
+
+def run(names=None, quick=False, repeat=3):
+    """Run benchmarks, returns the results document.
+
+    :param names: names of the benchmarks to run, all if None
+    :param quick: use smaller sizes, for a fast check
+    :param repeat: number of runs of each benchmark, the best is kept
+    """
+    sizes = dict((key, value[1 if quick else 0])
+                 for key, value in SIZES.items())
+    results = []
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results.extend(bench(sizes, repeat))
+    return OrderedDict([
+        ('environment', environment()),
+        ('sizes', sizes),
+        ('results', results),
+    ])
+
+
+def compare(document, baseline, tolerance=0.2):
+    """Compare results with the ones of a previous run.
+
+    :param document: results of this run
+    :param baseline: results of the previous run
+    :param tolerance: slowdown ratio above which a result regressed
+    :returns: a list of (name, ratio, regressed) tuples, the ratio being
+        the time of this run over the one of the baseline
+    """
+    before = dict((result['name'], result)
+                  for result in baseline['results'])
+    comparison = []
+    for result in document['results']:
+        previous = before.get(result['name'])
+        if previous is None or previous['count'] != result['count']:
+            continue
+        ratio = result['microseconds_each'] / previous['microseconds_each']
+        comparison.append((result['name'], round(ratio, 3),
+                           ratio > 1 + tolerance))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS),
+                        help='benchmarks to run, all by default')
+    parser.add_argument('--quick', action='store_true',
+                        help='run with smaller sizes')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true',
+                        help='print results as JSON')
+    parser.add_argument('--output', help='also write JSON results to a file')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare with the JSON results of a run, '
+                             'exit with status 1 if one regressed')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='slowdown ratio tolerated by --compare')
+    args = parser.parse_args()
+    document = run(args.only, args.quick, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(document, output, indent=2)
+    comparison = None
+    if args.compare:
+        with open(args.compare) as baseline:
+            comparison = compare(document, json.load(baseline),
+                                 args.tolerance)
+        document['comparison'] = [
+            OrderedDict([('name', name), ('ratio', ratio),
+                         ('regressed', regressed)])
+            for name, ratio, regressed in comparison]
+    if args.json:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+    else:
+        print_results(document)
+    if comparison and any(regressed for _, _, regressed in comparison):
+        sys.exit(1)
+
+
+def print_results(document):
+    """Print results as a table."""
+    ratios = dict((result['name'], result)
+                  for result in document.get('comparison', ()))
+    print('%-32s %10s %14s %12s %10s' % ('benchmark', 'count', 'us each',
+                                         'MB/s', 'vs base'))
+    for result in document['results']:
+        megabytes = result.get('megabytes_per_second')
+        ratio = ratios.get(result['name'])
+        print('%-32s %10d %14.3f %12s %10s' % (
+            result['name'], result['count'], result['microseconds_each'],
+            '-' if megabytes is None else '%.2f' % megabytes,
+            '-' if ratio is None else '%.2fx%s' % (
+                ratio['ratio'], ' !' if ratio['regressed'] else '')))
+
+
+if __name__ == '__main__':
+    main()
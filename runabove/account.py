@@ -28,30 +28,109 @@
 """RunAbove account service library."""
 from __future__ import absolute_import
 
+import time
+from collections import deque, namedtuple
+
 from .base import Resource, BaseManager
 from .exception import ResourceNotFoundError
 
 
+#: Usage of one project, `current_total` is its spend in the period
+ProjectUsage = namedtuple('ProjectUsage', ['project_id', 'current_total'])
+
+
+class BalanceSnapshot(namedtuple('BalanceSnapshot',
+                                 ['current_total', 'credit_left',
+                                  'fetched_at', 'usages'])):
+    """Balance of an account at a given time.
+
+    `fetched_at` is the time the balance was fetched at, now by default,
+    and `usages` the usage of each project, a tuple of ProjectUsage.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, current_total, credit_left, fetched_at=None,
+                usages=()):
+        if fetched_at is None:
+            fetched_at = time.time()
+        return super(BalanceSnapshot, cls).__new__(cls, current_total,
+                                                   credit_left, fetched_at,
+                                                   tuple(usages))
+
+    def age(self):
+        """Get the number of seconds since the balance was fetched."""
+        return time.time() - self.fetched_at
+
+
 class AccountManager(BaseManager):
     """Manage the account attached to the user."""
 
     basepath = '/me'
 
+    #: Seconds during which the balance of an account is reused
+    balance_ttl = 60
+
     def get(self):
         """Get information about an account."""
         res = self._api.get(self.basepath)
         return self._dict_to_obj(res)
 
-    def _load_balance(self):
-        """Loads information about balance.
+    def get_balance(self):
+        """Get the total usage of all projects and the credit left.
 
-        Sums total of all projects, so no usage per project.
+        :returns: a BalanceSnapshot
+        """
+        return self._balance_from_dict(
+            self._api.get(self.basepath + '/balance'))
+
+    _load_balance = get_balance
+
+    def _balance_from_dict(self, balance):
+        """Converts a dict to a BalanceSnapshot.
+
+        Sums total of all projects, keeping the usage of each project.
         """
-        balance = self._api.get(self.basepath + '/balance')
         total_usage = 0
+        usages = []
         for project in balance['currentUsages']:
             total_usage += project['currentTotal']
-        return (total_usage, balance['creditLeft'])
+            usages.append(ProjectUsage(project.get('projectId'),
+                                       project['currentTotal']))
+        return BalanceSnapshot(total_usage, balance['creditLeft'],
+                               usages=usages)
+
+    def watch_balance(self, interval=300, min_change=0, max_polls=None):
+        """Poll the balance and yield it each time it changes.
+
+        The first balance is always yielded. The API is called once per
+        `interval` seconds, whatever the number of changes.
+
+        :param interval: seconds between two polls
+        :param min_change: minimum change of the total or of the credit
+            left for a new balance to be yielded
+        :param max_polls: number of polls after which to stop, None to
+            poll forever
+        :returns: an iterator of BalanceSnapshot
+        """
+        last = None
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            if polls:
+                time.sleep(interval)
+            polls += 1
+            snapshot = self.get_balance()
+            if self._balance_changed(last, snapshot, min_change):
+                last = snapshot
+                yield snapshot
+
+    @staticmethod
+    def _balance_changed(last, snapshot, min_change):
+        """Tell if a balance changed by more than `min_change`."""
+        return (last is None or
+                abs(snapshot.current_total - last.current_total) >
+                min_change or
+                abs(snapshot.credit_left - last.credit_left) > min_change)
 
     def _dict_to_obj(self, key):
         """Converts a dict to an Account object."""
@@ -65,14 +144,16 @@ class AccountManager(BaseManager):
                        key.get('area'),
                        key.get('country'),
                        key.get('email'),
-                       key.get('cellNumber'))
+                       key.get('cellNumber'),
+                       balance_ttl=self.balance_ttl)
 
 
 class Account(Resource):
     """Represents one account."""
 
     def __init__(self, manager, account_id, first_name, last_name, address,
-                 city, postal_code, area, country, email, phone):
+                 city, postal_code, area, country, email, phone,
+                 balance_ttl=60):
         self._manager = manager
         self.account_id = account_id
         self.first_name = first_name
@@ -84,21 +165,106 @@ class Account(Resource):
         self.country = country
         self.email = email
         self.phone = phone
-        self._current_total = None
-        self._credit_left = None
+        self.balance_ttl = balance_ttl
+        self._balance = None
+
+    @property
+    def balance(self):
+        """Lazy loading of balance information.
+
+        The balance is fetched with one call and reused for
+        `balance_ttl` seconds.
+        """
+        if self._balance is None or self._balance.age() >= self.balance_ttl:
+            self._balance = self._manager._load_balance()
+        return self._balance
 
     @property
     def current_total(self):
         """Lazy loading of balance information."""
-        if not self._current_total:
-            self._current_total = self._manager._load_balance()[0]
-            self._credit_left = self._manager._load_balance()[1]
-        return self._current_total
+        return self.balance.current_total
 
     @property
     def credit_left(self):
         """Lazy loading of balance information."""
-        if not self._credit_left:
-            self._current_total = self._manager._load_balance()[0]
-            self._credit_left = self._manager._load_balance()[1]
-        return self._credit_left
+        return self.balance.credit_left
+
+
+class UsageAggregator(object):
+    """Turn balance snapshots into spend rates by project.
+
+    Snapshots are added as they are polled, for instance from
+    `AccountManager.watch_balance`. The spend of each project is
+    accumulated incrementally, a total lower than the previous one
+    being considered as the start of a new billing period. Only the
+    last `max_history` points are kept.
+    """
+
+    def __init__(self, max_history=288):
+        """Build an empty aggregator.
+
+        :param max_history: number of snapshots kept, 288 are a day of
+            polls every 5 minutes
+        """
+        self._history = deque(maxlen=max_history)
+        self._last_totals = {}
+        self._spent = {}
+
+    def add(self, snapshot):
+        """Account for a new balance snapshot.
+
+        :param snapshot: BalanceSnapshot with the usages of the projects
+        """
+        for usage in snapshot.usages:
+            previous = self._last_totals.get(usage.project_id)
+            if previous is None:
+                delta = 0
+            elif usage.current_total < previous:
+                delta = usage.current_total
+            else:
+                delta = usage.current_total - previous
+            self._last_totals[usage.project_id] = usage.current_total
+            self._spent[usage.project_id] = \
+                self._spent.get(usage.project_id, 0) + delta
+        self._history.append((snapshot.fetched_at, dict(self._spent)))
+
+    def __len__(self):
+        return len(self._history)
+
+    def spent(self, window=None):
+        """Get the spend of each project over the history.
+
+        :param window: seconds before the last snapshot to consider, None
+            for the whole history
+        :returns: a dict of amounts indexed by project id
+        """
+        first, last = self._bounds(window)
+        if first is None:
+            return {}
+        return dict((project_id, total - first[1].get(project_id, 0))
+                    for project_id, total in last[1].items())
+
+    def rates(self, window=None, per=3600):
+        """Get the spend rate of each project.
+
+        :param window: seconds before the last snapshot to consider, None
+            for the whole history
+        :param per: seconds of the rate, an hour by default
+        :returns: a dict of spend per `per` seconds indexed by project
+            id, empty until two snapshots at different times are known
+        """
+        first, last = self._bounds(window)
+        if first is None or last[0] <= first[0]:
+            return {}
+        duration = float(last[0] - first[0])
+        return dict((project_id, spent * per / duration)
+                    for project_id, spent in self.spent(window).items())
+
+    def _bounds(self, window):
+        """Get the first and last points of the history in the window."""
+        if not self._history:
+            return None, None
+        last = self._history[-1]
+        for point in self._history:
+            if window is None or point[0] >= last[0] - window:
+                return point, last
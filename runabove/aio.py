@@ -0,0 +1,772 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+"""Asynchronous RunAbove SDK built on asyncio.
+
+The managers of this module mirror the ones of the synchronous SDK but
+their methods are coroutines, so many calls can run concurrently on one
+event loop. Queries are signed exactly like with `WrapperApi`.
+
+It requires Python 3.6+ and aiohttp. Lazy loaded attributes of resources
+(such as `Instance.flavor`) still rely on blocking calls and are not
+available with this client: use `get_by_id` to get enriched objects, or
+`prefetch` to attach the flavors, images and SSH keys of instances.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import json
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .wrapper_api import WrapperApi
+from .exception import APIError, NetworkError, ResourceNotFoundError
+from .flavor import FlavorManager
+from .region import RegionManager
+from .ssh_key import SSHKeyManager
+from .image import ImageManager
+from .instance import InstanceManager, CreateResult
+from .account import AccountManager, Account
+from .token import TokenManager
+from .waiter import InstanceWaiter
+
+
+class AsyncWrapperApi(WrapperApi):
+    """Non-blocking wrapper class for RunAbove API."""
+
+    def __init__(self, application_key, application_secret, consumer_key=None,
+                 pool_maxsize=100, idle_timeout=15, skew_store=None,
+                 skew_max_age=None, codec=None, base_url=None):
+        """Construct a new asynchronous wrapper instance.
+
+        Retry policies, rate limiters, observers, response caches and
+        transports of WrapperApi are not supported by this client.
+
+        :param application_key: your application key given by RunAbove
+        on application registration
+        :param application_secret: your application secret given by RunAbove
+        on application registration
+        :param consumer_key: the consumer key you want to use, if any,
+        given after a credential request
+        :param pool_maxsize: maximum number of connections opened
+        simultaneously to the API
+        :param idle_timeout: seconds an unused connection is kept alive
+        :param skew_store: SkewStore sharing the clock skew, read and
+        written from a thread so that file stores do not block the loop
+        :param skew_max_age: seconds after which the clock skew is computed
+        again, None to keep it forever
+        :param codec: codec encoding and decoding JSON, or its name
+        :param base_url: URL of the API, the RunAbove one if None
+        """
+        if aiohttp is None:
+            raise ImportError('aiohttp is required by the asyncio client')
+        WrapperApi.__init__(self, application_key, application_secret,
+                            consumer_key, pool_maxsize=pool_maxsize,
+                            idle_timeout=idle_timeout, skew_store=skew_store,
+                            skew_max_age=skew_max_age, codec=codec,
+                            base_url=base_url)
+        # Lock of the clock skew fetch, asyncio locks belong to a loop
+        self._time_lock = None
+        self._time_lock_loop = None
+
+    def _get_session(self):
+        """Get the aiohttp session shared by all calls.
+
+        Must be called from a coroutine as aiohttp binds the session to
+        the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                keepalive_timeout=self.idle_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+        self._requests_sent += 1
+        return self._session
+
+    async def _request(self, method, target_url, headers, body):
+        """Send a query and return its status and body."""
+        try:
+            async with self._get_session().request(method.upper(),
+                                                   target_url,
+                                                   headers=headers,
+                                                   data=body) as result:
+                return result.status, await result.text()
+        except aiohttp.ClientError as e:
+            raise NetworkError(msg=str(e))
+
+    async def close(self):
+        """Close every pooled connection."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def pool_stats(self):
+        """Get the number of requests sent.
+
+        aiohttp does not expose how many connections it opened.
+        """
+        return {'requests': self._requests_sent}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __enter__(self):
+        # close() is a coroutine, a plain with block would leak the session
+        raise TypeError("use 'async with' with AsyncWrapperApi")
+
+    def __exit__(self, *exc_info):
+        raise TypeError("use 'async with' with AsyncWrapperApi")
+
+    def _get_time_lock(self):
+        """Get the lock of the clock skew fetch for the running loop."""
+        loop = asyncio.get_event_loop()
+        if self._time_lock_loop is not loop:
+            self._time_lock = asyncio.Lock()
+            self._time_lock_loop = loop
+        return self._time_lock
+
+    async def time_delta(self):
+        """Get the delta between this computer and RunAbove cluster.
+
+        Concurrent calls share a single query of the time of the API.
+        """
+        if self._time_delta is not None and self._is_time_delta_fresh():
+            return self._time_delta
+        async with self._get_time_lock():
+            if self._time_delta is not None and self._is_time_delta_fresh():
+                return self._time_delta
+            return await self._fetch_time_delta()
+
+    async def _fetch_time_delta(self):
+        """Get the delta from the skew store or from the API."""
+        # Skew stores may lock and sync files, keep them off the loop
+        loop = asyncio.get_event_loop()
+        if self.skew_store is not None and await loop.run_in_executor(
+                None, self._load_stored_time_delta):
+            return self._time_delta
+        status, text = await self._request('get', self.base_url + '/time',
+                                           {}, None)
+        try:
+            server_time = int(text)
+        except ValueError:
+            raise APIError(msg='Impossible to get time from RunAbove')
+        delta = server_time - int(time.time())
+        if self.skew_store is None:
+            self._set_time_delta(delta)
+        else:
+            await loop.run_in_executor(None, self._set_time_delta, delta)
+        return self._time_delta
+
+    async def request_credentials(self, access_rules, redirect_url=None):
+        """Request a Consumer Key to the API.
+
+        :param access_rules: list of dictionaries listing the
+         accesses your application will need
+        :param redirect_url: url where you want the user to be
+         redirected to after he successfully validates
+         the consumer key
+
+        :raises APIError: Error send by api
+        """
+        params = {"accessRules": access_rules, "redirection": redirect_url}
+        headers = {
+            "X-Ra-Application": self.application_key,
+            "Content-type": "application/json"
+        }
+        status, text = await self._request('post',
+                                           self.base_url + '/auth/credential',
+                                           headers, json.dumps(params))
+        res = json.loads(text)
+        if status < 100 or status >= 300:
+            raise APIError(res['message'])
+        self.consumer_key = str(res['consumerKey'])
+        return res
+
+    async def raw_call(self, method, path, content=None):
+        """Sign a given query and return its result.
+
+        :param method: the HTTP method of the request (get/post/put/delete)
+        :param path: the url you want to request
+        :param content: the object you want to send in your request
+         (will be automatically serialized to JSON)
+
+        :raises APIError: Error send by api
+        """
+        target_url = self.base_url + path
+        now = str(int(time.time()) + await self.time_delta())
+
+        body = ""
+        if content:
+            body = self.codec.encode(content)
+
+        query_headers = self._signed_headers(method, target_url, body, now)
+        status, text = await self._request(method, target_url,
+                                           query_headers, body)
+        return self._handle_response(status, text)
+
+    async def get(self, path, content=None):
+        """Helper method that wraps a GET call to raw_call."""
+        return await self.raw_call("get", path, content)
+
+    async def put(self, path, content):
+        """Helper method that wraps a PUT call to raw_call."""
+        return await self.raw_call("put", path, content)
+
+    async def post(self, path, content):
+        """Helper method that wraps a POST call to raw_call."""
+        return await self.raw_call("post", path, content)
+
+    async def delete(self, path, content=None):
+        """Helper method that wraps a DELETE call to raw_call."""
+        return await self.raw_call("delete", path, content)
+
+
+def _region_name(region):
+    """Get the name of a region given as object or name."""
+    try:
+        return region.name
+    except AttributeError:
+        return region
+
+
+class AsyncListMixin(object):
+    """Asynchronous list, list_by_region and list_all_regions methods."""
+
+    async def list(self):
+        """Get a list of objects in an account."""
+        return [self._dict_to_obj(obj)
+                for obj in await self._api.get(self.basepath)]
+
+    async def list_by_region(self, region):
+        """Get a list of objects in a region."""
+        content = {'region': _region_name(region)}
+        return [self._dict_to_obj(obj)
+                for obj in await self._api.get(self.basepath, content)]
+
+    async def list_all_regions(self, regions=None, max_workers=4,
+                               timeout=None):
+        """Get a list of objects of several regions concurrently.
+
+        Each region is listed by its own request, at most `max_workers`
+        of them run at the same time. A region that fails, or that does
+        not answer before `timeout`, does not prevent the others from
+        being listed: its error is returned instead.
+
+        :param regions: Regions to list, all the regions if None
+        :param max_workers: Maximum number of concurrent requests
+        :param timeout: Seconds to wait for all the regions, None to wait
+            as long as needed
+        :returns: a tuple of the merged list of objects and a dict of the
+            errors raised, indexed by region name
+        """
+        if regions is None:
+            regions = await self._handler.regions.list()
+        region_names = [_region_name(region) for region in regions]
+        objs = []
+        errors = {}
+        if not region_names:
+            return objs, errors
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def list_region(name):
+            async with semaphore:
+                return await self.list_by_region(name)
+
+        tasks = [asyncio.ensure_future(list_region(name))
+                 for name in region_names]
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for name, task in zip(region_names, tasks):
+            if task in pending:
+                task.cancel()
+                errors[name] = NetworkError(
+                    msg='Region %s did not answer in time' % name)
+            elif task.exception() is not None:
+                errors[name] = task.exception()
+            else:
+                objs.extend(task.result())
+        return objs, errors
+
+
+class AsyncCatalogMixin(AsyncListMixin):
+    """Asynchronous list and lookups served by the catalog cache.
+
+    The cache is enabled with `enable_cache`, as with the sync managers.
+    """
+
+    async def _catalog(self):
+        """Get the cached catalog, fetching it when stale."""
+        cache = self._cache
+        # The lock of the cache is never held while waiting for the API
+        with cache.lock:
+            if cache.is_fresh():
+                cache.hits += 1
+                return cache
+            cache.misses += 1
+        objs = await AsyncListMixin.list(self)
+        with cache.lock:
+            cache.load(objs)
+        return cache
+
+    async def list(self):
+        """Get a list of objects in an account."""
+        if self._cache is None:
+            return await AsyncListMixin.list(self)
+        return list((await self._catalog()).objs)
+
+    async def _get_by_name(self, name, region=None):
+        """Get a list of objects named ``name``, optionally in a region."""
+        region_name = _region_name(region)
+        if self._cache is not None:
+            cache = await self._catalog()
+            if region is None:
+                return list(cache.by_name.get(name, []))
+            return list(cache.by_region_name.get((region_name, name), []))
+        return [obj for obj in await self.list()
+                if obj.name == name and (region is None or
+                                         obj.region.name == region_name)]
+
+    async def _get_cached_by_id(self, obj_id):
+        """Get an object from the cached catalog, None when not cached."""
+        if self._cache is None:
+            return None
+        return (await self._catalog()).by_id.get(obj_id)
+
+
+class AsyncFlavorManager(AsyncCatalogMixin, FlavorManager):
+    """Manage flavors available in RunAbove asynchronously."""
+
+    async def get_by_name(self, flavor_name, region=None):
+        """Get a list of flavors named ``flavor_name``"""
+        return await self._get_by_name(flavor_name, region)
+
+    async def get_by_id(self, flavor_id):
+        """Get a flavor by its id.
+
+        :raises ResourceNotFoundError: Flavor does not exist
+        """
+        flavor = await self._get_cached_by_id(flavor_id)
+        if flavor is not None:
+            return flavor
+        url = self.basepath + '/' + self._api.encode_for_api(flavor_id)
+        return self._dict_to_obj(await self._api.get(url))
+
+
+class AsyncImageManager(AsyncCatalogMixin, ImageManager):
+    """Manage images available in RunAbove asynchronously."""
+
+    async def get_by_id(self, image_id=None):
+        """Get one image from a RunAbove account."""
+        image = await self._get_cached_by_id(image_id)
+        if image is not None:
+            return image
+        url = self.basepath + '/' + self._api.encode_for_api(image_id)
+        return self._dict_to_obj(await self._api.get(url))
+
+    async def get_by_name(self, image_name, region=None):
+        """Get a list of images named ``image_name``"""
+        return await self._get_by_name(image_name, region)
+
+
+class AsyncRegionManager(RegionManager):
+    """Manage regions available in RunAbove asynchronously."""
+
+    async def list(self):
+        """Get list of regions available."""
+        return [self._name_to_obj(region_name)
+                for region_name in await self._api.get(self.basepath)]
+
+    async def get_by_name(self, region_name):
+        """Get a region by its name.
+
+        :raises ResourceNotFoundError: Region does not exist
+        """
+        for region in await self.list():
+            if region.name == region_name:
+                return region
+        raise ResourceNotFoundError(msg='Region %s does not exist'
+                                        % region_name)
+
+
+class AsyncSSHKeyManager(AsyncListMixin, SSHKeyManager):
+    """Manage the SSH keys attached to an account asynchronously."""
+
+    async def get_by_name(self, region, name):
+        """Get one SSH key from a RunAbove account."""
+        url = self.basepath + '/' + self._api.encode_for_api(name)
+        key = await self._api.get(url, {'region': _region_name(region)})
+        return self._dict_to_obj(key)
+
+    async def create(self, region, name, public_key):
+        """Register a new SSH key in a RunAbove account."""
+        region_name = _region_name(region)
+        content = {
+            'publicKey': public_key,
+            'region': region_name,
+            'name': name
+        }
+        await self._api.post(self.basepath, content)
+        return await self.get_by_name(region_name, name)
+
+    async def delete(self, region, key):
+        """Delete an SSH key from an account."""
+        try:
+            name = key.name
+        except AttributeError:
+            name = key
+        url = self.basepath + '/' + self._api.encode_for_api(name)
+        return await self._api.delete(url, {'region': _region_name(region)})
+
+
+class AsyncInstanceWaiter(InstanceWaiter):
+    """Track instances until they reach their target status asynchronously.
+
+    The regions of the pending instances are listed concurrently.
+    """
+
+    async def wait(self, timeout=600, callback=None):
+        """Poll the instances until all of them reached their status.
+
+        :param timeout: seconds after which waiting is abandoned
+        :param callback: called with the instance, its previous status
+            and its new status on each change of any instance
+        :returns: a dict of the final statuses, indexed by instance id
+        :raises WaitTimeoutError: Some instances did not reach their
+            status in time, the exception lists them in `pending`
+        """
+        deadline = time.time() + timeout
+        pending = dict(self._tracked)
+        finished = {}
+        seen = set()
+        delay = self.initial_delay
+        while True:
+            changed = await self._poll(pending, finished, callback, seen)
+            if not pending:
+                return finished
+            if changed:
+                delay = self.initial_delay
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise self._timeout_error(pending)
+            await asyncio.sleep(min(self._jittered(delay), remaining))
+            delay = min(delay * self.backoff, self.max_delay)
+
+    async def _poll(self, pending, finished, callback, seen):
+        """List the regions of the pending instances and update them."""
+        listings = await asyncio.gather(
+            *[self._manager.list_by_region(region)
+              for region in self._pending_regions(pending)])
+        statuses = {}
+        for listing in listings:
+            for listed in listing:
+                statuses[listed.id] = listed.status
+        return self._update(pending, finished, callback, seen, statuses)
+
+
+class AsyncInstanceManager(AsyncListMixin, InstanceManager):
+    """Manage instances for a RunAbove account asynchronously."""
+
+    async def list(self, prefetch=False):
+        """Get a list of instances in an account.
+
+        :param prefetch: If True resolve the flavors, images and SSH keys
+            of all the instances at once, see `prefetch`
+        """
+        instances = await super(AsyncInstanceManager, self).list()
+        if prefetch:
+            await self.prefetch(instances)
+        return instances
+
+    async def list_by_region(self, region, prefetch=False):
+        """Get a list of instances in a region.
+
+        :param prefetch: If True resolve the flavors, images and SSH keys
+            of all the instances at once, see `prefetch`
+        """
+        instances = await super(AsyncInstanceManager,
+                                self).list_by_region(region)
+        if prefetch:
+            await self.prefetch(instances)
+        return instances
+
+    async def prefetch(self, instances):
+        """Attach flavors, images and SSH keys to instances.
+
+        The catalogs needed are listed concurrently, one call each.
+        """
+        instances = list(instances)
+        names = self._prefetch_needed(instances)
+        listings = await asyncio.gather(
+            *[getattr(self._handler, name).list() for name in names])
+        self._prefetch_attach(instances, dict(zip(names, listings)))
+        return instances
+
+    async def get_by_id(self, instance_id):
+        """Get one instance from a RunAbove account."""
+        url = self.basepath + '/' + self._api.encode_for_api(instance_id)
+        return self._en_dict_to_obj(await self._api.get(url))
+
+    async def _load_vnc(self, instance):
+        """Load the VNC link to an instance."""
+        try:
+            instance_id = instance.id
+        except AttributeError:
+            instance_id = instance
+        vnc = await self._api.get(self.basepath + '/' + instance_id + '/vnc')
+        return vnc['url']
+
+    async def create(self, region, name, flavor, image, ssh_key=None):
+        """Launch a new instance inside a region with a public key."""
+        content = {
+            'flavorId': getattr(flavor, 'id', flavor),
+            'imageId': getattr(image, 'id', image),
+            'name': name,
+            'region': _region_name(region)
+        }
+        if ssh_key:
+            content['sshKeyName'] = getattr(ssh_key, 'name', ssh_key)
+        res = await self._api.post(self.basepath, content)
+        return await self.get_by_id(res['instanceId'])
+
+    async def create_many(self, specs, max_in_flight=4, enrich=True):
+        """Launch many instances concurrently.
+
+        Errors do not stop the other creations, they are returned with
+        the spec that failed.
+
+        :param specs: iterable of dicts with the arguments of `create`
+        :param max_in_flight: Maximum number of creations running at once
+        :param enrich: If False do not get each new instance after its
+            creation
+        :returns: a list of CreateResult (spec, instance, error), in
+            completion order
+        """
+        semaphore = asyncio.Semaphore(max_in_flight)
+        results = []
+
+        async def create_one(spec):
+            async with semaphore:
+                results.append(await self._create_one(spec, enrich))
+
+        await asyncio.gather(*[create_one(spec) for spec in specs])
+        return results
+
+    async def _create_one(self, spec, enrich):
+        """Create one instance for `create_many`."""
+        try:
+            content = self._create_content(**spec)
+            res = await self._api.post(self.basepath, content)
+            instance_id = res['instanceId']
+        except Exception as e:
+            return CreateResult(spec, None, e)
+        instance = self._created_to_obj(instance_id, content)
+        if enrich:
+            try:
+                instance = await self.get_by_id(instance_id)
+            except Exception as e:
+                # The instance exists, return what is known about it
+                return CreateResult(spec, instance, e)
+        return CreateResult(spec, instance, None)
+
+    async def wait_for(self, instances, status='ACTIVE', timeout=600,
+                       callback=None):
+        """Wait for instances to reach a status.
+
+        :param instances: Instance objects to wait for
+        :param status: status to wait for, 'DELETED' to wait for deletion
+        :param timeout: seconds after which waiting is abandoned
+        :param callback: called with the instance, its previous status
+            and its new status on each change
+        :returns: a dict of the final statuses, indexed by instance id
+        :raises WaitTimeoutError: Instances did not reach the status in time
+        """
+        waiter = AsyncInstanceWaiter(self)
+        for instance in instances:
+            waiter.add(instance, status)
+        return await waiter.wait(timeout, callback)
+
+    async def rename(self, instance, new_name):
+        """Rename an existing instance."""
+        instance_id = getattr(instance, 'id', instance)
+        url = self.basepath + '/' + self._api.encode_for_api(instance_id)
+        await self._api.put(url, {'name': new_name})
+
+    async def delete(self, instance):
+        """Delete an instance from an account."""
+        instance_id = getattr(instance, 'id', instance)
+        url = self.basepath + '/' + self._api.encode_for_api(instance_id)
+        await self._api.delete(url)
+
+
+class AsyncAccountManager(AccountManager):
+    """Manage the account attached to the user asynchronously.
+
+    The balance of an account is fetched along with it instead of being
+    loaded lazily, see `AsyncAccount`.
+    """
+
+    async def get(self):
+        """Get information about an account and its balance."""
+        res, balance = await asyncio.gather(self._api.get(self.basepath),
+                                            self.get_balance())
+        account = self._dict_to_obj(res)
+        account._balance = balance
+        return account
+
+    async def get_balance(self):
+        """Get the total usage of all projects and the credit left."""
+        return self._balance_from_dict(
+            await self._api.get(self.basepath + '/balance'))
+
+    _load_balance = get_balance
+
+    async def watch_balance(self, interval=300, min_change=0,
+                            max_polls=None):
+        """Poll the balance and yield it each time it changes.
+
+        Use it with ``async for``, see `AccountManager.watch_balance`.
+        """
+        last = None
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            if polls:
+                await asyncio.sleep(interval)
+            polls += 1
+            snapshot = await self.get_balance()
+            if self._balance_changed(last, snapshot, min_change):
+                last = snapshot
+                yield snapshot
+
+    def _dict_to_obj(self, key):
+        """Converts a dict to an AsyncAccount object."""
+        return AsyncAccount(self,
+                            key.get('accountIdentifier'),
+                            key.get('firstname'),
+                            key.get('name'),
+                            key.get('address'),
+                            key.get('city'),
+                            key.get('postalCode'),
+                            key.get('area'),
+                            key.get('country'),
+                            key.get('email'),
+                            key.get('cellNumber'),
+                            balance_ttl=self.balance_ttl)
+
+
+class AsyncAccount(Account):
+    """Represents one account got with the asyncio client.
+
+    Its balance is the one fetched along with the account, use
+    `refresh_balance` to fetch it again.
+    """
+
+    @property
+    def balance(self):
+        """Balance fetched with the account or by `refresh_balance`."""
+        return self._balance
+
+    async def refresh_balance(self):
+        """Fetch the balance of the account again."""
+        self._balance = await self._manager._load_balance()
+        return self._balance
+
+
+class AsyncTokenManager(TokenManager):
+    """Get OpenStack tokens asynchronously."""
+
+    async def get(self):
+        """Get an OpenStack API Token."""
+        return self._dict_to_obj(await self._api.get(self.basepath))
+
+
+class AsyncRunabove(object):
+    """Asynchronous SDK interface to get cloud services from RunAbove.
+
+    Object storage is not available with this client.
+    """
+
+    access_rules = [
+        {'method': 'GET', 'path': '/*'},
+        {'method': 'POST', 'path': '/*'},
+        {'method': 'PUT', 'path': '/*'},
+        {'method': 'DELETE', 'path': '/*'}
+    ]
+
+    def __init__(self, application_key, application_secret, consumer_key=None,
+                 **api_options):
+        """Create the main asynchronous interface of the SDK.
+
+        :param application_key: key of your RunAbove api's application
+        :param application_secret: password of your RunAbove api's application
+        :param api_options: extra options given to the AsyncWrapperApi,
+            see its constructor for the ones supported
+        """
+        self._api = AsyncWrapperApi(application_key,
+                                    application_secret,
+                                    consumer_key,
+                                    **api_options)
+        self.flavors = AsyncFlavorManager(self._api, self)
+        self.regions = AsyncRegionManager(self._api, self)
+        self.ssh_keys = AsyncSSHKeyManager(self._api, self)
+        self.images = AsyncImageManager(self._api, self)
+        self.instances = AsyncInstanceManager(self._api, self)
+        self.account = AsyncAccountManager(self._api, self)
+        self.tokens = AsyncTokenManager(self._api, self)
+
+    async def get_login_url(self, access_rules=None, redirect_url=None):
+        """Get the URL to identify and login a customer.
+
+        :param access_rules: List of access required by the application
+        :param redirect_url: URL where user will be redirected after signin
+        :raises ApiException: Error send by api
+        """
+        if isinstance(access_rules, list):
+            self.access_rules = access_rules
+        credentials = await self._api.request_credentials(self.access_rules,
+                                                          redirect_url)
+        return credentials['validationUrl']
+
+    def get_consumer_key(self):
+        """Get the current consumer key to communicate with the API."""
+        return self._api.consumer_key
+
+    async def close(self):
+        """Close the connections kept open to the API."""
+        await self._api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -26,6 +26,13 @@
 # written authorization from OVH.
 
 """RunAbove base class definition library."""
+from __future__ import absolute_import
+
+import threading
+import time
+from concurrent import futures
+
+from .exception import NetworkError
 
 
 class BaseManager(object):
@@ -65,8 +72,184 @@ class BaseManagerWithList(BaseManager):
             objs.append(self._dict_to_obj(obj))
         return objs
 
+    def list_all_regions(self, regions=None, max_workers=4, timeout=None):
+        """Get a list of objects of several regions concurrently.
+
+        Each region is listed by its own request, at most `max_workers`
+        of them run at the same time. A region that fails, or that does
+        not answer before `timeout`, does not prevent the others from
+        being listed: its error is returned instead.
+
+        :param regions: Regions to list, all the regions if None
+        :param max_workers: Maximum number of concurrent requests
+        :param timeout: Seconds to wait for all the regions, None to wait
+            as long as needed
+        :returns: a tuple of the merged list of objects and a dict of the
+            errors raised, indexed by region name
+        """
+        if regions is None:
+            regions = self._handler.regions.list()
+        region_names = []
+        for region in regions:
+            try:
+                region_names.append(region.name)
+            except AttributeError:
+                region_names.append(region)
+
+        objs = []
+        errors = {}
+        if not region_names:
+            return objs, errors
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            submitted = [(name, executor.submit(self.list_by_region, name))
+                         for name in region_names]
+            futures.wait([future for _, future in submitted], timeout=timeout)
+            for name, future in submitted:
+                if not future.done():
+                    future.cancel()
+                    errors[name] = NetworkError(
+                        msg='Region %s did not answer in time' % name)
+                    continue
+                try:
+                    objs.extend(future.result())
+                except Exception as e:
+                    errors[name] = e
+        finally:
+            executor.shutdown(wait=False)
+        return objs, errors
+
+
+class CatalogCache(object):
+    """In-memory copy of a catalog with indexes for fast lookups.
+
+    Objects are indexed by id, by name and by (region name, name).
+    """
+
+    def __init__(self, ttl):
+        """Build an empty catalog cache.
+
+        :param ttl: seconds during which a loaded catalog is used
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop the cached catalog, it will be loaded on next use."""
+        self.loaded_at = None
+        self.objs = []
+        self.by_id = {}
+        self.by_name = {}
+        self.by_region_name = {}
+
+    def is_fresh(self):
+        """Tell if the cached catalog can still be used."""
+        return (self.loaded_at is not None and
+                time.time() - self.loaded_at < self.ttl)
+
+    def load(self, objs):
+        """Replace the cached catalog and rebuild its indexes."""
+        self.invalidate()
+        for obj in objs:
+            self.by_id[obj.id] = obj
+            self.by_name.setdefault(obj.name, []).append(obj)
+            self.by_region_name.setdefault((obj.region.name, obj.name),
+                                           []).append(obj)
+        self.objs = objs
+        self.loaded_at = time.time()
+
+
+class BaseManagerWithCatalog(BaseManagerWithList):
+    """Manager of a catalog that can be cached in memory.
+
+    The cache is disabled by default, once enabled with `enable_cache`
+    the catalog is fetched with one call and lookups are served from
+    memory until the TTL expires.
+    """
+
+    _cache = None
+
+    def enable_cache(self, ttl=300):
+        """Keep the catalog in memory.
+
+        :param ttl: seconds during which the catalog is used before being
+            fetched again
+        """
+        self._cache = CatalogCache(ttl)
+
+    def disable_cache(self):
+        """Stop caching the catalog."""
+        self._cache = None
+
+    def invalidate_cache(self):
+        """Drop the cached catalog, it will be fetched on next lookup."""
+        if self._cache is not None:
+            with self._cache.lock:
+                self._cache.invalidate()
+
+    def cache_stats(self):
+        """Get the number of hits and misses of the catalog cache."""
+        if self._cache is None:
+            return {'enabled': False, 'hits': 0, 'misses': 0, 'size': 0}
+        return {
+            'enabled': True,
+            'hits': self._cache.hits,
+            'misses': self._cache.misses,
+            'size': len(self._cache.objs)
+        }
+
+    def _catalog(self):
+        """Get the cached catalog, fetching it when stale."""
+        cache = self._cache
+        with cache.lock:
+            if cache.is_fresh():
+                cache.hits += 1
+            else:
+                cache.misses += 1
+                cache.load(BaseManagerWithList.list(self))
+            return cache
+
+    def list(self):
+        """Get a list of objects in an account."""
+        if self._cache is None:
+            return BaseManagerWithList.list(self)
+        return list(self._catalog().objs)
+
+    def _get_by_name(self, name, region=None):
+        """Get a list of objects named ``name``, optionally in a region."""
+        if region is not None:
+            try:
+                region_name = region.name
+            except AttributeError:
+                region_name = region
+        if self._cache is not None:
+            cache = self._catalog()
+            if region is None:
+                return list(cache.by_name.get(name, []))
+            return list(cache.by_region_name.get((region_name, name), []))
+        objs = []
+        for obj in self.list():
+            if obj.name == name and (region is None or
+                                     obj.region.name == region_name):
+                objs.append(obj)
+        return objs
+
+    def _get_cached_by_id(self, obj_id):
+        """Get an object from the cached catalog, None when not cached."""
+        if self._cache is None:
+            return None
+        return self._catalog().by_id.get(obj_id)
 
 
 class Resource(object):
-    """Base class for resource (obj, flavor, etc.)."""
+    """Base class for resource (obj, flavor, etc.).
+
+    Resources that can be listed by thousands declare their attributes
+    in `__slots__` to save the memory of a per-instance dict.
+    """
+
+    __slots__ = ()
 
@@ -49,15 +49,19 @@ class Runabove(object):
         {'method': 'DELETE', 'path': '/*'}
     ]
 
-    def __init__(self, application_key, application_secret, consumer_key=None):
+    def __init__(self, application_key, application_secret, consumer_key=None,
+                 **api_options):
         """Create the main interface of the SDK.
 
         :param application_key: key of your RunAbove api's application
         :param application_secret: password of your RunAbove api's application
+        :param api_options: extra options given to the WrapperApi, such as
+            the connection pool settings
         """
         self._api = WrapperApi(application_key,
                                application_secret,
-                               consumer_key)
+                               consumer_key,
+                               **api_options)
         self.flavors = FlavorManager(self._api, self)
         self.regions = RegionManager(self._api, self)
         self.ssh_keys = SSHKeyManager(self._api, self)
@@ -91,3 +95,7 @@ class Runabove(object):
 
         return self._api.consumer_key
 
+    def close(self):
+        """Close the connections kept open to the API."""
+        self._api.close()
+
@@ -0,0 +1,137 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""JSON codecs used to encode queries and decode answers of the API.
+
+The standard library is always available, orjson and ujson are used
+when installed and asked for. Answers are decoded from the bytes of
+the response, without building an intermediate string first when the
+library supports it.
+"""
+from __future__ import absolute_import
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class Codec(object):
+    """Base class of JSON codecs."""
+
+    name = None
+
+    def encode(self, obj):
+        """Serialize an object to a JSON string."""
+        raise NotImplementedError()
+
+    def decode(self, data):
+        """Deserialize a JSON document.
+
+        :param data: bytes or string of the document
+        :raises ValueError: The document is not valid JSON
+        """
+        raise NotImplementedError()
+
+
+class StdlibCodec(Codec):
+    """Codec using the json module of the standard library."""
+
+    name = 'json'
+
+    def encode(self, obj):
+        return json.dumps(obj)
+
+    def decode(self, data):
+        if not isinstance(data, str):
+            # Bytes on Python 3, UTF-8 is the encoding of JSON
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    """Codec using orjson, decoding bytes directly."""
+
+    name = 'orjson'
+
+    def encode(self, obj):
+        encoded = orjson.dumps(obj).decode('utf-8')
+        try:
+            encoded.encode('ascii')
+        except UnicodeEncodeError:
+            # Bodies are sent as latin-1, keep non ASCII characters escaped
+            return json.dumps(obj)
+        return encoded
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(Codec):
+    """Codec using ujson."""
+
+    name = 'ujson'
+
+    def encode(self, obj):
+        return ujson.dumps(obj)
+
+    def decode(self, data):
+        return ujson.loads(data)
+
+
+CODECS = [
+    (OrjsonCodec, lambda: orjson is not None),
+    (UjsonCodec, lambda: ujson is not None),
+    (StdlibCodec, lambda: True),
+]
+
+
+def available_codecs():
+    """Get the names of the codecs that can be used, fastest first."""
+    return [codec.name for codec, available in CODECS if available()]
+
+
+def get_codec(name=None):
+    """Get a codec by name.
+
+    :param name: 'json', 'orjson' or 'ujson', 'auto' for the fastest one
+        installed, None for the standard library
+    :raises ValueError: Unknown codec, or its library is not installed
+    """
+    if name is None:
+        name = StdlibCodec.name
+    for codec, available in CODECS:
+        if name in (codec.name, 'auto') and available():
+            return codec()
+    raise ValueError('JSON codec %s is not available' % name)
@@ -58,3 +58,16 @@ class ResourceAlreadyExistsError(APIError):
 class NetworkError(APIError):
     """Error raised when there is an error from network layer"""
     pass
+
+
+class ReplayError(APIError):
+    """Error raised when no recorded answer matches a query."""
+    pass
+
+
+class WaitTimeoutError(APIError):
+    """Error raised when resources do not reach a status in time."""
+
+    def __init__(self, msg=None, pending=None):
+        APIError.__init__(self, msg)
+        self.pending = pending or {}
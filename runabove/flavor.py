@@ -28,11 +28,11 @@
 """RunAbove flavor service library."""
 from __future__ import absolute_import
 
-from .base import Resource, BaseManagerWithList
+from .base import Resource, BaseManagerWithCatalog
 from .exception import ResourceNotFoundError
 
 
-class FlavorManager(BaseManagerWithList):
+class FlavorManager(BaseManagerWithCatalog):
     """Manage flavors available in RunAbove."""
 
     basepath = '/flavor'
@@ -49,16 +49,13 @@ class FlavorManager(BaseManagerWithList):
                       flavor.get('type'),
                       region)
 
-    def get_by_name(self, flavor_name):
+    def get_by_name(self, flavor_name, region=None):
         """Get a list of flavors named ``flavor_name``
 
         :param flavor_name: name of the flavors to retrieve
+        :param region: only get the flavors of this region if not None
         """
-        flavors = []
-        for flavor in self.list():
-            if flavor.name == flavor_name:
-                flavors.append(flavor)
-        return flavors
+        return self._get_by_name(flavor_name, region)
 
     def get_by_id(self, flavor_id):
         """Get a flavor by its id.
@@ -66,6 +63,9 @@ class FlavorManager(BaseManagerWithList):
         :param flavor_id: ID of the flavor to retrieve
         :raises ResourceNotFoundError: Flavor does not exist
         """
+        flavor = self._get_cached_by_id(flavor_id)
+        if flavor is not None:
+            return flavor
         url = self.basepath + '/' + self._api.encode_for_api(flavor_id)
         flavor = self._api.get(url)
         return self._dict_to_obj(flavor)
@@ -74,6 +74,9 @@ class FlavorManager(BaseManagerWithList):
 class Flavor(Resource):
     """Represents one flavor."""
 
+    __slots__ = ('_manager', 'id', 'disk', 'name', 'ram', 'vcpus', 'type',
+                 'region')
+
     def __init__(self, manager, flavor_id, disk,
                  name, ram, vcpus, type, region):
         self._manager = manager
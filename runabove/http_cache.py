@@ -0,0 +1,211 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Cache of the answers of the API to GET calls.
+
+Catalogs such as regions, flavors, images or SSH keys rarely change. A
+`ResponseCache` given to the `WrapperApi` keeps their decoded answers:
+they are served from memory while fresh, then revalidated with a
+conditional query using their ETag or Last-Modified date so that
+unchanged answers are neither downloaded nor decoded again.
+
+Only the paths listed in `cacheable` are cached, the catalogs by default.
+Tokens, instances and the account change on their own and are never
+cached. Each call served from the cache gets its own copy of the answer.
+"""
+from __future__ import absolute_import
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+#: Paths cached by default, with the paths below them
+DEFAULT_CACHEABLE = ('/region', '/flavor', '/image', '/ssh')
+
+#: Paths never cached, their answers change without any call to the API
+NEVER_CACHED = ('/token', '/instance', '/me')
+
+
+class CachedResponse(object):
+    """Decoded answer of the API with its validators."""
+
+    __slots__ = ('value', 'etag', 'last_modified', 'stored_at')
+
+    def __init__(self, value, etag=None, last_modified=None):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time()
+
+    def validators(self):
+        """Get the headers making a query conditional."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def copy(self):
+        """Get a copy of the answer that the caller can modify."""
+        return copy.deepcopy(self.value)
+
+
+class ResponseCache(object):
+    """LRU cache of the answers to GET calls.
+
+    Answers are fresh for `freshness` seconds, during which they are
+    served without calling the API. Afterwards they are revalidated if
+    they have an ETag or a Last-Modified date, downloaded again
+    otherwise. Any other call on a collection, such as a POST on
+    '/instance', invalidates the cached answers of this collection.
+    """
+
+    def __init__(self, max_entries=256, freshness=0,
+                 cacheable=DEFAULT_CACHEABLE):
+        """Build an empty cache.
+
+        :param max_entries: number of answers kept, the least recently
+            used ones are evicted first
+        :param freshness: seconds during which an answer is used without
+            being revalidated
+        :param cacheable: paths whose answers are cached, with the paths
+            below them. Paths in `NEVER_CACHED` are ignored.
+        """
+        self.max_entries = max_entries
+        self.freshness = freshness
+        self.cacheable = tuple(prefix for prefix in cacheable
+                               if not self._below(prefix, NEVER_CACHED))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidated': 0, 'misses': 0,
+                       'evictions': 0, 'invalidations': 0}
+
+    @staticmethod
+    def key(path, content=None):
+        """Get the key of a call, its content being part of the query."""
+        if not content:
+            return path, ''
+        return path, json.dumps(content, sort_keys=True)
+
+    @staticmethod
+    def _below(path, prefixes):
+        """Tell if a path is one of `prefixes` or below one of them."""
+        path = path.split('?', 1)[0]
+        for prefix in prefixes:
+            if path == prefix or path.startswith(prefix.rstrip('/') + '/'):
+                return True
+        return False
+
+    def is_cacheable(self, path):
+        """Tell if the answers of GET calls on `path` are cached."""
+        return self._below(path, self.cacheable) and \
+            not self._below(path, NEVER_CACHED)
+
+    @staticmethod
+    def _collection(path):
+        """Get the collection of a path, 'instance' for '/instance/abc'."""
+        return path.split('?', 1)[0].strip('/').split('/', 1)[0]
+
+    def get(self, key):
+        """Get a cached answer, None if not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            # Move the entry to the end, the most recently used
+            del self._entries[key]
+            self._entries[key] = entry
+            return entry
+
+    def is_fresh(self, entry):
+        """Tell if an answer can be used without revalidating it."""
+        fresh = time.time() - entry.stored_at < self.freshness
+        if fresh:
+            with self._lock:
+                self._stats['hits'] += 1
+        return fresh
+
+    def store(self, key, value, headers):
+        """Cache an answer.
+
+        Answers without validators are only kept when they can be fresh
+        for a while.
+
+        :param key: key of the call
+        :param value: decoded answer, copied so that the caller can
+            modify it
+        :param headers: headers of the answer
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified or self.freshness > 0):
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = CachedResponse(copy.deepcopy(value), etag,
+                                                last_modified)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def revalidated(self, entry):
+        """Mark an answer as confirmed unchanged by the API."""
+        with self._lock:
+            entry.stored_at = time.time()
+            self._stats['revalidated'] += 1
+
+    def invalidate(self, path=None):
+        """Drop the cached answers of the collection of `path`.
+
+        :param path: path of a call, None to drop every answer
+        """
+        with self._lock:
+            if path is None:
+                keys = list(self._entries)
+            else:
+                collection = self._collection(path)
+                keys = [key for key in self._entries
+                        if self._collection(key[0]) == collection]
+            for key in keys:
+                del self._entries[key]
+            self._stats['invalidations'] += len(keys)
+
+    def stats(self):
+        """Get the number of answers cached, served and evicted.
+
+        `hits` are answers served without calling the API, `revalidated`
+        are answers confirmed unchanged by a conditional query and
+        `misses` are calls for which nothing was cached.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            return stats
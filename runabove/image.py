@@ -28,10 +28,10 @@
 """RunAbove image service library."""
 from __future__ import absolute_import
 
-from .base import Resource, BaseManagerWithList
+from .base import Resource, BaseManagerWithCatalog
 
 
-class ImageManager(BaseManagerWithList):
+class ImageManager(BaseManagerWithCatalog):
     """Manage images available in RunAbove."""
 
     basepath = '/image'
@@ -41,20 +41,20 @@ class ImageManager(BaseManagerWithList):
 
         :param image_id: ID of the image to retrieve
         """
+        image = self._get_cached_by_id(image_id)
+        if image is not None:
+            return image
         url = self.basepath + '/' + self._api.encode_for_api(image_id)
         image = self._api.get(url)
         return self._dict_to_obj(image)
 
-    def get_by_name(self, image_name):
+    def get_by_name(self, image_name, region=None):
         """Get a list of images named ``image_name``
 
         :param image_name: name of the images to retrieve
+        :param region: only get the images of this region if not None
         """
-        images = []
-        for image in self.list():
-            if image.name == image_name:
-                images.append(image)
-        return images
+        return self._get_by_name(image_name, region)
 
     def _dict_to_obj(self, key):
         """Converts a dict to an image object."""
@@ -69,6 +69,8 @@ class ImageManager(BaseManagerWithList):
 class Image(Resource):
     """Represents one image."""
 
+    __slots__ = ('_manager', 'id', 'name', 'region', 'visibility')
+
     def __init__(self, manager, id, name, region, visibility):
         self._manager = manager
         self.id = id
@@ -28,8 +28,14 @@
 """RunAbove instance service library."""
 from __future__ import absolute_import
 
+from collections import namedtuple
+from concurrent import futures
+
 from .base import Resource, BaseManagerWithList
 from .exception import ResourceNotFoundError
+from .waiter import InstanceWaiter
+
+CreateResult = namedtuple('CreateResult', ['spec', 'instance', 'error'])
 
 
 class InstanceManager(BaseManagerWithList):
@@ -37,6 +43,77 @@ class InstanceManager(BaseManagerWithList):
 
     basepath = '/instance'
 
+    def list(self, prefetch=False):
+        """Get a list of instances in an account.
+
+        :param prefetch: If True resolve the flavors, images and SSH keys
+            of all the instances at once, see `prefetch`
+        """
+        instances = super(InstanceManager, self).list()
+        if prefetch:
+            self.prefetch(instances)
+        return instances
+
+    def list_by_region(self, region, prefetch=False):
+        """Get a list of instances in a region.
+
+        :param region: Name or object region of the instances
+        :param prefetch: If True resolve the flavors, images and SSH keys
+            of all the instances at once, see `prefetch`
+        """
+        instances = super(InstanceManager, self).list_by_region(region)
+        if prefetch:
+            self.prefetch(instances)
+        return instances
+
+    def prefetch(self, instances):
+        """Attach flavors, images and SSH keys to instances.
+
+        Each catalog is listed with a single call, and only when at least
+        one instance still has to load the corresponding object, instead
+        of one call per instance when the attributes are accessed. Objects
+        missing from a catalog are left to be loaded lazily.
+
+        :param instances: Instance objects to complete
+        """
+        instances = list(instances)
+        catalogs = dict((name, getattr(self._handler, name).list())
+                        for name in self._prefetch_needed(instances))
+        self._prefetch_attach(instances, catalogs)
+        return instances
+
+    @staticmethod
+    def _prefetch_needed(instances):
+        """Get the names of the catalogs some instances still need."""
+        needed = []
+        if any(i._flavor is None and i._flavor_id for i in instances):
+            needed.append('flavors')
+        if any(i._image is None and i._image_id for i in instances):
+            needed.append('images')
+        if any(i._ssh_key is None and i._ssh_key_name for i in instances):
+            needed.append('ssh_keys')
+        return needed
+
+    @staticmethod
+    def _prefetch_attach(instances, catalogs):
+        """Attach the objects of listed catalogs to instances.
+
+        :param catalogs: dict of the objects of each catalog listed,
+            indexed by catalog name
+        """
+        flavors = dict((f.id, f) for f in catalogs.get('flavors', ()))
+        images = dict((im.id, im) for im in catalogs.get('images', ()))
+        ssh_keys = dict(((k.region.name, k.name), k)
+                        for k in catalogs.get('ssh_keys', ()))
+        for instance in instances:
+            if instance._flavor is None:
+                instance._flavor = flavors.get(instance._flavor_id)
+            if instance._image is None:
+                instance._image = images.get(instance._image_id)
+            if instance._ssh_key is None and instance._ssh_key_name:
+                instance._ssh_key = ssh_keys.get((instance.region.name,
+                                                  instance._ssh_key_name))
+
     def get_by_id(self, instance_id):
         """Get one instance from a RunAbove account.
 
@@ -126,6 +203,12 @@ class InstanceManager(BaseManagerWithList):
         :param image: ID or object image for the instance
         :param ssh_key: Name or object SSH key to install
         """
+        content = self._create_content(region, name, flavor, image, ssh_key)
+        instance_id = self._api.post(self.basepath, content)['instanceId']
+        return self.get_by_id(instance_id)
+
+    def _create_content(self, region, name, flavor, image, ssh_key=None):
+        """Build the content of the request creating an instance."""
         try:
             region_name = region.name
         except AttributeError:
@@ -149,8 +232,86 @@ class InstanceManager(BaseManagerWithList):
                 content['sshKeyName'] = ssh_key.name
             except AttributeError:
                 content['sshKeyName'] = ssh_key
-        instance_id = self._api.post(self.basepath, content)['instanceId']
-        return self.get_by_id(instance_id)
+        return content
+
+    def create_many(self, specs, max_in_flight=4, enrich=True):
+        """Launch many instances concurrently.
+
+        Results are yielded as soon as each instance is created, in
+        completion order. Errors do not stop the other creations, they
+        are returned with the spec that failed.
+
+        :param specs: iterable of dicts with the arguments of `create`
+            (region, name, flavor, image and optionally ssh_key)
+        :param max_in_flight: Maximum number of creations running at once
+        :param enrich: If False do not get each new instance after its
+            creation, the instance returned is built from the spec only
+            and its other attributes are loaded lazily
+        :returns: an iterator of CreateResult (spec, instance, error)
+        """
+        executor = futures.ThreadPoolExecutor(max_workers=max_in_flight)
+        try:
+            pending = set()
+            for spec in specs:
+                if len(pending) >= max_in_flight:
+                    done, pending = futures.wait(
+                        pending, return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(executor.submit(self._create_one, spec, enrich))
+            for future in futures.as_completed(pending):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True)
+
+    def _create_one(self, spec, enrich):
+        """Create one instance for `create_many`."""
+        try:
+            content = self._create_content(**spec)
+            instance_id = self._api.post(self.basepath, content)['instanceId']
+        except Exception as e:
+            return CreateResult(spec, None, e)
+        instance = self._created_to_obj(instance_id, content)
+        if enrich:
+            try:
+                instance = self.get_by_id(instance_id)
+            except Exception as e:
+                # The instance exists, return what is known about it
+                return CreateResult(spec, instance, e)
+        return CreateResult(spec, instance, None)
+
+    def _created_to_obj(self, instance_id, content):
+        """Build a new instance from the content of its creation."""
+        return Instance(self,
+                        instance_id,
+                        content['name'],
+                        None,
+                        self._handler.regions._name_to_obj(content['region']),
+                        content['flavorId'],
+                        content['imageId'],
+                        content.get('sshKeyName'),
+                        None,
+                        None)
+
+    def wait_for(self, instances, status='ACTIVE', timeout=600,
+                 callback=None):
+        """Wait for instances to reach a status.
+
+        Instances are polled with one list call per region, see
+        `InstanceWaiter` for a finer control.
+
+        :param instances: Instance objects to wait for
+        :param status: status to wait for, 'DELETED' to wait for deletion
+        :param timeout: seconds after which waiting is abandoned
+        :param callback: called with the instance, its previous status
+            and its new status on each change
+        :returns: a dict of the final statuses, indexed by instance id
+        :raises WaitTimeoutError: Instances did not reach the status in time
+        """
+        waiter = InstanceWaiter(self)
+        for instance in instances:
+            waiter.add(instance, status)
+        return waiter.wait(timeout, callback)
 
     def rename(self, instance, new_name):
         """Rename an existing instance.
@@ -184,6 +345,10 @@ class InstanceManager(BaseManagerWithList):
 class Instance(Resource):
     """Represents one instance."""
 
+    __slots__ = ('_manager', 'id', 'name', 'ip', 'created', 'status', 'region',
+                 '_flavor_id', '_flavor', '_image_id', '_image',
+                 '_ssh_key_name', '_ssh_key', '_vnc', '_ips')
+
     def __init__(self, manager, id, name, ip, region, flavor_id, image_id,
                  ssh_key_name, status, created, ips=None,
                  flavor=None, image=None, ssh_key=None):
@@ -269,6 +434,19 @@ class Instance(Resource):
             self._vnc = self._manager._load_vnc(self)
         return self._vnc
 
+    def wait_for(self, status='ACTIVE', timeout=600, callback=None):
+        """Wait for the instance to reach a status.
+
+        :param status: status to wait for, 'DELETED' to wait for deletion
+        :param timeout: seconds after which waiting is abandoned
+        :param callback: called with the instance, its previous status
+            and its new status on each change
+        :returns: the final status of the instance
+        :raises WaitTimeoutError: Instance did not reach the status in time
+        """
+        return self._manager.wait_for([self], status, timeout,
+                                      callback)[self.id]
+
     def delete(self):
         """Delete instance represented by this object from the account."""
         self._manager.delete(self)
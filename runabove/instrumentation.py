@@ -0,0 +1,250 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Observe the calls made to the API.
+
+Observers registered on a `WrapperApi` are notified before and after each
+call with a `CallInfo` describing it. `HistogramCollector` aggregates
+calls in memory and `PrometheusExporter` renders them in the Prometheus
+text format. When no observer is registered, calls are not timed.
+"""
+from __future__ import absolute_import
+
+import threading
+
+ID_COLLECTIONS = ('instance', 'flavor', 'image', 'ssh', 'storage')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PHASES = ('encode', 'sign', 'queue', 'response', 'transfer', 'retry_wait',
+          'decode')
+
+
+def path_template(path):
+    """Replace the identifiers in a path by placeholders.
+
+    '/instance/8c687d5d/vnc' becomes '/instance/{id}/vnc' so that calls on
+    different resources are aggregated together.
+
+    :param path: path of a call, with or without query string
+    """
+    segments = path.split('?', 1)[0].strip('/').split('/')
+    if len(segments) > 1 and segments[0] in ID_COLLECTIONS:
+        segments[1] = '{id}'
+    return '/' + '/'.join(segments)
+
+
+class CallInfo(object):
+    """Description of one call, filled while the call is made.
+
+    `timings` holds the seconds spent in each phase of the call:
+    encoding the body, signing it (including getting the clock skew),
+    waiting for the rate limiter, waiting for the response headers,
+    transferring the response, waiting between retries and decoding
+    the response. `total` is the duration of the whole call.
+
+    There is no phase for connecting: `response` is the delay measured
+    by requests, so it includes opening the connection and the TLS
+    handshake whenever no pooled connection could be reused.
+    """
+
+    __slots__ = ('method', 'path', 'template', 'status', 'attempts',
+                 'request_bytes', 'response_bytes', 'timings', 'total',
+                 'error')
+
+    def __init__(self, method, path):
+        self.method = method.upper()
+        self.path = path
+        self.template = path_template(path)
+        self.status = None
+        self.attempts = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.timings = dict((phase, 0.0) for phase in PHASES)
+        self.total = 0.0
+        self.error = None
+
+    def add_timing(self, phase, seconds):
+        """Add seconds spent in a phase."""
+        self.timings[phase] += seconds
+
+
+class Observer(object):
+    """Base class of call observers, its methods do nothing."""
+
+    def before_call(self, info):
+        """Called before a call is made.
+
+        :param info: CallInfo of the call, only its method and paths are
+            known at this point
+        """
+        pass
+
+    def after_call(self, info):
+        """Called after a call, whether it succeeded or not.
+
+        :param info: CallInfo of the call, `error` is the exception raised
+            if the call failed
+        """
+        pass
+
+
+class HistogramCollector(Observer):
+    """Aggregate calls in memory by method, path template and status.
+
+    Durations are counted in cumulative buckets like Prometheus
+    histograms, timings and byte counts are summed.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Build an empty collector.
+
+        :param buckets: upper bounds in seconds of the duration buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def after_call(self, info):
+        """Count a call."""
+        status = str(info.status) if info.status is not None else 'error'
+        key = (info.method, info.template, status)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'count': 0,
+                    'sum': 0.0,
+                    'buckets': [0] * len(self.buckets),
+                    'timings': dict((phase, 0.0) for phase in PHASES),
+                    'request_bytes': 0,
+                    'response_bytes': 0
+                }
+            series['count'] += 1
+            series['sum'] += info.total
+            for i, bound in enumerate(self.buckets):
+                if info.total <= bound:
+                    series['buckets'][i] += 1
+            for phase, seconds in info.timings.items():
+                series['timings'][phase] += seconds
+            series['request_bytes'] += info.request_bytes
+            series['response_bytes'] += info.response_bytes
+
+    def snapshot(self):
+        """Get a copy of the series, indexed by (method, template, status).
+
+        Each series has a `count`, the `sum` of the durations, the
+        cumulative counts of `buckets`, the summed `timings` by phase and
+        the summed `request_bytes` and `response_bytes`.
+        """
+        with self._lock:
+            snapshot = {}
+            for key, series in self._series.items():
+                copy = dict(series)
+                copy['buckets'] = list(series['buckets'])
+                copy['timings'] = dict(series['timings'])
+                snapshot[key] = copy
+            return snapshot
+
+    def reset(self):
+        """Forget every call collected."""
+        with self._lock:
+            self._series = {}
+
+
+class PrometheusExporter(object):
+    """Render the calls of a HistogramCollector as Prometheus metrics."""
+
+    def __init__(self, collector, prefix='runabove_api'):
+        """Build an exporter.
+
+        :param collector: HistogramCollector to export
+        :param prefix: prefix of the names of the metrics
+        """
+        self.collector = collector
+        self.prefix = prefix
+
+    @staticmethod
+    def _escape(value):
+        """Escape a label value."""
+        return value.replace('\\', '\\\\').replace('"', '\\"')\
+            .replace('\n', '\\n')
+
+    @classmethod
+    def _labels(cls, **labels):
+        """Format labels, sorted by name."""
+        return '{' + ','.join('%s="%s"' % (name, cls._escape(labels[name]))
+                              for name in sorted(labels)) + '}'
+
+    @staticmethod
+    def _number(value):
+        """Format a sample value."""
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def render(self):
+        """Get the metrics in the Prometheus text exposition format."""
+        series = sorted(self.collector.snapshot().items())
+        buckets = self.collector.buckets
+        duration = self.prefix + '_call_duration_seconds'
+        phases = self.prefix + '_call_phase_seconds_total'
+        lines = [
+            '# HELP %s Duration of the calls to the API.' % duration,
+            '# TYPE %s histogram' % duration,
+        ]
+        for (method, template, status), values in series:
+            labels = {'method': method, 'path': template, 'status': status}
+            for bound, count in zip(buckets, values['buckets']):
+                lines.append('%s_bucket%s %d' % (
+                    duration, self._labels(le=self._number(float(bound)),
+                                           **labels), count))
+            lines.append('%s_bucket%s %d' % (
+                duration, self._labels(le='+Inf', **labels),
+                values['count']))
+            lines.append('%s_sum%s %s' % (duration, self._labels(**labels),
+                                          self._number(values['sum'])))
+            lines.append('%s_count%s %d' % (duration, self._labels(**labels),
+                                            values['count']))
+        lines.append('# HELP %s Time spent in each phase of the calls.'
+                     % phases)
+        lines.append('# TYPE %s counter' % phases)
+        for (method, template, status), values in series:
+            for phase in PHASES:
+                lines.append('%s%s %s' % (
+                    phases, self._labels(method=method, path=template,
+                                         status=status, phase=phase),
+                    self._number(values['timings'][phase])))
+        for direction in ('request', 'response'):
+            name = '%s_%s_bytes_total' % (self.prefix, direction)
+            lines.append('# HELP %s Bytes of the %s bodies.'
+                         % (name, direction))
+            lines.append('# TYPE %s counter' % name)
+            for (method, template, status), values in series:
+                lines.append('%s%s %d' % (
+                    name, self._labels(method=method, path=template,
+                                       status=status),
+                    values[direction + '_bytes']))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,837 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Local stand-in of the RunAbove API, to test and benchmark the SDK.
+
+`LocalApiServer` answers the calls of the SDK from an in-memory state
+without any RunAbove account: /time, /auth/credential, /instance,
+/flavor, /image, /region, /ssh, /me, /me/balance and /token. Queries
+must be signed like with the real API. The object storage endpoints of
+the token catalog serve a minimal Swift API: containers and objects can
+be created, listed, read by range and deleted. Latency and errors can be
+injected to test the retries, rate limiting and concurrency of
+clients::
+
+    with LocalApiServer(latency=0.05, error_rate=0.01) as server:
+        client = server.client()
+        client.instances.list()
+
+It can also be started from the command line with
+``python -m runabove.local_server``.
+"""
+from __future__ import absolute_import
+
+import bisect
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    from urllib import unquote
+    from urlparse import parse_qs
+except ImportError:  # Python 3
+    from urllib.parse import unquote, parse_qs
+
+from .instrumentation import path_template
+
+API_VERSION = '/1.0'
+
+SWIFT_PREFIX = '/swift/'
+
+SWIFT_TEMPLATE = ['', 'swift', '{region}', 'v1', '{account}', '{container}',
+                  '{object}']
+
+#: Maximum difference in seconds between the time of a query and the
+#: time of the server
+MAX_SKEW = 300
+
+REGIONS = ['BHS-1', 'SBG-1']
+
+FLAVORS = [
+    # name, disk, ram, vcpus, type
+    ('ra.intel.sb.l', 240, 16384, 6, 'ra.sb'),
+    ('ra.intel.ha.s', 20, 2048, 1, 'ra.s'),
+    ('ra.intel.ha.m', 40, 4096, 2, 'ra.m'),
+]
+
+IMAGES = ['Debian 7', 'Ubuntu 14.04', 'CentOS 7']
+
+
+class ApiError(Exception):
+    """Error answered by the stand-in."""
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+        self.message = message
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Pass the queries of one connection to the LocalApiServer."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, do not wait for an ACK
+    # between them on kept-alive connections
+    disable_nagle_algorithm = True
+
+    def _read_body(self):
+        """Read the body of the query, chunked or not."""
+        if 'chunked' in (self.headers.get('Transfer-Encoding') or ''):
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _handle(self):
+        body = self._read_body()
+        status, content, headers = self.server.api.handle(
+            self.command, self.path, self.headers, body)
+        if not isinstance(content, bytes):
+            content = content.encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if 'Content-Length' not in headers:
+            self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LocalApiServer(object):
+    """In-memory stand-in of the RunAbove API served over HTTP.
+
+    The server runs in a background thread between `start` and `stop`,
+    or in a ``with`` block.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0,
+                 application_key='local-application-key',
+                 application_secret='local-application-secret',
+                 consumer_key='local-consumer-key', latency=0,
+                 error_rate=0, error_status=503, build_time=0,
+                 token_ttl=3600):
+        """Build a stand-in with a seeded catalog and no instance.
+
+        :param host: address to listen on
+        :param port: port to listen on, 0 for any free port
+        :param application_key: key of the application accepted
+        :param application_secret: secret of the application
+        :param consumer_key: consumer key already validated
+        :param latency: seconds waited before answering, or a (min, max)
+            tuple of a random latency
+        :param error_rate: fraction of the queries answered with
+            `error_status`, /time is never failed
+        :param error_status: HTTP status of the injected errors
+        :param build_time: seconds an instance stays in status BUILD
+        :param token_ttl: seconds during which a token is valid
+        """
+        self.host = host
+        self.port = port
+        self.application_key = application_key
+        self.application_secret = application_secret
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.build_time = build_time
+        self.token_ttl = token_ttl
+        self._consumer_keys = set([consumer_key])
+        self.consumer_key = consumer_key
+        self._lock = threading.Lock()
+        self._forced_errors = []
+        self._requests = {}
+        self._httpd = None
+        self._thread = None
+        self._routes = [
+            ('GET', r'/time', self._get_time),
+            ('POST', r'/auth/credential', self._post_credential),
+            ('GET', r'/region', self._get_regions),
+            ('GET', r'/flavor', self._get_flavors),
+            ('GET', r'/flavor/([^/]+)', self._get_flavor),
+            ('GET', r'/image', self._get_images),
+            ('GET', r'/image/([^/]+)', self._get_image),
+            ('GET', r'/ssh', self._get_ssh_keys),
+            ('POST', r'/ssh', self._post_ssh_key),
+            ('GET', r'/ssh/([^/]+)', self._get_ssh_key),
+            ('DELETE', r'/ssh/([^/]+)', self._delete_ssh_key),
+            ('GET', r'/instance', self._get_instances),
+            ('POST', r'/instance', self._post_instance),
+            ('GET', r'/instance/([^/]+)', self._get_instance),
+            ('PUT', r'/instance/([^/]+)', self._put_instance),
+            ('DELETE', r'/instance/([^/]+)', self._delete_instance),
+            ('GET', r'/instance/([^/]+)/vnc', self._get_vnc),
+            ('GET', r'/me', self._get_me),
+            ('GET', r'/me/balance', self._get_balance),
+            ('GET', r'/token', self._get_token),
+        ]
+        self._seed()
+
+    def _seed(self):
+        """Fill the catalog of every region."""
+        self.regions = list(REGIONS)
+        self.flavors = {}
+        self.images = {}
+        for region in self.regions:
+            for name, disk, ram, vcpus, flavor_type in FLAVORS:
+                flavor_id = str(uuid.uuid4())
+                self.flavors[flavor_id] = {
+                    'id': flavor_id, 'name': name, 'disk': disk, 'ram': ram,
+                    'vcpus': vcpus, 'type': flavor_type, 'region': region
+                }
+            for name in IMAGES:
+                image_id = str(uuid.uuid4())
+                self.images[image_id] = {
+                    'id': image_id, 'name': name, 'region': region,
+                    'visibility': 'public'
+                }
+        self.ssh_keys = {}
+        self.instances = {}
+        self.project_id = uuid.uuid4().hex
+        self.account = {
+            'accountIdentifier': 'local@runabove.com',
+            'email': 'local@runabove.com',
+            'firstname': 'Local',
+            'name': 'User',
+            'address': None,
+            'city': None,
+            'postalCode': None,
+            'area': None,
+            'country': 'FR',
+            'cellNumber': None
+        }
+        self.credit = 100.0
+        self.tokens = set()
+        # (region, container name) to a dict of the object names to
+        # (content, headers), with the sorted names to list them
+        self.containers = {}
+        self._object_names = {}
+
+    @property
+    def root_url(self):
+        """URL of the server, available once started."""
+        return 'http://%s:%d' % (self.host, self.port)
+
+    @property
+    def base_url(self):
+        """URL of the API to give to the SDK."""
+        return self.root_url + API_VERSION
+
+    def start(self):
+        """Listen and answer queries in a background thread."""
+        self._httpd = _ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.api = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop answering queries."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self, **options):
+        """Get a Runabove client of this server.
+
+        :param options: extra options given to the WrapperApi
+        """
+        from .client import Runabove
+        return Runabove(self.application_key, self.application_secret,
+                        self.consumer_key, base_url=self.base_url,
+                        **options)
+
+    def fail_next(self, status=None, count=1, message='Injected error'):
+        """Answer the next queries with an error.
+
+        :param status: HTTP status of the error, `error_status` if None
+        :param count: number of queries failing
+        """
+        with self._lock:
+            self._forced_errors.extend(
+                [(status or self.error_status, message)] * count)
+
+    def stats(self):
+        """Get the number of queries received by method and path template."""
+        with self._lock:
+            return dict(self._requests)
+
+    def seed_instances(self, count, region='BHS-1', status='ACTIVE'):
+        """Add instances without going through the API.
+
+        :param count: number of instances to add
+        :param region: region of the instances
+        :param status: status of the instances
+        :returns: the ids of the instances
+        """
+        flavor = next(f for f in self.flavors.values()
+                      if f['region'] == region)
+        image = next(i for i in self.images.values()
+                     if i['region'] == region)
+        ids = []
+        with self._lock:
+            for i in range(count):
+                instance = self._new_instance('instance-%d' % i, region,
+                                              flavor['id'], image['id'], None)
+                instance['status'] = status
+                ids.append(instance['instanceId'])
+        return ids
+
+    def handle(self, method, raw_path, headers, body):
+        """Answer a query.
+
+        :returns: a tuple of the status, the body and the headers
+        """
+        path = raw_path.split('?', 1)[0]
+        if path.startswith(API_VERSION):
+            path = path[len(API_VERSION):]
+        with self._lock:
+            key = (method, self._template(path))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            # The clock is never failed: clients could not sign queries
+            # and do not retry it
+            injected = path != '/time'
+            forced = self._forced_errors.pop(0) \
+                if injected and self._forced_errors else None
+        latency = self.latency
+        if isinstance(latency, tuple):
+            latency = random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+        try:
+            if forced is not None:
+                raise ApiError(*forced)
+            if injected and self.error_rate and \
+                    random.random() < self.error_rate:
+                raise ApiError(self.error_status, 'Injected error')
+            if path.startswith(SWIFT_PREFIX):
+                return self._swift(method, raw_path, headers, body)
+            return self._route(method, path, raw_path, headers, body)
+        except ApiError as e:
+            return (e.status, json.dumps({'message': e.message}),
+                    {'Content-Type': 'application/json'})
+
+    @staticmethod
+    def _template(path):
+        """Get the template of a path, the key of `stats`."""
+        if not path.startswith(SWIFT_PREFIX):
+            return path_template(path)
+        depth = len(path[len(SWIFT_PREFIX):].split('/', 4))
+        return '/'.join(SWIFT_TEMPLATE[:depth + 2])
+
+    def _route(self, method, path, raw_path, headers, body):
+        """Find the handler of a query and call it."""
+        handler = None
+        for route_method, pattern, route_handler in self._routes:
+            match = re.match(pattern + '$', path)
+            if match:
+                if route_method == method:
+                    handler = route_handler
+                    args = [unquote(arg) for arg in match.groups()]
+                    break
+                handler = False
+        if not handler:
+            if handler is False:
+                raise ApiError(405, 'Method not allowed')
+            raise ApiError(404, 'Path not found')
+        if handler not in (self._get_time, self._post_credential):
+            self._check_signature(method, raw_path, headers, body)
+        content = {}
+        if body:
+            try:
+                content = json.loads(body.decode('utf-8'))
+            except ValueError:
+                raise ApiError(400, 'Invalid JSON body')
+        with self._lock:
+            result = handler(content, *args)
+        if isinstance(result, tuple):
+            return result[0], json.dumps(result[1]), {
+                'Content-Type': 'application/json'}
+        if handler == self._get_time:
+            return 200, result, {'Content-Type': 'text/plain'}
+        return 200, json.dumps(result), {'Content-Type': 'application/json'}
+
+    def _check_signature(self, method, raw_path, headers, body):
+        """Check a query is signed like the real API expects.
+
+        :raises ApiError: The query is not correctly signed
+        """
+        if headers.get('X-Ra-Application') != self.application_key:
+            raise ApiError(403, 'Invalid application key')
+        consumer_key = headers.get('X-Ra-Consumer')
+        if consumer_key not in self._consumer_keys:
+            raise ApiError(403, 'Invalid consumer key')
+        timestamp = headers.get('X-Ra-Timestamp', '')
+        if not timestamp.isdigit() or \
+                abs(int(timestamp) - time.time()) > MAX_SKEW:
+            raise ApiError(403, 'Invalid timestamp')
+        s1 = hashlib.sha1()
+        s1.update(b'+'.join([
+            self.application_secret.encode('utf-8'),
+            consumer_key.encode('utf-8'),
+            method.encode('utf-8'),
+            (self.root_url + raw_path).encode('utf-8'),
+            body,
+            timestamp.encode('utf-8')
+        ]))
+        if headers.get('X-Ra-Signature') != '$1$' + s1.hexdigest():
+            raise ApiError(403, 'Invalid signature')
+
+    @staticmethod
+    def _region_of(content, required=False):
+        region = content.get('region')
+        if required and not region:
+            raise ApiError(400, 'Missing region')
+        return region
+
+    def _get_time(self, content):
+        return str(int(time.time()))
+
+    def _post_credential(self, content):
+        consumer_key = uuid.uuid4().hex
+        self._consumer_keys.add(consumer_key)
+        return {
+            'consumerKey': consumer_key,
+            'state': 'pendingValidation',
+            'validationUrl': self.root_url + '/login/' + consumer_key
+        }
+
+    def _get_regions(self, content):
+        return list(self.regions)
+
+    def _get_flavors(self, content):
+        region = self._region_of(content)
+        return [f for f in self.flavors.values()
+                if region is None or f['region'] == region]
+
+    def _get_flavor(self, content, flavor_id):
+        if flavor_id not in self.flavors:
+            raise ApiError(404, 'Flavor not found')
+        return self.flavors[flavor_id]
+
+    def _get_images(self, content):
+        region = self._region_of(content)
+        return [i for i in self.images.values()
+                if region is None or i['region'] == region]
+
+    def _get_image(self, content, image_id):
+        if image_id not in self.images:
+            raise ApiError(404, 'Image not found')
+        return self.images[image_id]
+
+    def _get_ssh_keys(self, content):
+        region = self._region_of(content)
+        return [k for k in self.ssh_keys.values()
+                if region is None or k['region'] == region]
+
+    def _post_ssh_key(self, content):
+        region = self._region_of(content, required=True)
+        name = content.get('name')
+        if not name or not content.get('publicKey'):
+            raise ApiError(400, 'Missing name or public key')
+        if (region, name) in self.ssh_keys:
+            raise ApiError(409, 'Key already exists')
+        self.ssh_keys[(region, name)] = {
+            'name': name,
+            'publicKey': content['publicKey'],
+            'fingerPrint': hashlib.md5(
+                content['publicKey'].encode('utf-8')).hexdigest(),
+            'region': region
+        }
+        return {}
+
+    def _find_ssh_key(self, content, name):
+        region = self._region_of(content, required=True)
+        if (region, name) not in self.ssh_keys:
+            raise ApiError(404, 'Key not found')
+        return region, name
+
+    def _get_ssh_key(self, content, name):
+        return self.ssh_keys[self._find_ssh_key(content, name)]
+
+    def _delete_ssh_key(self, content, name):
+        del self.ssh_keys[self._find_ssh_key(content, name)]
+        return {}
+
+    def _new_instance(self, name, region, flavor_id, image_id, key_name):
+        instance_id = str(uuid.uuid4())
+        number = len(self.instances) + 1
+        instance = {
+            'instanceId': instance_id,
+            'name': name,
+            'ip': '10.%d.%d.%d' % (number >> 16 & 255, number >> 8 & 255,
+                                   number & 255),
+            'flavorId': flavor_id,
+            'imageId': image_id,
+            'keyName': key_name,
+            'status': 'BUILD',
+            'created': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'region': region,
+            '_ready_at': time.time() + self.build_time
+        }
+        self.instances[instance_id] = instance
+        return instance
+
+    def _public_instance(self, instance):
+        """Get an instance as listed, making it active once built."""
+        if instance['status'] == 'BUILD' and \
+                time.time() >= instance['_ready_at']:
+            instance['status'] = 'ACTIVE'
+        return dict((key, value) for key, value in instance.items()
+                    if not key.startswith('_'))
+
+    def _find_instance(self, instance_id):
+        if instance_id not in self.instances:
+            raise ApiError(404, 'Instance not found')
+        return self.instances[instance_id]
+
+    def _get_instances(self, content):
+        region = self._region_of(content)
+        return [self._public_instance(i) for i in self.instances.values()
+                if region is None or i['region'] == region]
+
+    def _post_instance(self, content):
+        region = self._region_of(content, required=True)
+        if region not in self.regions:
+            raise ApiError(400, 'Unknown region')
+        if not content.get('name'):
+            raise ApiError(400, 'Missing name')
+        flavor = self.flavors.get(content.get('flavorId'))
+        image = self.images.get(content.get('imageId'))
+        if flavor is None or flavor['region'] != region:
+            raise ApiError(400, 'Unknown flavor')
+        if image is None or image['region'] != region:
+            raise ApiError(400, 'Unknown image')
+        key_name = content.get('sshKeyName')
+        if key_name and (region, key_name) not in self.ssh_keys:
+            raise ApiError(404, 'Key not found')
+        instance = self._new_instance(content['name'], region, flavor['id'],
+                                      image['id'], key_name)
+        return {'instanceId': instance['instanceId']}
+
+    def _get_instance(self, content, instance_id):
+        instance = self._public_instance(self._find_instance(instance_id))
+        key = self.ssh_keys.get((instance['region'], instance['keyName']))
+        return {
+            'instanceId': instance['instanceId'],
+            'name': instance['name'],
+            'ipv4': instance['ip'],
+            'ips': [{'ip': instance['ip'], 'type': 'public'}],
+            'created': instance['created'],
+            'status': instance['status'],
+            'flavor': self.flavors.get(instance['flavorId']),
+            'image': self.images.get(instance['imageId']),
+            'sshKey': key,
+            'region': instance['region']
+        }
+
+    def _put_instance(self, content, instance_id):
+        instance = self._find_instance(instance_id)
+        if not content.get('name'):
+            raise ApiError(400, 'Missing name')
+        instance['name'] = content['name']
+        return {}
+
+    def _delete_instance(self, content, instance_id):
+        self._find_instance(instance_id)
+        del self.instances[instance_id]
+        return {}
+
+    def _get_vnc(self, content, instance_id):
+        self._find_instance(instance_id)
+        return {'url': self.root_url + '/vnc/' + instance_id}
+
+    def _get_me(self, content):
+        return self.account
+
+    def _get_balance(self, content):
+        total = round(len(self.instances) * 0.02, 2)
+        return {
+            'currentUsages': [
+                {'projectId': self.project_id, 'currentTotal': total}
+            ],
+            'creditLeft': round(self.credit - total, 2)
+        }
+
+    def _get_token(self, content):
+        now = datetime.utcnow()
+        date_format = '%Y-%m-%dT%H:%M:%S.%fZ'
+        auth_token = uuid.uuid4().hex
+        self.tokens.add(auth_token)
+        return {
+            'X-Auth-Token': auth_token,
+            'token': {
+                'catalog': [{
+                    'type': 'object-store',
+                    'id': 'object-store',
+                    'endpoints': [{
+                        'id': region,
+                        'interface': 'public',
+                        'region': region,
+                        'url': '%s/swift/%s/v1/AUTH_%s' % (
+                            self.root_url, region, self.project_id)
+                    } for region in self.regions]
+                }],
+                'issued_at': now.strftime(date_format),
+                'expires_at': (now + timedelta(seconds=self.token_ttl))
+                .strftime(date_format),
+                'methods': ['manager'],
+                'project': {'id': self.project_id, 'name': 'local',
+                            'domain': {'name': 'Default'}},
+                'roles': [{'id': 'member', 'name': '_member_'}],
+                'user': {'id': 'local', 'name': self.account['email'],
+                         'domain': {'name': 'Default'}}
+            }
+        }
+
+    def _swift(self, method, raw_path, headers, body):
+        """Answer a query to the object storage of a region.
+
+        Paths are /swift/<region>/v1/AUTH_<project>[/<container>[/<object>]]
+        and need a token got from /token.
+        """
+        path, _, query = raw_path.partition('?')
+        parts = path[len(SWIFT_PREFIX):].split('/', 4)
+        if len(parts) < 3 or parts[0] not in self.regions or \
+                parts[2] != 'AUTH_' + self.project_id:
+            raise ApiError(404, 'Account not found')
+        if headers.get('X-Auth-Token') not in self.tokens:
+            return 401, '', {}
+        region = parts[0]
+        container = unquote(parts[3]) if len(parts) > 3 else None
+        name = unquote(parts[4]) if len(parts) > 4 else None
+        query = dict((key, values[0]) for key, values in
+                     parse_qs(query, keep_blank_values=True).items())
+        with self._lock:
+            if not container:
+                raise ApiError(405, 'Method not allowed')
+            if name is None:
+                return self._swift_container(method, region, container,
+                                             query, headers)
+            return self._swift_object(method, region, container, name,
+                                      headers, body)
+
+    def _swift_container(self, method, region, container, query, headers):
+        key = (region, container)
+        if method == 'PUT':
+            created = key not in self.containers
+            self.containers.setdefault(key, {})
+            self._object_names.setdefault(key, [])
+            return 201 if created else 202, '', {}
+        if key not in self.containers:
+            return 404, '', {}
+        objects = self.containers[key]
+        if method == 'DELETE':
+            if objects:
+                return 409, '', {}
+            del self.containers[key]
+            del self._object_names[key]
+            return 204, '', {}
+        answer_headers = {
+            'X-Container-Object-Count': str(len(objects)),
+            'X-Container-Bytes-Used': str(sum(
+                len(content) for content, _ in objects.values())),
+        }
+        if method == 'HEAD':
+            return 204, '', answer_headers
+        if method != 'GET':
+            return 405, '', {}
+        listing = self._swift_listing(key, query)
+        answer_headers['Content-Type'] = 'application/json; charset=utf-8'
+        if not listing:
+            return 204, '', answer_headers
+        return 200, json.dumps(listing), answer_headers
+
+    def _swift_listing(self, key, query):
+        """List the objects of a container like Swift does."""
+        names = self._object_names[key]
+        objects = self.containers[key]
+        prefix = query.get('prefix', '')
+        delimiter = query.get('delimiter')
+        end_marker = query.get('end_marker')
+        limit = int(query.get('limit') or 10000)
+        start = max(prefix, query.get('marker', ''))
+        index = bisect.bisect_right(names, start)
+        listing = []
+        while index < len(names) and len(listing) < limit:
+            name = names[index]
+            index += 1
+            if not name.startswith(prefix) or \
+                    (end_marker and name >= end_marker):
+                break
+            if delimiter:
+                position = name.find(delimiter, len(prefix))
+                if position >= 0:
+                    subdir = name[:position + len(delimiter)]
+                    # A marker naming a directory skips all its objects
+                    if subdir > start and (
+                            not listing or
+                            listing[-1].get('subdir') != subdir):
+                        listing.append({'subdir': subdir})
+                    index = bisect.bisect_left(names, subdir + u'\uffff')
+                    continue
+            content, headers = objects[name]
+            listing.append({
+                'name': name,
+                'bytes': len(content),
+                'hash': headers['Etag'],
+                'content_type': headers['Content-Type'],
+                'last_modified': headers['_last_modified']
+            })
+        return listing
+
+    def _swift_object(self, method, region, container, name, headers,
+                      body):
+        key = (region, container)
+        if key not in self.containers:
+            return 404, '', {}
+        objects = self.containers[key]
+        if method == 'PUT':
+            etag = hashlib.md5(body).hexdigest()
+            object_headers = {
+                'Etag': etag,
+                'Content-Type': headers.get('Content-Type') or
+                'application/octet-stream',
+                '_last_modified': datetime.utcnow().strftime(
+                    '%Y-%m-%dT%H:%M:%S.%f')
+            }
+            for header, value in headers.items():
+                if header.lower().startswith('x-object-meta-'):
+                    object_headers[header] = value
+            if name not in objects:
+                bisect.insort(self._object_names[key], name)
+            objects[name] = (body, object_headers)
+            return 201, '', {'Etag': etag}
+        if name not in objects:
+            return 404, '', {}
+        if method == 'DELETE':
+            del objects[name]
+            names = self._object_names[key]
+            del names[bisect.bisect_left(names, name)]
+            return 204, '', {}
+        if method == 'POST':
+            content, object_headers = objects[name]
+            object_headers = dict(
+                (header, value) for header, value in object_headers.items()
+                if not header.lower().startswith('x-object-meta-'))
+            for header, value in headers.items():
+                if header.lower().startswith('x-object-meta-'):
+                    object_headers[header] = value
+            objects[name] = (content, object_headers)
+            return 202, '', {}
+        content, object_headers = objects[name]
+        answer_headers = dict(
+            (header, value) for header, value in object_headers.items()
+            if not header.startswith('_'))
+        answer_headers['Accept-Ranges'] = 'bytes'
+        if method == 'HEAD':
+            answer_headers['Content-Length'] = str(len(content))
+            return 200, '', answer_headers
+        if method != 'GET':
+            return 405, '', {}
+        match = re.match(r'bytes=(\d*)-(\d*)$', headers.get('Range') or '')
+        if match and any(match.groups()):
+            first, last = match.groups()
+            if not first:
+                first, last = max(len(content) - int(last), 0), None
+            first = int(first)
+            last = min(int(last), len(content) - 1) if last \
+                else len(content) - 1
+            if first >= len(content):
+                return 416, '', {}
+            answer_headers['Content-Range'] = 'bytes %d-%d/%d' % (
+                first, last, len(content))
+            return 206, content[first:last + 1], answer_headers
+        return 200, content, answer_headers
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Serve a local stand-in of the RunAbove API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds waited before each answer')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='fraction of queries failing')
+    parser.add_argument('--instances', type=int, default=0,
+                        help='instances created in BHS-1 at start')
+    args = parser.parse_args()
+    server = LocalApiServer(args.host, args.port, latency=args.latency,
+                            error_rate=args.error_rate)
+    server.seed_instances(args.instances)
+    server.start()
+    print('Serving %s' % server.base_url)
+    print('Application key: %s' % server.application_key)
+    print('Application secret: %s' % server.application_secret)
+    print('Consumer key: %s' % server.consumer_key)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Client-side shaping of the traffic sent to the API.
+
+A `RateLimiter` can be given to several clients so that together they
+stay below the throttling limits of RunAbove.
+"""
+from __future__ import absolute_import
+
+import contextlib
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Token bucket allowing `rate` calls per second after a burst."""
+
+    def __init__(self, rate, burst=None):
+        """Build a full bucket.
+
+        :param rate: number of tokens added per second
+        :param burst: maximum number of tokens, `rate` if None
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self.burst
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and get the seconds to wait before using it.
+
+        Tokens are reserved in arrival order, so concurrent callers wait
+        for their own turn instead of competing for the next token.
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(
+                self._tokens + (now - self._updated_at) * self.rate,
+                self.burst)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """Limit the rate and the concurrency of the calls to the API.
+
+    Calls are rate limited by path prefix, the first segment of their
+    path such as `/instance`, `/storage` or `/token`, each prefix having
+    its own bucket. The concurrency limit applies to all calls.
+    """
+
+    def __init__(self, rate=None, burst=None, limits=None,
+                 max_concurrency=None):
+        """Build a rate limiter.
+
+        :param rate: calls per second allowed for each prefix, None for
+            no limit
+        :param burst: calls that can be sent at once for each prefix,
+            `rate` if None
+        :param limits: dict of (rate, burst) tuples by prefix, overriding
+            `rate` and `burst` for these prefixes
+        :param max_concurrency: maximum number of calls running at once,
+            None for no limit
+        """
+        self.rate = rate
+        self.burst = burst
+        self.limits = dict(limits or {})
+        self.max_concurrency = max_concurrency
+        if max_concurrency is not None:
+            self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        else:
+            self._semaphore = None
+        self._buckets = {}
+        self._stats = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def prefix(path):
+        """Get the prefix of a path, '/instance' for '/instance/abc'."""
+        path = path.split('?', 1)[0]
+        return '/' + path.lstrip('/').split('/', 1)[0]
+
+    def _bucket(self, prefix):
+        """Get the bucket of a prefix, None if it is not limited."""
+        with self._lock:
+            if prefix not in self._buckets:
+                rate, burst = self.limits.get(prefix, (self.rate, self.burst))
+                if rate is None:
+                    self._buckets[prefix] = None
+                else:
+                    self._buckets[prefix] = TokenBucket(rate, burst)
+            return self._buckets[prefix]
+
+    def acquire(self, path):
+        """Wait until a call to `path` can be sent.
+
+        Each successful acquire must be followed by a `release`.
+
+        :param path: path of the call
+        :returns: the seconds spent waiting
+        """
+        prefix = self.prefix(path)
+        waited = 0
+        bucket = self._bucket(prefix)
+        if bucket is not None:
+            waited = bucket.reserve()
+            if waited:
+                time.sleep(waited)
+        if self._semaphore is not None:
+            started_at = time.time()
+            self._semaphore.acquire()
+            waited += time.time() - started_at
+        with self._lock:
+            self._in_flight += 1
+            stats = self._stats.setdefault(prefix, {
+                'calls': 0, 'delayed': 0, 'waited': 0.0, 'max_wait': 0.0
+            })
+            stats['calls'] += 1
+            if waited > 0:
+                stats['delayed'] += 1
+                stats['waited'] += waited
+                stats['max_wait'] = max(stats['max_wait'], waited)
+        return waited
+
+    def release(self):
+        """Signal the end of a call."""
+        with self._lock:
+            self._in_flight -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    @contextlib.contextmanager
+    def limit(self, path):
+        """Context manager wrapping a call with `acquire` and `release`."""
+        self.acquire(path)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        """Get the queueing delay of the calls.
+
+        Returns a dict with the number of calls running and, by prefix,
+        the number of calls, of delayed calls, and the total and maximum
+        seconds calls waited.
+        """
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'prefixes': dict((prefix, dict(stats))
+                                 for prefix, stats in self._stats.items())
+            }
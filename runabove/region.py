@@ -37,21 +37,31 @@ class RegionManager(BaseManager):
 
     basepath = '/region'
 
+    def __init__(self, *args, **kwargs):
+        super(RegionManager, self).__init__(*args, **kwargs)
+        self._regions = {}
+
     def list(self):
         """Get list of regions available."""
 
         res = self._api.get(self.basepath)
         regions = []
         for region_name in res:
-            regions.append(Region(self, region_name))
+            regions.append(self._name_to_obj(region_name))
         return regions
 
     def _name_to_obj(self, region_name):
         """Makes a region object by a name.
 
-        It does not check if the region actually exists.
+        Regions are immutable so one object is shared by all the
+        resources of a region. It does not check if the region actually
+        exists.
         """
-        return Region(self, region_name)
+        try:
+            return self._regions[region_name]
+        except KeyError:
+            return self._regions.setdefault(region_name,
+                                            Region(self, region_name))
 
     def get_by_name(self, region_name):
         """Get a region by its name.
@@ -70,6 +80,8 @@ class RegionManager(BaseManager):
 class Region(Resource):
     """Represents one region."""
 
+    __slots__ = ('_manager', 'name')
+
     def __init__(self, manager, name):
         self._manager = manager
         self.name = name
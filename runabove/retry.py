@@ -0,0 +1,162 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Retry of the calls to the API failing with transient errors.
+
+Calls are retried with an exponential backoff. A retry budget, shared
+by every call using the same policy, prevents retries from multiplying
+the load when the API is down rather than briefly overloaded.
+"""
+from __future__ import absolute_import
+
+import random
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+
+
+class RetryPolicy(object):
+    """Decide if and when a failed call is retried.
+
+    GET, PUT and DELETE calls are retried on network errors and on the
+    statuses of `retry_statuses`. POST calls are only retried when
+    `retry_post` is set, as they may create a resource twice.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=30,
+                 jitter=0.5, retry_statuses=(429, 502, 503, 504),
+                 retry_post=False, budget_ratio=0.2, budget_reserve=10,
+                 max_retry_after=60):
+        """Build a retry policy.
+
+        :param max_attempts: maximum number of attempts of one call, 1 to
+            disable retries
+        :param backoff: seconds before the first retry, doubled at each
+            following one
+        :param max_backoff: maximum number of seconds between two attempts
+        :param jitter: fraction of the delay randomized so many clients
+            do not retry at the same time
+        :param retry_statuses: HTTP statuses of the answers to retry
+        :param retry_post: retry POST calls as well
+        :param budget_ratio: retries earned by each call once the reserve
+            is spent
+        :param budget_reserve: maximum number of retries that can be done
+            in a row
+        :param max_retry_after: maximum number of seconds waited when the
+            API answers with a Retry-After header
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_post = retry_post
+        self.budget_ratio = budget_ratio
+        self.budget_reserve = budget_reserve
+        self.max_retry_after = max_retry_after
+        self._budget = float(budget_reserve)
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'retries': 0,
+            'gave_up': 0,
+            'budget_exhausted': 0,
+            'waited': 0.0,
+            'reasons': {}
+        }
+
+    def is_retryable(self, method):
+        """Tell if calls with this HTTP method can be retried."""
+        return method.upper() in IDEMPOTENT_METHODS or self.retry_post
+
+    def start_call(self):
+        """Account for a new call, earning some retry budget."""
+        with self._lock:
+            self._stats['calls'] += 1
+            self._budget = min(self._budget + self.budget_ratio,
+                               self.budget_reserve)
+
+    def next_delay(self, attempt, retryable, reason, retry_after=None):
+        """Get the seconds to wait before retrying a failed attempt.
+
+        :param attempt: number of the attempt that failed, starting at 1
+        :param retryable: whether the call may be retried at all
+        :param reason: status or exception name of the failure
+        :param retry_after: value of the Retry-After header, if any
+        :returns: the delay, or None if the call must not be retried
+        """
+        if not retryable:
+            return None
+        with self._lock:
+            if attempt >= self.max_attempts:
+                self._stats['gave_up'] += 1
+                return None
+            if self._budget < 1:
+                self._stats['budget_exhausted'] += 1
+                self._stats['gave_up'] += 1
+                return None
+            self._budget -= 1
+            delay = self._parse_retry_after(retry_after)
+            if delay is None:
+                delay = min(self.backoff * 2 ** (attempt - 1),
+                            self.max_backoff)
+                delay *= 1 + self.jitter * (2 * random.random() - 1)
+            self._stats['retries'] += 1
+            self._stats['waited'] += delay
+            reasons = self._stats['reasons']
+            reasons[reason] = reasons.get(reason, 0) + 1
+            return delay
+
+    def _parse_retry_after(self, retry_after):
+        """Convert a Retry-After header to seconds, None if invalid.
+
+        The header holds either a number of seconds or an HTTP date.
+        """
+        if not retry_after:
+            return None
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            parsed = parsedate_tz(retry_after)
+            if parsed is None:
+                return None
+            delay = mktime_tz(parsed) - time.time()
+        return min(max(delay, 0), self.max_retry_after)
+
+    def stats(self):
+        """Get the number of calls, retries and calls given up.
+
+        Retries are also counted by reason in `reasons`, and `waited` is
+        the total number of seconds spent waiting between attempts.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['reasons'] = dict(self._stats['reasons'])
+            stats['budget'] = self._budget
+            return stats
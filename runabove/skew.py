@@ -0,0 +1,166 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+"""Stores of the clock skew between this computer and RunAbove.
+
+Queries are signed with a timestamp in RunAbove time, so the skew must
+be known before the first call. Sharing it through a store avoids
+asking the API for its time in every new process.
+"""
+from __future__ import absolute_import
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class SkewStore(object):
+    """Base class of clock skew stores."""
+
+    def get(self, key, max_age=None):
+        """Get a stored skew, None if unknown or older than `max_age`.
+
+        :param key: identifier of the API, usually its base URL
+        :param max_age: maximum age in seconds of the skew, None to
+            accept any age
+        """
+        entry = self.get_entry(key, max_age)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key, max_age=None):
+        """Get a stored skew with the time it was stored at.
+
+        :param key: identifier of the API, usually its base URL
+        :param max_age: maximum age in seconds of the skew, None to
+            accept any age
+        :returns: a (delta, stored_at) tuple, None if unknown or older
+            than `max_age`
+        """
+        raise NotImplementedError()
+
+    def set(self, key, delta):
+        """Store a skew.
+
+        :param key: identifier of the API, usually its base URL
+        :param delta: seconds to add to the local time to get the
+            RunAbove time
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def _is_fresh(stored_at, max_age):
+        """Tell if a skew stored at `stored_at` is young enough."""
+        return max_age is None or time.time() - stored_at < max_age
+
+
+class MemorySkewStore(SkewStore):
+    """Skew store shared by the wrappers of one process."""
+
+    def __init__(self):
+        self._skews = {}
+        self._lock = threading.Lock()
+
+    def get_entry(self, key, max_age=None):
+        with self._lock:
+            try:
+                delta, stored_at = self._skews[key]
+            except KeyError:
+                return None
+        if not self._is_fresh(stored_at, max_age):
+            return None
+        return delta, stored_at
+
+    def set(self, key, delta):
+        with self._lock:
+            self._skews[key] = (delta, time.time())
+
+
+class FileSkewStore(SkewStore):
+    """Skew store shared by processes through a JSON file.
+
+    Reads and writes are protected by an advisory lock on systems
+    providing `fcntl`.
+    """
+
+    def __init__(self, path):
+        """Build a store backed by a file.
+
+        :param path: path of the file, created when needed
+        """
+        self.path = path
+
+    def _locked(self, exclusive):
+        """Open the file and lock it."""
+        handle = open(self.path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        handle.seek(0)
+        return handle
+
+    @staticmethod
+    def _read(handle):
+        """Read the skews stored in an opened file."""
+        try:
+            return json.loads(handle.read() or '{}')
+        except ValueError:
+            return {}
+
+    def get_entry(self, key, max_age=None):
+        try:
+            with self._locked(exclusive=False) as handle:
+                skews = self._read(handle)
+        except (IOError, OSError):
+            return None
+        try:
+            delta, stored_at = skews[key]
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not self._is_fresh(stored_at, max_age):
+            return None
+        return delta, stored_at
+
+    def set(self, key, delta):
+        try:
+            with self._locked(exclusive=True) as handle:
+                skews = self._read(handle)
+                skews[key] = [delta, time.time()]
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(skews))
+                handle.flush()
+                os.fsync(handle.fileno())
+        except (IOError, OSError):
+            # The store is only an optimization, the skew is still known
+            # by the wrapper that computed it
+            pass
@@ -99,6 +99,8 @@ class SSHKeyManager(BaseManagerWithList):
 class SSHKey(Resource):
     """Represents one SSH key."""
 
+    __slots__ = ('_manager', 'name', 'finger_print', 'public_key', 'region')
+
     def __init__(self, manager, name, finger_print, public_key, region):
         self._manager = manager
         self.name = name
@@ -29,6 +29,12 @@
 from __future__ import absolute_import
 
 import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent import futures
 
 try:
     from urllib import quote as urllib_quote
@@ -39,6 +45,7 @@ import swiftclient
 
 from .base import Resource, BaseManagerWithList
 from .exception import APIError, ResourceNotFoundError
+from .transport import Transport
 
 
 class ContainerManager(BaseManagerWithList):
@@ -49,6 +56,7 @@ class ContainerManager(BaseManagerWithList):
     def __init__(self, *args, **kwargs):
         super(ContainerManager, self).__init__(*args, **kwargs)
         self.swifts = {}
+        self._local = threading.local()
 
     def get_by_name(self, region, container_name, list_objects=False):
         """Get a container by its name.
@@ -93,6 +101,30 @@ class ContainerManager(BaseManagerWithList):
 
     def _swift_call(self, region, action, *args, **kwargs):
         """Wrap calls to swiftclient to allow retry."""
+        return self._retry_swift_call(region, False, action, args, kwargs)
+
+    def _threaded_swift_call(self, region, action, *args, **kwargs):
+        """Wrap calls to swiftclient made from worker threads.
+
+        swiftclient connections can't be shared between threads, so each
+        thread uses its own connection, built from the token and endpoint
+        of the region client stored in `self.swifts`.
+        """
+        return self._retry_swift_call(region, True, action, args, kwargs)
+
+    def _thread_swift_client(self, region_name, shared):
+        """Get the connection of the current thread to a region."""
+        clients = self._local.__dict__.setdefault('clients', {})
+        client = clients.get(region_name)
+        if (client is None or client.token != shared.token or
+                client.url != shared.url):
+            client = swiftclient.client.Connection(preauthurl=shared.url,
+                                                   preauthtoken=shared.token)
+            clients[region_name] = client
+        return client
+
+    def _retry_swift_call(self, region, threaded, action, args, kwargs):
+        """Call swiftclient, regenerating the client if the token expired."""
         try:
             region_name = region.name
         except AttributeError:
@@ -103,19 +135,42 @@ class ContainerManager(BaseManagerWithList):
                 self.swifts[region_name] = self._get_swift_client(region_name)
 
             swift = self.swifts[region_name]['client']
+            if threaded:
+                swift = self._thread_swift_client(region_name, swift)
             call = getattr(swift, action.lower())
             try:
-                return call(*args, **kwargs)
+                return self._limited_call(region_name, action, call, args,
+                                          kwargs)
             except swiftclient.exceptions.ClientException as e:
                 if e.http_status == 401:
                     # Token is invalid, regenerate swift clients
-                    del self.swifts[region_name]
+                    self.swifts.pop(region_name, None)
+                    self._handler.tokens.invalidate_cache()
+                    retries += 1
+                    continue
                 if e.http_status == 404:
                     raise ResourceNotFoundError(msg=e.msg)
                 else:
                    raise e
         raise APIError(msg='Impossible to get a valid token')
 
+    def _limited_call(self, region_name, action, call, args, kwargs):
+        """Call swiftclient, waiting for the rate limiter of the API if any.
+
+        Calls to the object storage share the '/storage' bucket. When the
+        API has a transport, the call goes through it so that it can be
+        recorded or replayed.
+        """
+        transport = getattr(self._api, 'transport', None)
+        if isinstance(transport, Transport):
+            call = functools.partial(transport.swift_call, region_name,
+                                     action, call)
+        rate_limiter = getattr(self._api, 'rate_limiter', None)
+        if rate_limiter is None:
+            return call(*args, **kwargs)
+        with rate_limiter.limit(self.basepath):
+            return call(*args, **kwargs)
+
     def create(self, region, container_name, public=False):
         """Create a new container in a region.
 
@@ -235,6 +290,8 @@ class ContainerManager(BaseManagerWithList):
 class Container(Resource):
     """Represents one container."""
 
+    __slots__ = ('_manager', 'name', 'region', '_meta')
+
     def __init__(self, manager, name, region, meta=None):
         self._manager = manager
         self.name = name
@@ -268,7 +325,7 @@ class Container(Resource):
 
     def _dict_to_obj(self, obj):
         """Converts a dict to a ObjectStored object."""
-        return ObjectStored(self, obj.get('name'))
+        return ObjectStored(self, obj.get('name', obj.get('subdir')))
 
     def _en_dict_to_obj(self, name, meta, data=None):
         """Converts a dict to a ObjectStored object."""
@@ -285,6 +342,41 @@ class Container(Resource):
             objs.append(self._dict_to_obj(obj))
         return objs
 
+    def iter_objects(self, prefix=None, delimiter=None, marker=None,
+                     end_marker=None, page_size=1000):
+        """Iterate over the objects of a container, page by page.
+
+        Pages of `page_size` objects are requested when needed, so memory
+        usage does not depend on the number of objects in the container.
+        The listing ends with the first empty page.
+        With a delimiter, pseudo-directories are yielded as objects named
+        after the directory.
+
+        :param prefix: Only list objects whose name starts with it
+        :param delimiter: Roll up names containing it after the prefix
+        :param marker: Only list objects whose name is after it
+        :param end_marker: Only list objects whose name is before it
+        :param page_size: Number of objects requested by call
+        """
+        while True:
+            res = self._manager._swift_call(self.region.name,
+                                            'get_container',
+                                            self.name,
+                                            marker=marker,
+                                            limit=page_size,
+                                            prefix=prefix,
+                                            delimiter=delimiter,
+                                            end_marker=end_marker)
+            page = res[1]
+            # Swift caps the size of pages, a short page is not the last
+            # one when page_size is above the cap
+            if not page:
+                return
+            for obj in page:
+                yield self._dict_to_obj(obj)
+            last = page[-1]
+            marker = last.get('name', last.get('subdir'))
+
     def get_object_by_name(self, object_name, download=False):
         """Get an object stored by its name.
 
@@ -320,13 +412,15 @@ class Container(Resource):
                                   self.name,
                                   object_name)
 
-    def create_object(self, object_name, content, meta=None):
+    def create_object(self, object_name, content, meta=None, fetch=True):
         """Upload an object to a container.
 
         :param object_name: Name of the object to create
         :param content: Content to upload, can be a string or a file-like
             object
         :param meta: A dict containing additional headers
+        :param fetch: If False do not request the metadata of the new
+            object, they are loaded lazily
         """
         self._manager._swift_call(self.region.name,
                                   'put_object',
@@ -334,6 +428,159 @@ class Container(Resource):
                                   object_name,
                                   content,
                                   headers=meta)
+        if not fetch:
+            return self._en_dict_to_obj(object_name, None)
+        return self.get_object_by_name(object_name)
+
+    def upload_many(self, objects, max_workers=4, meta=None, fetch=False):
+        """Upload many objects concurrently.
+
+        Objects are uploaded by a pool of threads, each of them having
+        its own connection to the region. Sources are consumed lazily so
+        `objects` can be a generator over millions of files.
+
+        :param objects: iterable of (object_name, source) tuples, a source
+            being a string, a file-like object or a callable returning
+            one of them. Files returned by a callable are closed after
+            the upload.
+        :param max_workers: Maximum number of concurrent uploads
+        :param meta: A dict containing additional headers for all objects
+        :param fetch: If True request the metadata of each new object
+        :returns: an UploadReport
+        """
+        report = UploadReport()
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            pending = set()
+            for object_name, source in objects:
+                if len(pending) >= max_workers * 2:
+                    done, pending = futures.wait(
+                        pending, return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        report.add(future.result())
+                pending.add(executor.submit(self._upload_one, object_name,
+                                            source, meta, fetch))
+            for future in futures.as_completed(pending):
+                report.add(future.result())
+        finally:
+            executor.shutdown(wait=True)
+            report.finish()
+        return report
+
+    def _upload_one(self, object_name, source, meta, fetch):
+        """Upload one object from a worker thread of `upload_many`."""
+        start = time.time()
+        content = None
+        try:
+            content = source() if callable(source) else source
+            size = _content_length(content)
+            etag = self._manager._threaded_swift_call(self.region.name,
+                                                      'put_object',
+                                                      self.name,
+                                                      object_name,
+                                                      content,
+                                                      headers=meta)
+            if fetch:
+                res = self._manager._threaded_swift_call(self.region.name,
+                                                         'head_object',
+                                                         self.name,
+                                                         object_name)
+                obj = self._en_dict_to_obj(object_name, res)
+            else:
+                obj = self._en_dict_to_obj(object_name, None)
+            return UploadResult(object_name, size, time.time() - start,
+                                obj=obj, etag=etag)
+        except Exception as e:
+            return UploadResult(object_name, None, time.time() - start,
+                                error=e)
+        finally:
+            if callable(source) and hasattr(content, 'close'):
+                content.close()
+
+    def create_large_object(self, object_name, source,
+                            segment_size=100 * 1024 * 1024, max_workers=4,
+                            segment_container=None, meta=None, fetch=True):
+        """Upload a large object as segments and a static manifest.
+
+        The source is split in segments uploaded concurrently, then a
+        static large object manifest joining them is written under
+        `object_name`. Segment names only depend on the object name and
+        sizes, so calling this method again after an interruption
+        skips the segments already uploaded with a matching ETag.
+
+        Each worker holds one segment in memory, so memory usage is
+        about `max_workers * segment_size`.
+
+        :param object_name: Name of the object to create
+        :param source: Path of a file or seekable file-like object
+        :param segment_size: Size in bytes of each segment
+        :param max_workers: Maximum number of segments uploaded at once
+        :param segment_container: Container where segments are stored,
+            defaults to the name of this container suffixed by _segments
+        :param meta: A dict containing additional headers
+        :param fetch: If False do not request the metadata of the new
+            object, they are loaded lazily
+        :raises APIError: Some segments could not be uploaded
+        """
+        reader = _SegmentReader(source, segment_size)
+        if reader.size <= segment_size:
+            content = reader.read(0)
+            reader.close()
+            return self.create_object(object_name, content, meta=meta,
+                                      fetch=fetch)
+        if segment_container is None:
+            segment_container = self.name + '_segments'
+        prefix = '%s/slo/%d/%d/' % (object_name, reader.size, segment_size)
+        region_name = self.region.name
+        self._manager._swift_call(region_name, 'put_container',
+                                  segment_container)
+        listing = self._manager._swift_call(region_name,
+                                            'get_container',
+                                            segment_container,
+                                            prefix=prefix,
+                                            full_listing=True)[1]
+        uploaded = dict((seg['name'], (seg['hash'], seg['bytes']))
+                        for seg in listing)
+
+        def upload_segment(index):
+            data = reader.read(index)
+            etag = hashlib.md5(data).hexdigest()
+            name = '%s%08d' % (prefix, index)
+            if uploaded.get(name) != (etag, len(data)):
+                self._manager._threaded_swift_call(region_name,
+                                                   'put_object',
+                                                   segment_container,
+                                                   name,
+                                                   data,
+                                                   etag=etag)
+            return {
+                'path': '/%s/%s' % (segment_container, name),
+                'etag': etag,
+                'size_bytes': len(data)
+            }
+
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            submitted = [executor.submit(upload_segment, index)
+                         for index in range(reader.segments)]
+        finally:
+            executor.shutdown(wait=True)
+            reader.close()
+        failed = [future for future in submitted if future.exception()]
+        if failed:
+            raise APIError(msg='%d of %d segments could not be uploaded: %s' %
+                           (len(failed), len(submitted),
+                            failed[0].exception()))
+        manifest = [future.result() for future in submitted]
+        self._manager._swift_call(region_name,
+                                  'put_object',
+                                  self.name,
+                                  object_name,
+                                  json.dumps(manifest),
+                                  headers=meta,
+                                  query_string='multipart-manifest=put')
+        if not fetch:
+            return self._en_dict_to_obj(object_name, None)
         return self.get_object_by_name(object_name)
 
     def copy_object(self, stored_object, to_container=None,
@@ -370,9 +617,115 @@ class Container(Resource):
         return '%s/%s' % (region_endpoint, container_name)
 
 
+class _SegmentReader(object):
+    """Read segments of a file from several threads."""
+
+    def __init__(self, source, segment_size):
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        if hasattr(source, 'read'):
+            self._file = source
+            self._owned = False
+        else:
+            self._file = open(source, 'rb')
+            self._owned = True
+        self._start = self._file.tell()
+        self._file.seek(0, os.SEEK_END)
+        self.size = self._file.tell() - self._start
+        self.segments = max(1, -(-self.size // segment_size))
+
+    def read(self, index):
+        """Read the segment number `index`."""
+        with self._lock:
+            self._file.seek(self._start + index * self.segment_size)
+            return self._file.read(self.segment_size)
+
+    def close(self):
+        """Close the file if it was opened by the reader."""
+        if self._owned:
+            self._file.close()
+
+
+def _content_length(content):
+    """Get the size of a content to upload, None if unknown."""
+    try:
+        return len(content)
+    except TypeError:
+        pass
+    try:
+        return os.fstat(content.fileno()).st_size - content.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
+class UploadResult(object):
+    """Result of the upload of one object by `Container.upload_many`."""
+
+    def __init__(self, name, size, elapsed, obj=None, etag=None, error=None):
+        self.name = name
+        self.size = size
+        self.elapsed = elapsed
+        self.obj = obj
+        self.etag = etag
+        self.error = error
+
+    @property
+    def succeeded(self):
+        """True if the object has been uploaded."""
+        return self.error is None
+
+
+class UploadReport(object):
+    """Results and throughput of `Container.upload_many`."""
+
+    def __init__(self):
+        self.results = []
+        self.started_at = time.time()
+        self.elapsed = None
+
+    def add(self, result):
+        """Add the result of one upload."""
+        self.results.append(result)
+
+    def finish(self):
+        """Stop the clock of the report."""
+        self.elapsed = time.time() - self.started_at
+
+    @property
+    def succeeded(self):
+        """Results of the uploads that succeeded."""
+        return [result for result in self.results if result.succeeded]
+
+    @property
+    def failed(self):
+        """Results of the uploads that failed."""
+        return [result for result in self.results if not result.succeeded]
+
+    @property
+    def bytes_uploaded(self):
+        """Number of bytes uploaded, when known."""
+        return sum(result.size or 0 for result in self.succeeded)
+
+    @property
+    def throughput(self):
+        """Bytes uploaded per second."""
+        if not self.elapsed:
+            return 0.0
+        return self.bytes_uploaded / self.elapsed
+
+    @property
+    def objects_per_second(self):
+        """Objects uploaded per second."""
+        if not self.elapsed:
+            return 0.0
+        return len(self.succeeded) / self.elapsed
+
+
 class ObjectStored(Resource):
     """Represents one swift object."""
 
+    __slots__ = ('container', 'name', '_meta', '_data')
+
     def __init__(self, container, name, meta=None, data=None):
         self.container = container
         self.name = name
@@ -410,6 +763,90 @@ class ObjectStored(Resource):
             meta
         )
 
+    def iter_content(self, chunk_size=65536, start=None, end=None):
+        """Stream the content of the object without loading it in memory.
+
+        :param chunk_size: Size in bytes of the chunks yielded
+        :param start: First byte to read, from the beginning if None
+        :param end: Last byte to read (included), up to the end if None
+        """
+        headers = {}
+        if start is not None or end is not None:
+            # 'bytes=-N' would be the last N bytes, not the first ones
+            headers['Range'] = 'bytes=%s-%s' % (
+                0 if start is None else start,
+                '' if end is None else end)
+        res = self.container._manager._threaded_swift_call(
+            self.container.region.name,
+            'get_object',
+            self.container.name,
+            self.name,
+            resp_chunk_size=chunk_size,
+            headers=headers
+        )
+        for chunk in res[1]:
+            yield chunk
+
+    def read_range(self, start, end=None):
+        """Read a range of bytes of the object.
+
+        :param start: First byte to read
+        :param end: Last byte to read (included), up to the end if None
+        """
+        return b''.join(self.iter_content(start=start, end=end))
+
+    def download_to(self, destination, chunk_size=65536, max_workers=1,
+                    part_size=64 * 1024 * 1024):
+        """Download the object to a file, chunk by chunk.
+
+        With `max_workers` greater than 1 and a path as destination, the
+        object is split in ranges of `part_size` bytes downloaded
+        concurrently over several connections.
+
+        :param destination: Path of the file or writable file-like object
+        :param chunk_size: Size in bytes of the chunks read
+        :param max_workers: Maximum number of ranges downloaded at once
+        :param part_size: Size in bytes of each range
+        :returns: the number of bytes written
+        """
+        if hasattr(destination, 'write'):
+            return self._download_range(destination, chunk_size)
+        if max_workers > 1:
+            size = int(self.meta['content-length'])
+            if size > part_size:
+                return self._download_parallel(destination, size, chunk_size,
+                                               max_workers, part_size)
+        with open(destination, 'wb') as handle:
+            return self._download_range(handle, chunk_size)
+
+    def _download_range(self, handle, chunk_size, start=None, end=None):
+        """Write a range of the object to an opened file."""
+        written = 0
+        for chunk in self.iter_content(chunk_size, start, end):
+            handle.write(chunk)
+            written += len(chunk)
+        return written
+
+    def _download_parallel(self, path, size, chunk_size, max_workers,
+                           part_size):
+        """Download ranges of the object concurrently into a file."""
+        with open(path, 'wb') as handle:
+            handle.truncate(size)
+
+        def download_part(start):
+            end = min(start + part_size, size) - 1
+            with open(path, 'r+b') as handle:
+                handle.seek(start)
+                return self._download_range(handle, chunk_size, start, end)
+
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            parts = [executor.submit(download_part, start)
+                     for start in range(0, size, part_size)]
+            return sum(part.result() for part in parts)
+        finally:
+            executor.shutdown(wait=True)
+
     @property
     def url(self):
         """Get the URL of an object."""
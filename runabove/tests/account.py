@@ -77,10 +77,61 @@ class TestAccount(unittest.TestCase):
         self.mock_wrapper.get.return_value = json.loads(self.answer_balance)
         balance = self.account._load_balance()
         self.assertIsInstance(balance, tuple)
-        self.assertTrue(len(balance) == 2)
         self.assertEqual(balance[0], 193.39)
         self.assertEqual(balance[1], 200)
 
+    def test_get_balance(self):
+        self.mock_wrapper.get.return_value = json.loads(self.answer_balance)
+        balance = self.account.get_balance()
+        self.mock_wrapper.get.assert_called_once_with('/me/balance')
+        self.assertIsInstance(balance, runabove.account.BalanceSnapshot)
+        self.assertEqual(balance.current_total, 193.39)
+        self.assertEqual(balance.credit_left, 200)
+        self.assertTrue(balance.age() < 60)
+
+    def test_balance_snapshot_replace(self):
+        snapshot = runabove.account.BalanceSnapshot(
+            1, 99, fetched_at=1000.0,
+            usages=[runabove.account.ProjectUsage('a', 1)])
+        replaced = snapshot._replace(credit_left=98)
+        self.assertEqual(replaced.fetched_at, 1000.0)
+        self.assertEqual(replaced.usages, snapshot.usages)
+        self.assertEqual(runabove.account.BalanceSnapshot._make(snapshot),
+                         snapshot)
+        self.assertTrue(replaced.age() > 0)
+        self.assertFalse(hasattr(snapshot, '__dict__'))
+
+    def test_get_balance_usages(self):
+        self.mock_wrapper.get.return_value = json.loads(self.answer_balance)
+        balance = self.account.get_balance()
+        self.assertEqual(balance.usages, (
+            runabove.account.ProjectUsage('randomlongstring', 192.39),
+            runabove.account.ProjectUsage('randomlongstring2', 1)
+        ))
+        self.assertEqual(balance.usages[0].project_id, 'randomlongstring')
+
+    def test_account_balance_ttl(self):
+        self.account.balance_ttl = 30
+        self.mock_wrapper.get.return_value = json.loads(self.answer_account)
+        account = self.account.get()
+        self.assertEqual(account.balance_ttl, 30)
+
+    @mock.patch('runabove.account.time')
+    def test_watch_balance(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        balances = [(10, 100), (10, 100), (10.5, 99.5), (12, 98), (12, 98)]
+        self.mock_wrapper.get.side_effect = [
+            {'currentUsages': [{'currentTotal': total}], 'creditLeft': left}
+            for total, left in balances
+        ]
+        snapshots = list(self.account.watch_balance(interval=60,
+                                                    min_change=1,
+                                                    max_polls=5))
+        self.assertEqual([snapshot[:2] for snapshot in snapshots],
+                         [(10, 100), (12, 98)])
+        self.assertEqual(mock_time.sleep.call_args_list,
+                         [mock.call(60)] * 4)
+
 
 class TestAccountObject(unittest.TestCase):
 
@@ -102,14 +153,75 @@ class TestAccountObject(unittest.TestCase):
         )
 
     def test_current_total(self):
-        self.mock_accounts._load_balance.return_value = (193.39, 200)
+        self.mock_accounts._load_balance.return_value = \
+            runabove.account.BalanceSnapshot(193.39, 200)
         self.assertEqual(self.account.current_total, 193.39)
         self.mock_accounts._load_balance.assert_called_once()
 
     def test_credit_left(self):
-        self.mock_accounts._load_balance.return_value = (193.39, 200)
+        self.mock_accounts._load_balance.return_value = \
+            runabove.account.BalanceSnapshot(193.39, 200)
         self.assertEqual(self.account.credit_left, 200)
         self.mock_accounts._load_balance.assert_called_once()
 
+    def test_balance_loaded_once(self):
+        self.mock_accounts._load_balance.return_value = \
+            runabove.account.BalanceSnapshot(0, 0)
+        self.assertEqual(self.account.current_total, 0)
+        self.assertEqual(self.account.credit_left, 0)
+        self.assertEqual(self.account.current_total, 0)
+        self.mock_accounts._load_balance.assert_called_once()
+
+    @mock.patch('runabove.account.time')
+    def test_balance_ttl(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        self.mock_accounts._load_balance.side_effect = [
+            runabove.account.BalanceSnapshot(1, 99),
+            runabove.account.BalanceSnapshot(2, 98, fetched_at=1060.0)
+        ]
+        self.assertEqual(self.account.current_total, 1)
+        mock_time.time.return_value = 1059.0
+        self.assertEqual(self.account.current_total, 1)
+        mock_time.time.return_value = 1060.0
+        self.assertEqual(self.account.current_total, 2)
+        self.assertEqual(self.account.balance.fetched_at, 1060.0)
+
+
+class TestUsageAggregator(unittest.TestCase):
+
+    def _snapshot(self, fetched_at, **totals):
+        usages = [runabove.account.ProjectUsage(project_id, total)
+                  for project_id, total in sorted(totals.items())]
+        return runabove.account.BalanceSnapshot(
+            sum(totals.values()), 100, fetched_at=fetched_at, usages=usages)
+
+    def test_rates(self):
+        aggregator = runabove.account.UsageAggregator()
+        self.assertEqual(aggregator.rates(), {})
+        aggregator.add(self._snapshot(0, a=10, b=1))
+        self.assertEqual(aggregator.rates(), {})
+        aggregator.add(self._snapshot(1800, a=11, b=1))
+        aggregator.add(self._snapshot(3600, a=12, b=4))
+        self.assertEqual(aggregator.spent(), {'a': 2, 'b': 3})
+        self.assertEqual(aggregator.rates(), {'a': 2, 'b': 3})
+        self.assertEqual(aggregator.rates(window=1800), {'a': 2, 'b': 6})
+        self.assertEqual(aggregator.rates(per=60), {'a': 2 / 60.0,
+                                                     'b': 3 / 60.0})
+
+    def test_new_period_and_new_project(self):
+        aggregator = runabove.account.UsageAggregator()
+        aggregator.add(self._snapshot(0, a=10))
+        aggregator.add(self._snapshot(3600, a=2, b=5))
+        aggregator.add(self._snapshot(7200, a=3, b=6))
+        self.assertEqual(aggregator.spent(), {'a': 3, 'b': 1})
+
+    def test_bounded_history(self):
+        aggregator = runabove.account.UsageAggregator(max_history=2)
+        for hour in range(5):
+            aggregator.add(self._snapshot(hour * 3600, a=hour * 2))
+        self.assertEqual(len(aggregator), 2)
+        self.assertEqual(aggregator.spent(), {'a': 2})
+        self.assertEqual(aggregator.rates(), {'a': 2})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,340 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+import unittest
+import hashlib
+import json
+import asyncio
+
+import mock
+
+import runabove
+from runabove.skew import MemorySkewStore
+
+try:
+    from runabove import aio
+except (ImportError, SyntaxError):
+    aio = None
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@unittest.skipIf(aio is None, 'asyncio client requires aiohttp')
+class TestAsyncWrapperApi(unittest.TestCase):
+
+    application_key = 'GpG8f61qtOcWmb0e'
+    application_secret = 'fE42V43gAB5dpqURV8RPNq9U5rU1J8er'
+    consumer_key = 'pW4Xn9s8MDpwfGD8s2DXpoXp3ESkCSY'
+    base_url = 'https://api.runabove.com/1.0'
+
+    def setUp(self):
+        self.time_patch = mock.patch('time.time', return_value=1404395889.4)
+        self.time_patch.start()
+        self.api = aio.AsyncWrapperApi(self.application_key,
+                                       self.application_secret,
+                                       self.consumer_key)
+        self.api._time_delta = 0
+        self.session = mock.MagicMock()
+        self.session.closed = False
+        self.api._session = self.session
+        self.response = self.session.request.return_value.__aenter__.\
+            return_value
+
+    def tearDown(self):
+        self.time_patch.stop()
+
+    def _answer(self, status, text):
+        self.response.status = status
+        self.response.text = mock.AsyncMock(return_value=text)
+
+    def test_raw_call_signs_query(self):
+        self._answer(200, '{"test": 1}')
+        result = run(self.api.raw_call('get', '/test'))
+        self.assertEqual(result, {'test': 1})
+        s1 = hashlib.sha1()
+        s1.update('+'.join([self.application_secret, self.consumer_key,
+                            'GET', self.base_url + '/test', '',
+                            '1404395889']).encode())
+        headers = self.session.request.call_args[1]['headers']
+        self.assertEqual(headers['X-Ra-Signature'], '$1$' + s1.hexdigest())
+        self.assertEqual(headers['X-Ra-Timestamp'], '1404395889')
+
+    def test_raw_call_with_error_404(self):
+        self._answer(404, '{"message": "Not found"}')
+        with self.assertRaises(aio.ResourceNotFoundError):
+            run(self.api.raw_call('get', '/test'))
+
+    def test_raw_call_with_network_error(self):
+        self.session.request.side_effect = aio.aiohttp.ClientError()
+        with self.assertRaises(aio.NetworkError):
+            run(self.api.raw_call('get', '/test'))
+
+    def test_time_delta(self):
+        self.api._time_delta = None
+        self._answer(200, '1404395895')
+        self.assertEqual(run(self.api.time_delta()), 6)
+
+    def test_time_delta_fetched_once(self):
+        self.api._time_delta = None
+        self._answer(200, '1404395895')
+
+        async def concurrent_calls():
+            return await asyncio.gather(*[self.api.time_delta()
+                                          for _ in range(20)])
+        self.assertEqual(run(concurrent_calls()), [6] * 20)
+        self.assertEqual(self.session.request.call_count, 1)
+
+    @mock.patch('asyncio.base_events.BaseEventLoop.run_in_executor')
+    def test_time_delta_without_store(self, mock_run_in_executor):
+        self.api._time_delta = None
+        self._answer(200, '1404395895')
+        self.assertEqual(run(self.api.time_delta()), 6)
+        self.assertFalse(mock_run_in_executor.called)
+
+    def test_time_delta_from_store(self):
+        self.api._time_delta = None
+        self.api.skew_store = MemorySkewStore()
+        self._answer(200, '1404395895')
+        self.assertEqual(run(self.api.time_delta()), 6)
+        self.assertEqual(self.api.skew_store.get(self.base_url), 6)
+        self.api._time_delta = None
+        self.assertEqual(run(self.api.time_delta()), 6)
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_unsupported_options(self):
+        for option in ('retry_policy', 'rate_limiter', 'observers',
+                       'response_cache', 'transport', 'skew_from_date'):
+            with self.assertRaises(TypeError):
+                aio.AsyncWrapperApi('key', 'secret', **{option: None})
+        api = aio.AsyncWrapperApi('key', 'secret', base_url='http://local',
+                                  codec='json', skew_max_age=60)
+        self.assertEqual(api.base_url, 'http://local')
+
+    def test_request_credentials(self):
+        self._answer(200, json.dumps({'consumerKey': 'key',
+                                      'validationUrl': 'url'}))
+        run(self.api.request_credentials([]))
+        self.assertEqual(self.api.consumer_key, 'key')
+
+    def test_close(self):
+        self.session.close = mock.AsyncMock()
+        run(self.api.close())
+        self.session.close.assert_called_once_with()
+        self.assertIsNone(self.api._session)
+
+    def test_sync_context_manager(self):
+        with self.assertRaises(TypeError):
+            with self.api:
+                pass
+        self.assertIs(self.api._session, self.session)
+
+
+@unittest.skipIf(aio is None, 'asyncio client requires aiohttp')
+class TestAsyncRunabove(unittest.TestCase):
+
+    answer_instance = '''{
+        "instanceId": "9c687d5d-a0f4-4eda-96fa-bc4b1fb1d3b9",
+        "name": "Test",
+        "ipv4": "192.168.0.1",
+        "region": "BHS-1",
+        "status": "ACTIVE",
+        "created": "2014-06-18T09:30:10Z",
+        "flavor": {"id": "f1", "name": "ra.s", "region": "BHS-1"},
+        "image": {"id": "i1", "name": "Debian", "region": "BHS-1",
+                  "visibility": "public"},
+        "sshKey": null
+    }'''
+
+    def setUp(self):
+        self.client = aio.AsyncRunabove('key', 'secret', 'consumer')
+        self.client._api.get = mock.AsyncMock()
+        self.client._api.post = mock.AsyncMock()
+        self.client._api.delete = mock.AsyncMock()
+        for manager in (self.client.flavors, self.client.instances,
+                        self.client.regions, self.client.ssh_keys):
+            manager._api = self.client._api
+
+    def test_flavor_list(self):
+        self.client._api.get.return_value = [
+            {'id': 'f1', 'name': 'ra.s', 'region': 'BHS-1'}
+        ]
+        flavors = run(self.client.flavors.list_by_region('BHS-1'))
+        self.client._api.get.assert_called_once_with('/flavor',
+                                                     {'region': 'BHS-1'})
+        self.assertIsInstance(flavors[0], runabove.flavor.Flavor)
+
+    def test_region_get_by_name(self):
+        self.client._api.get.return_value = ['BHS-1', 'SBG-1']
+        region = run(self.client.regions.get_by_name('SBG-1'))
+        self.assertEqual(region.name, 'SBG-1')
+        with self.assertRaises(aio.ResourceNotFoundError):
+            run(self.client.regions.get_by_name('RBX-1'))
+
+    def test_instance_create(self):
+        self.client._api.post.return_value = {'instanceId': 'abc'}
+        self.client._api.get.return_value = json.loads(self.answer_instance)
+        instance = run(self.client.instances.create('BHS-1', 'Test',
+                                                    'f1', 'i1'))
+        self.client._api.post.assert_called_once_with('/instance', {
+            'flavorId': 'f1',
+            'imageId': 'i1',
+            'name': 'Test',
+            'region': 'BHS-1'
+        })
+        self.assertEqual(instance.flavor.id, 'f1')
+
+    def test_instance_delete(self):
+        run(self.client.instances.delete('abc'))
+        self.client._api.delete.assert_called_once_with('/instance/abc')
+
+    def test_list_all_regions(self):
+        async def get(path, content=None):
+            if content['region'] == 'SBG-1':
+                raise aio.NetworkError(msg='Unreachable')
+            return [{'id': 'f1', 'name': 'ra.s', 'region': 'BHS-1'}]
+        self.client._api.get.side_effect = get
+        flavors, errors = run(self.client.flavors.list_all_regions(
+            ['BHS-1', 'SBG-1'], max_workers=1))
+        self.assertEqual([flavor.id for flavor in flavors], ['f1'])
+        self.assertEqual(list(errors), ['SBG-1'])
+        self.assertIsInstance(errors['SBG-1'], aio.NetworkError)
+
+    def test_list_all_regions_timeout(self):
+        async def get(path, content=None):
+            await asyncio.sleep(10)
+        self.client._api.get.side_effect = get
+        flavors, errors = run(self.client.flavors.list_all_regions(
+            ['BHS-1'], timeout=0.01))
+        self.assertEqual(flavors, [])
+        self.assertIsInstance(errors['BHS-1'], aio.NetworkError)
+
+    def test_flavor_cache(self):
+        self.client._api.get.return_value = [
+            {'id': 'f1', 'name': 'ra.s', 'region': 'BHS-1'}
+        ]
+        self.client.flavors.enable_cache()
+        run(self.client.flavors.list())
+        flavor = run(self.client.flavors.get_by_id('f1'))
+        flavors = run(self.client.flavors.get_by_name('ra.s', 'BHS-1'))
+        self.client._api.get.assert_called_once_with('/flavor')
+        self.assertEqual(flavors, [flavor])
+        self.assertEqual(self.client.flavors.cache_stats()['hits'], 2)
+        self.assertEqual(self.client.flavors.cache_stats()['misses'], 1)
+
+    def test_instance_list_prefetch(self):
+        answers = {
+            '/instance': [{'instanceId': 'a', 'region': 'BHS-1',
+                           'flavorId': 'f1', 'imageId': 'i1'}],
+            '/flavor': [{'id': 'f1', 'name': 'ra.s', 'region': 'BHS-1'}],
+            '/image': [{'id': 'i1', 'name': 'Debian', 'region': 'BHS-1',
+                        'visibility': 'public'}]
+        }
+
+        async def get(path, content=None):
+            return answers[path]
+        self.client._api.get.side_effect = get
+        instances = run(self.client.instances.list(prefetch=True))
+        self.assertEqual(instances[0].flavor.name, 'ra.s')
+        self.assertEqual(instances[0].image.name, 'Debian')
+        self.assertEqual(self.client._api.get.call_count, 3)
+
+    def test_instance_create_many(self):
+        async def post(path, content):
+            if content['name'] == 'bad':
+                raise aio.APIError(msg='Quota exceeded')
+            return {'instanceId': content['name']}
+        self.client._api.post.side_effect = post
+        specs = [{'region': 'BHS-1', 'name': name, 'flavor': 'f1',
+                  'image': 'i1'} for name in ('a', 'bad', 'b')]
+        results = run(self.client.instances.create_many(specs,
+                                                        max_in_flight=2,
+                                                        enrich=False))
+        self.assertEqual(len(results), 3)
+        errors = [result for result in results if result.error]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].spec['name'], 'bad')
+        self.assertEqual(sorted(result.instance.id for result in results
+                                if not result.error), ['a', 'b'])
+
+    @mock.patch('asyncio.sleep', new_callable=mock.AsyncMock)
+    def test_instance_wait_for(self, mock_sleep):
+        self.client._api.get.side_effect = [
+            [{'instanceId': 'a', 'region': 'BHS-1', 'status': 'BUILD'}],
+            [{'instanceId': 'a', 'region': 'BHS-1', 'status': 'ACTIVE'}]
+        ]
+        instance = self.client.instances._dict_to_obj(
+            {'instanceId': 'a', 'region': 'BHS-1', 'status': 'BUILD'})
+        statuses = run(self.client.instances.wait_for([instance]))
+        self.assertEqual(statuses, {'a': 'ACTIVE'})
+        self.assertEqual(instance.status, 'ACTIVE')
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    def test_account_get_with_balance(self):
+        balances = [
+            {'currentUsages': [{'currentTotal': 1.5}], 'creditLeft': 8},
+            {'currentUsages': [{'currentTotal': 2.5}], 'creditLeft': 7}
+        ]
+
+        async def get(path, content=None):
+            if path == '/me/balance':
+                return balances.pop(0)
+            return {'accountIdentifier': 'id'}
+        self.client._api.get.side_effect = get
+        account = run(self.client.account.get())
+        self.assertEqual(account.account_id, 'id')
+        self.assertEqual(account.current_total, 1.5)
+        self.assertEqual(account.credit_left, 8)
+        run(account.refresh_balance())
+        self.assertEqual(account.current_total, 2.5)
+
+    @mock.patch('asyncio.sleep', new_callable=mock.AsyncMock)
+    def test_account_watch_balance(self, mock_sleep):
+        self.client._api.get.side_effect = [
+            {'currentUsages': [{'currentTotal': 1}], 'creditLeft': 8},
+            {'currentUsages': [{'currentTotal': 1}], 'creditLeft': 8},
+            {'currentUsages': [{'currentTotal': 2}], 'creditLeft': 7}
+        ]
+
+        async def watch():
+            return [snapshot.current_total async for snapshot in
+                    self.client.account.watch_balance(max_polls=3)]
+        self.assertEqual(run(watch()), [1, 2])
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_ssh_key_delete(self):
+        run(self.client.ssh_keys.delete('BHS-1', 'key'))
+        self.client._api.delete.assert_called_once_with('/ssh/key',
+                                                        {'region': 'BHS-1'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -88,6 +88,10 @@ class TestRunabove(unittest.TestCase):
         self.assertEqual(self.client.get_consumer_key(),
                           self.consumer_key)
 
+    def test_close(self):
+        self.client.close()
+        self.mock_wrapper.close.assert_called_once_with()
+
     def test_existance_of_flavors_manager(self):
         manager = self.client.flavors
         self.assertIsInstance(manager, runabove.flavor.FlavorManager)
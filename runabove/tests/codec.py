@@ -0,0 +1,72 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+import unittest
+
+from runabove import codec
+
+
+class TestCodec(unittest.TestCase):
+
+    document = {'name': u'Test é', 'ram': 16384, 'ips': ['10.0.0.1']}
+
+    def _check(self, json_codec):
+        encoded = json_codec.encode(self.document)
+        encoded.encode('ascii')
+        self.assertEqual(json_codec.decode(encoded), self.document)
+        self.assertEqual(json_codec.decode(encoded.encode('utf-8')),
+                         self.document)
+        self.assertEqual(json_codec.decode(u'{"a": "é"}'.encode('utf-8')),
+                         {'a': u'é'})
+        with self.assertRaises(ValueError):
+            json_codec.decode(b'Not A Valid "JSON"')
+
+    def test_stdlib(self):
+        self._check(codec.StdlibCodec())
+
+    @unittest.skipIf(codec.orjson is None, 'orjson is not installed')
+    def test_orjson(self):
+        self._check(codec.OrjsonCodec())
+
+    @unittest.skipIf(codec.ujson is None, 'ujson is not installed')
+    def test_ujson(self):
+        self._check(codec.UjsonCodec())
+
+    def test_get_codec(self):
+        self.assertIsInstance(codec.get_codec(), codec.StdlibCodec)
+        self.assertIsInstance(codec.get_codec('json'), codec.StdlibCodec)
+        self.assertEqual(codec.get_codec('auto').name,
+                         codec.available_codecs()[0])
+        with self.assertRaises(ValueError):
+            codec.get_codec('yaml')
+
+    def test_available_codecs(self):
+        self.assertEqual(codec.available_codecs()[-1], 'json')
+
+if __name__ == '__main__':
+    unittest.main()
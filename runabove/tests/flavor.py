@@ -92,6 +92,34 @@ class TestFlavor(unittest.TestCase):
         for flavor in flavor_list:
             self.assertIsInstance(flavor, runabove.flavor.Flavor)
 
+    def test_list_all_regions(self):
+        answer = json.loads(self.answer_list)
+
+        def get(path, content):
+            if content['region'] == 'SBG-1':
+                raise runabove.exception.APIError(msg='Unavailable')
+            return answer
+        self.mock_wrapper.get.side_effect = get
+        flavors, errors = self.flavors.list_all_regions(['BHS-1', 'SBG-1'])
+        self.assertEqual(len(flavors), 2)
+        for flavor in flavors:
+            self.assertIsInstance(flavor, runabove.flavor.Flavor)
+        self.assertEqual(['SBG-1'], list(errors.keys()))
+        self.assertIsInstance(errors['SBG-1'], runabove.exception.APIError)
+
+    def test_list_all_regions_default(self):
+        region = mock.Mock()
+        region.name = 'BHS-1'
+        self.flavors._handler.regions.list.return_value = [region]
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+        flavors, errors = self.flavors.list_all_regions()
+        self.mock_wrapper.get.assert_called_once_with(
+            self.flavors.basepath,
+            {'region': 'BHS-1'}
+        )
+        self.assertEqual(len(flavors), 2)
+        self.assertEqual(errors, {})
+
     def test_get_by_name(self):
         self.mock_wrapper.get.return_value = json.loads(self.answer_list)
         f = self.flavors.get_by_name('pci2.d.r1')
@@ -103,6 +131,66 @@ class TestFlavor(unittest.TestCase):
         f = self.flavors.get_by_name('non-existent-flavor')
         self.assertEquals([], f)
 
+    def _use_region_manager(self):
+        self.flavors._handler.regions = runabove.region.RegionManager(
+            self.mock_wrapper,
+            self.flavors._handler
+        )
+
+    def test_get_by_name_in_region(self):
+        self._use_region_manager()
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+        self.assertEqual(1, len(self.flavors.get_by_name('pci2.d.r1',
+                                                         'BHS-1')))
+        self.assertEqual([], self.flavors.get_by_name('pci2.d.r1', 'SBG-1'))
+
+    def test_cache(self):
+        self._use_region_manager()
+        self.flavors.enable_cache(ttl=60)
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+        self.assertEqual(2, len(self.flavors.list()))
+        self.assertEqual(1, len(self.flavors.get_by_name('pci2.d.r1')))
+        self.assertEqual(1, len(self.flavors.get_by_name('pci2.d.c1',
+                                                         'BHS-1')))
+        self.assertEqual([], self.flavors.get_by_name('pci2.d.c1', 'SBG-1'))
+        f = self.flavors.get_by_id('ab35df0e-4632-48b2-b6a5-c1f1d922bd43')
+        self.assertEqual(f.name, 'pci2.d.c1')
+        self.mock_wrapper.get.assert_called_once_with(self.flavors.basepath)
+        stats = self.flavors.cache_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 4)
+        self.assertEqual(stats['size'], 2)
+
+    def test_cache_expired(self):
+        self.flavors.enable_cache(ttl=60)
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+        with mock.patch('time.time', return_value=1000):
+            self.flavors.list()
+        with mock.patch('time.time', return_value=1061):
+            self.flavors.list()
+        self.assertEqual(self.mock_wrapper.get.call_count, 2)
+
+    def test_cache_invalidate(self):
+        self.flavors.enable_cache()
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+        self.flavors.list()
+        self.flavors.invalidate_cache()
+        self.flavors.list()
+        self.assertEqual(self.mock_wrapper.get.call_count, 2)
+
+    def test_get_by_id_not_cached(self):
+        self.flavors.enable_cache()
+        self.mock_wrapper.get.side_effect = [
+            json.loads(self.answer_list),
+            json.loads(self.answer_one)
+        ]
+        f = self.flavors.get_by_id('a8e4f2cc-e6e1-4d7c-9fa5-27d0c4b6c2a1')
+        self.assertIsInstance(f, runabove.flavor.Flavor)
+        self.assertEqual(self.mock_wrapper.get.call_count, 2)
+
+    def test_cache_stats_disabled(self):
+        self.assertFalse(self.flavors.cache_stats()['enabled'])
+
     def test_get_by_id(self):
         self.mock_wrapper.get.return_value = json.loads(self.answer_one)
         f = self.flavors.get_by_id('4245b91e-d9cf-4c9d-a109-f6a32da8a5cc')
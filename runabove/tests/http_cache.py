@@ -0,0 +1,112 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+import unittest
+import mock
+
+from runabove.http_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('runabove.http_cache.time')
+        self.mock_time = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_time.time.return_value = 100.0
+
+    def test_key(self):
+        self.assertEqual(ResponseCache.key('/flavor'), ('/flavor', ''))
+        self.assertEqual(ResponseCache.key('/ssh', {'region': 'BHS-1'}),
+                         ('/ssh', '{"region": "BHS-1"}'))
+
+    def test_store_needs_validators(self):
+        cache = ResponseCache()
+        cache.store(('/flavor', ''), [], {})
+        self.assertIsNone(cache.get(('/flavor', '')))
+        cache.store(('/flavor', ''), [], {'ETag': '"v1"'})
+        entry = cache.get(('/flavor', ''))
+        self.assertEqual(entry.validators(), {'If-None-Match': '"v1"'})
+        self.assertFalse(cache.is_fresh(entry))
+
+    def test_freshness(self):
+        cache = ResponseCache(freshness=10)
+        cache.store(('/region', ''), ['BHS-1'], {})
+        entry = cache.get(('/region', ''))
+        self.assertTrue(cache.is_fresh(entry))
+        self.mock_time.time.return_value = 111.0
+        self.assertFalse(cache.is_fresh(entry))
+        cache.revalidated(entry)
+        self.assertTrue(cache.is_fresh(entry))
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['revalidated'], 1)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2, freshness=10)
+        cache.store(('/a', ''), 'a', {})
+        cache.store(('/b', ''), 'b', {})
+        cache.get(('/a', ''))
+        cache.store(('/c', ''), 'c', {})
+        self.assertIsNone(cache.get(('/b', '')))
+        self.assertEqual(cache.get(('/a', '')).value, 'a')
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_is_cacheable(self):
+        cache = ResponseCache()
+        self.assertTrue(cache.is_cacheable('/flavor'))
+        self.assertTrue(cache.is_cacheable('/ssh/key'))
+        self.assertFalse(cache.is_cacheable('/sshkeys'))
+        self.assertFalse(cache.is_cacheable('/instance'))
+        self.assertFalse(cache.is_cacheable('/me/balance'))
+        cache = ResponseCache(cacheable=('/token', '/me', '/instance/abc'))
+        self.assertEqual(cache.cacheable, ())
+        self.assertFalse(cache.is_cacheable('/token'))
+
+    def test_served_copies(self):
+        cache = ResponseCache(freshness=10)
+        value = [{'id': 'a'}]
+        cache.store(('/flavor', ''), value, {})
+        value.append('stored')
+        entry = cache.get(('/flavor', ''))
+        entry.copy()[0]['id'] = 'b'
+        self.assertEqual(entry.copy(), [{'id': 'a'}])
+
+    def test_invalidate(self):
+        cache = ResponseCache(freshness=10)
+        cache.store(('/instance', ''), [], {})
+        cache.store(('/instance/abc', ''), {}, {})
+        cache.store(('/ssh', ''), [], {})
+        cache.invalidate('/instance/abc/vnc')
+        self.assertIsNone(cache.get(('/instance', '')))
+        self.assertIsNotNone(cache.get(('/ssh', '')))
+        cache.invalidate()
+        self.assertEqual(cache.stats()['size'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -105,6 +105,13 @@ class TestImage(unittest.TestCase):
         f = self.images.get_by_name('non-existent-image')
         self.assertEquals([], f)
 
+    def test_get_by_name_cached(self):
+        self.images.enable_cache()
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+        self.assertEqual(1, len(self.images.get_by_name('Fedora 20')))
+        self.assertEqual(1, len(self.images.get_by_name('Fedora 20')))
+        self.mock_wrapper.get.assert_called_once_with(self.images.basepath)
+
     def test_find_by_image_id(self):
         the_id = "Pfdq813FxcFel78954aFEfcpaW21"
         self.mock_wrapper.get.return_value = json.loads(self.answer_one)
@@ -167,6 +167,55 @@ class TestInstance(unittest.TestCase):
         self.assertIsInstance(instance_list, list)
         self.assertTrue(len(instance_list) > 0)
 
+    def test_list_prefetch(self):
+        handler = self.instances._handler
+        handler.regions = runabove.region.RegionManager(None, None)
+        region = handler.regions._name_to_obj('BHS-1')
+        flavor = runabove.flavor.Flavor(
+            None, 'ab35df0e-4632-48b2-b6a5-c1f1d922bd43', 240, 'pci2.d.c1',
+            16384, 6, 'ra.sb', region)
+        image = runabove.image.Image(
+            None, '82a56d09-882d-48cc-82ce-eef59820879f', 'Debian 7', region,
+            'public')
+        key = runabove.ssh_key.SSHKey(None, 'MyTestKey', None, None, region)
+        handler.flavors.list.return_value = [flavor]
+        handler.images.list.return_value = [image]
+        handler.ssh_keys.list.return_value = [key]
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+
+        instances = self.instances.list(prefetch=True)
+
+        handler.flavors.list.assert_called_once_with()
+        handler.images.list.assert_called_once_with()
+        handler.ssh_keys.list.assert_called_once_with()
+        self.assertIs(instances[0].flavor, flavor)
+        self.assertIs(instances[1].flavor, flavor)
+        self.assertIs(instances[0].image, image)
+        self.assertIsNone(instances[0].ssh_key)
+        self.assertIs(instances[1].ssh_key, key)
+        self.assertFalse(handler.flavors.get_by_id.called)
+        self.assertFalse(handler.ssh_keys.get_by_name.called)
+        # Missing from the catalog, loaded lazily as before
+        self.assertIsNone(instances[1]._image)
+        instances[1].image
+        handler.images.get_by_id.assert_called_once_with(
+            '6915107b-e40d-4fd7-95f5-5e2bd5c106d3')
+
+    def test_list_by_region_prefetch_skips_unneeded_catalogs(self):
+        handler = self.instances._handler
+        handler.regions = runabove.region.RegionManager(None, None)
+        answer = json.loads(self.answer_list)[:1]
+        answer[0]['flavorId'] = None
+        answer[0]['imageId'] = None
+        self.mock_wrapper.get.return_value = answer
+        instances = self.instances.list_by_region('BHS-1', prefetch=True)
+        self.mock_wrapper.get.assert_called_once_with(
+            self.instances.basepath, {'region': 'BHS-1'})
+        self.assertEqual(len(instances), 1)
+        self.assertFalse(handler.flavors.list.called)
+        self.assertFalse(handler.images.list.called)
+        self.assertFalse(handler.ssh_keys.list.called)
+
     def test_get_by_id(self):
         self.mock_wrapper.encode_for_api.return_value = self.instance_id
         self.mock_wrapper.get.return_value = json.loads(self.answer_one)
@@ -253,6 +302,48 @@ class TestInstance(unittest.TestCase):
             self.instances.basepath + '/' + self.instance_id
         )
 
+    def _create_many(self, enrich=True):
+        specs = [
+            {'region': 'BHS-1', 'name': 'node%d' % i,
+             'flavor': 'flavor', 'image': 'image'}
+            for i in range(5)
+        ]
+
+        def post(path, content):
+            if content['name'] == 'node3':
+                raise runabove.exception.BadParametersError(msg='Error')
+            return {'instanceId': 'id-' + content['name']}
+        self.mock_wrapper.post.side_effect = post
+        self.mock_wrapper.get.return_value = json.loads(
+            self.answer_create_without_key
+        )
+        results = list(self.instances.create_many(specs, max_in_flight=2,
+                                                  enrich=enrich))
+        self.assertEqual(self.mock_wrapper.post.call_count, 5)
+        self.assertEqual(sorted(r.spec['name'] for r in results),
+                         ['node%d' % i for i in range(5)])
+        failed = [r for r in results if r.error]
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].spec['name'], 'node3')
+        self.assertIsNone(failed[0].instance)
+        return [r.instance for r in results if not r.error]
+
+    def test_create_many(self):
+        instances = self._create_many()
+        self.assertEqual(self.mock_wrapper.get.call_count, 4)
+        for instance in instances:
+            self.assertIsInstance(instance, runabove.instance.Instance)
+            self.assertEqual(instance.status, 'BUILD')
+
+    def test_create_many_without_enrich(self):
+        instances = self._create_many(enrich=False)
+        self.mock_wrapper.get.assert_not_called()
+        self.assertEqual(sorted(i.id for i in instances),
+                         ['id-node0', 'id-node1', 'id-node2', 'id-node4'])
+        for instance in instances:
+            self.assertEqual(instance._flavor_id, 'flavor')
+            self.assertIsNone(instance.status)
+
     def test_rename_vm(self):
         name = 'MyTestInstanceWithNewName'
         self.mock_wrapper.encode_for_api.return_value = self.instance_id
@@ -0,0 +1,113 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+import unittest
+
+from runabove.instrumentation import CallInfo, HistogramCollector, \
+    PrometheusExporter, path_template
+
+
+class TestPathTemplate(unittest.TestCase):
+
+    def test_path_template(self):
+        self.assertEqual(path_template('/instance'), '/instance')
+        self.assertEqual(path_template('/instance/8c687d5d'),
+                         '/instance/{id}')
+        self.assertEqual(path_template('/instance/8c687d5d/vnc'),
+                         '/instance/{id}/vnc')
+        self.assertEqual(path_template('/ssh/MyKey?region=BHS-1'),
+                         '/ssh/{id}')
+        self.assertEqual(path_template('/me/balance'), '/me/balance')
+
+
+class TestHistogramCollector(unittest.TestCase):
+
+    def _info(self, path, status, total, method='get'):
+        info = CallInfo(method, path)
+        info.status = status
+        info.total = total
+        info.response_bytes = 100
+        info.add_timing('response', total / 2)
+        return info
+
+    def test_after_call(self):
+        collector = HistogramCollector(buckets=(0.1, 1))
+        collector.after_call(self._info('/instance/a', 200, 0.05))
+        collector.after_call(self._info('/instance/b', 200, 0.5))
+        collector.after_call(self._info('/instance/c', 404, 2))
+        collector.after_call(self._info('/instance', None, 0.01))
+        snapshot = collector.snapshot()
+        ok = snapshot[('GET', '/instance/{id}', '200')]
+        self.assertEqual(ok['count'], 2)
+        self.assertEqual(ok['sum'], 0.55)
+        self.assertEqual(ok['buckets'], [1, 2])
+        self.assertEqual(ok['timings']['response'], 0.275)
+        self.assertEqual(ok['response_bytes'], 200)
+        self.assertEqual(snapshot[('GET', '/instance/{id}', '404')]
+                         ['buckets'], [0, 0])
+        self.assertIn(('GET', '/instance', 'error'), snapshot)
+        collector.reset()
+        self.assertEqual(collector.snapshot(), {})
+
+
+class TestPrometheusExporter(unittest.TestCase):
+
+    def test_render(self):
+        collector = HistogramCollector(buckets=(0.1, 1))
+        info = CallInfo('get', '/instance/a')
+        info.status = 200
+        info.total = 0.5
+        info.request_bytes = 0
+        info.response_bytes = 42
+        collector.after_call(info)
+        lines = PrometheusExporter(collector).render().splitlines()
+        labels = 'method="GET",path="/instance/{id}",status="200"'
+        self.assertIn('# TYPE runabove_api_call_duration_seconds histogram',
+                      lines)
+        self.assertIn('runabove_api_call_duration_seconds_bucket{le="0.1",%s}'
+                      ' 0' % labels, lines)
+        self.assertIn('runabove_api_call_duration_seconds_bucket{le="1.0",%s}'
+                      ' 1' % labels, lines)
+        self.assertIn('runabove_api_call_duration_seconds_bucket'
+                      '{le="+Inf",%s} 1' % labels, lines)
+        self.assertIn('runabove_api_call_duration_seconds_count{%s} 1'
+                      % labels, lines)
+        self.assertIn('runabove_api_call_duration_seconds_sum{%s} 0.5'
+                      % labels, lines)
+        self.assertIn('runabove_api_response_bytes_total{%s} 42' % labels,
+                      lines)
+        self.assertIn('runabove_api_call_phase_seconds_total{method="GET",'
+                      'path="/instance/{id}",phase="decode",status="200"} 0.0',
+                      lines)
+
+    def test_escape(self):
+        self.assertEqual(PrometheusExporter._escape('a"b\\c\nd'),
+                         'a\\"b\\\\c\\nd')
+
+if __name__ == '__main__':
+    unittest.main()
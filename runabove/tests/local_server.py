@@ -0,0 +1,184 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+import unittest
+import json
+
+import requests
+
+import runabove
+from runabove.http_cache import ResponseCache
+from runabove.local_server import LocalApiServer
+from runabove.retry import RetryPolicy
+
+
+class TestLocalApiServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalApiServer()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.client = self.server.client(
+            retry_policy=RetryPolicy(backoff=0, jitter=0))
+
+    def test_catalog(self):
+        regions = self.client.regions.list()
+        self.assertEqual([r.name for r in regions], ['BHS-1', 'SBG-1'])
+        flavors = self.client.flavors.list_by_region('SBG-1')
+        self.assertEqual(len(flavors), 3)
+        flavor = self.client.flavors.get_by_id(flavors[0].id)
+        self.assertEqual(flavor.region.name, 'SBG-1')
+        with self.assertRaises(runabove.exception.ResourceNotFoundError):
+            self.client.images.get_by_id('404')
+
+    def test_instance_lifecycle(self):
+        region = self.client.regions.get_by_name('BHS-1')
+        flavor = self.client.flavors.list_by_region(region)[0]
+        image = self.client.images.list_by_region(region)[0]
+        key = self.client.ssh_keys.create(region, 'key', 'ssh-rsa AAAA')
+        with self.assertRaises(
+                runabove.exception.ResourceAlreadyExistsError):
+            self.client.ssh_keys.create(region, 'key', 'ssh-rsa AAAA')
+        instance = self.client.instances.create(region, 'web', flavor,
+                                                image, key)
+        self.assertEqual(instance.status, 'ACTIVE')
+        self.assertEqual(instance.flavor.id, flavor.id)
+        self.assertEqual(instance.ssh_key.name, 'key')
+        instance.rename('www')
+        listed = self.client.instances.list()
+        self.assertEqual([i.name for i in listed], ['www'])
+        instance.delete()
+        self.assertEqual(self.client.instances.list(), [])
+
+    def test_build_time(self):
+        self.server.build_time = 3600
+        instance_id = self.server.seed_instances(1, status='BUILD')[0]
+        instance = self.client.instances.get_by_id(instance_id)
+        self.assertEqual(instance.status, 'BUILD')
+        self.server.build_time = 0
+        self.server.seed_instances(1, status='BUILD')
+        statuses = [i.status for i in self.client.instances.list()]
+        self.assertEqual(sorted(statuses), ['ACTIVE', 'BUILD'])
+
+    def test_account_and_token(self):
+        self.server.seed_instances(5)
+        account = self.client.account.get()
+        self.assertEqual(account.current_total, 0.1)
+        self.assertEqual(account.credit_left, 99.9)
+        token = self.client.tokens.get()
+        endpoint = token.get_endpoint('object-store', 'SBG-1')
+        self.assertTrue(endpoint['url'].startswith(
+            self.server.root_url + '/swift/SBG-1/v1/AUTH_'))
+
+    def test_response_cache_skips_changing_paths(self):
+        client = self.server.client(response_cache=ResponseCache(
+            freshness=30))
+        self.server.build_time = 3600
+        self.server.seed_instances(1, status='BUILD')
+        self.assertEqual(client.instances.list_by_region('BHS-1')[0].status,
+                         'BUILD')
+        self.server.build_time = 0
+        self.server.seed_instances(1, status='BUILD')
+        statuses = [i.status for i in
+                    client.instances.list_by_region('BHS-1')]
+        self.assertEqual(sorted(statuses), ['ACTIVE', 'BUILD'])
+        tokens = client.tokens
+        self.assertNotEqual(tokens._fetch().auth_token,
+                            tokens._fetch().auth_token)
+        client.regions.list()
+        client.regions.list()
+        self.assertEqual(self.server.stats()[('GET', '/token')], 2)
+        self.assertEqual(self.server.stats()[('GET', '/region')], 1)
+
+    def test_signature_checked(self):
+        client = runabove.Runabove(self.server.application_key,
+                                   'wrong-secret', self.server.consumer_key,
+                                   base_url=self.server.base_url)
+        with self.assertRaises(runabove.exception.APIError) as cm:
+            client.regions.list()
+        self.assertIn('Invalid signature', str(cm.exception))
+        answer = requests.get(self.server.base_url + '/region')
+        self.assertEqual(answer.status_code, 403)
+        self.assertEqual(answer.json(), {'message': 'Invalid application key'})
+
+    def test_new_consumer_key(self):
+        client = runabove.Runabove(self.server.application_key,
+                                   self.server.application_secret,
+                                   base_url=self.server.base_url)
+        client.get_login_url()
+        self.assertEqual(len(client.regions.list()), 2)
+
+    def test_injected_errors_retried(self):
+        self.server.fail_next(503, count=2)
+        self.assertEqual(len(self.client.regions.list()), 2)
+        self.assertEqual(self.client._api.retry_policy.stats()['retries'], 2)
+        self.server.error_rate = 1
+        with self.assertRaises(runabove.exception.APIError):
+            self.client.regions.list()
+
+    def test_stats_by_template(self):
+        ids = self.server.seed_instances(2)
+        for instance_id in ids:
+            self.client.instances.get_by_id(instance_id)
+        self.assertEqual(self.server.stats()[('GET', '/instance/{id}')], 2)
+
+    def test_object_storage(self):
+        container = self.client.containers.create('BHS-1', 'bench')
+        for name in ('b/1', 'a', 'b/2', 'c'):
+            container.create_object(name, name.encode('utf-8') * 4,
+                                    fetch=False)
+        self.assertEqual([o.name for o in container.list_objects()],
+                         ['a', 'b/1', 'b/2', 'c'])
+        names = [o.name for o in container.iter_objects(delimiter='/',
+                                                        page_size=1)]
+        self.assertEqual(names, ['a', 'b/', 'c'])
+        obj = container.get_object_by_name('b/2', download=True)
+        self.assertEqual(obj.data, b'b/2b/2b/2b/2')
+        self.assertEqual(obj.read_range(3, 5), b'b/2')
+        container.delete_object('a')
+        self.assertEqual(len(container.list_objects()), 3)
+        template = ('PUT', '/swift/{region}/v1/{account}/{container}/{object}')
+        self.assertEqual(self.server.stats()[template], 4)
+
+    def test_object_storage_needs_token(self):
+        self.client.containers.create('SBG-1', 'bench')
+        url = self.server.root_url + '/swift/SBG-1/v1/AUTH_%s/bench' % (
+            self.server.project_id)
+        self.assertEqual(requests.get(url).status_code, 401)
+
+    def test_unknown_path(self):
+        status, content, headers = self.server.handle(
+            'GET', '/1.0/nothing', {}, b'')
+        self.assertEqual(status, 404)
+        self.assertEqual(json.loads(content), {'message': 'Path not found'})
+        status, content, headers = self.server.handle(
+            'PATCH', '/1.0/region', {}, b'')
+        self.assertEqual(status, 405)
+
+if __name__ == '__main__':
+    unittest.main()
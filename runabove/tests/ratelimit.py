@@ -0,0 +1,119 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+import threading
+import unittest
+import mock
+
+from runabove.ratelimit import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    @mock.patch('runabove.ratelimit.time')
+    def test_reserve(self, mock_time):
+        mock_time.time.return_value = 100.0
+        bucket = TokenBucket(2, burst=3)
+        self.assertEqual([bucket.reserve() for _ in range(5)],
+                         [0, 0, 0, 0.5, 1.0])
+        mock_time.time.return_value = 102.0
+        self.assertEqual([bucket.reserve() for _ in range(3)],
+                         [0, 0, 0.5])
+
+    @mock.patch('runabove.ratelimit.time')
+    def test_refill_is_capped(self, mock_time):
+        mock_time.time.return_value = 100.0
+        bucket = TokenBucket(10)
+        mock_time.time.return_value = 1000.0
+        waits = [bucket.reserve() for _ in range(11)]
+        self.assertEqual(waits[:10], [0] * 10)
+        self.assertEqual(waits[10], 0.1)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('runabove.ratelimit.time')
+        self.mock_time = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_time.time.return_value = 100.0
+
+    def test_prefix(self):
+        self.assertEqual(RateLimiter.prefix('/instance/abc/vnc'), '/instance')
+        self.assertEqual(RateLimiter.prefix('/token'), '/token')
+        self.assertEqual(RateLimiter.prefix('/me/balance?x=1'), '/me')
+
+    def test_buckets_by_prefix(self):
+        limiter = RateLimiter(rate=1, limits={'/token': (1, 2)})
+        self.assertEqual(limiter.acquire('/instance'), 0)
+        self.assertEqual(limiter.acquire('/instance/abc'), 1)
+        self.mock_time.sleep.assert_called_once_with(1)
+        self.assertEqual(limiter.acquire('/storage'), 0)
+        self.assertEqual(limiter.acquire('/token'), 0)
+        self.assertEqual(limiter.acquire('/token'), 0)
+        self.assertEqual(limiter.acquire('/token'), 1)
+
+    def test_unlimited(self):
+        limiter = RateLimiter()
+        for _ in range(100):
+            self.assertEqual(limiter.acquire('/instance'), 0)
+        self.assertFalse(self.mock_time.sleep.called)
+
+    def test_stats(self):
+        limiter = RateLimiter(rate=2, burst=1)
+        with limiter.limit('/instance'):
+            self.assertEqual(limiter.stats()['in_flight'], 1)
+        with limiter.limit('/instance'):
+            pass
+        with limiter.limit('/instance'):
+            pass
+        stats = limiter.stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['prefixes']['/instance'], {
+            'calls': 3, 'delayed': 2, 'waited': 1.5, 'max_wait': 1.0
+        })
+
+    def test_max_concurrency(self):
+        self.mock_time.time.side_effect = lambda: 100.0
+        limiter = RateLimiter(max_concurrency=1)
+        limiter.acquire('/instance')
+        acquired = threading.Event()
+
+        def second_call():
+            limiter.acquire('/instance')
+            acquired.set()
+            limiter.release()
+        thread = threading.Thread(target=second_call)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+if __name__ == '__main__':
+    unittest.main()
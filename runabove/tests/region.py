@@ -60,6 +60,17 @@ class TestRegion(unittest.TestCase):
         self.assertIsInstance(region, runabove.region.Region)
         self.assertEqual(region.name, region_name)
 
+    def test_name_to_obj_interned(self):
+        self.mock_wrapper.get.return_value = json.loads(self.answer_list)
+        region = self.regions._name_to_obj('BHS-1')
+        self.assertIs(self.regions._name_to_obj('BHS-1'), region)
+        self.assertIs(self.regions.list()[0], region)
+        self.assertIsNot(self.regions._name_to_obj('SBG-1'), region)
+
+    def test_region_has_no_dict(self):
+        region = self.regions._name_to_obj('BHS-1')
+        self.assertFalse(hasattr(region, '__dict__'))
+
     def test_get_by_name_404(self):
         with self.assertRaises(runabove.exception.ResourceNotFoundError):
             self.regions.get_by_name('RBX-404')
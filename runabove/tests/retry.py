@@ -0,0 +1,111 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+import unittest
+import mock
+
+from runabove.retry import RetryPolicy
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_is_retryable(self):
+        policy = RetryPolicy()
+        for method in ('get', 'PUT', 'delete'):
+            self.assertTrue(policy.is_retryable(method))
+        self.assertFalse(policy.is_retryable('post'))
+        self.assertTrue(RetryPolicy(retry_post=True).is_retryable('post'))
+
+    def test_backoff(self):
+        policy = RetryPolicy(max_attempts=10, backoff=1, max_backoff=5,
+                             jitter=0)
+        delays = [policy.next_delay(attempt, True, 503)
+                  for attempt in range(1, 6)]
+        self.assertEqual(delays, [1, 2, 4, 5, 5])
+
+    @mock.patch('runabove.retry.random')
+    def test_jitter(self, mock_random):
+        policy = RetryPolicy(backoff=2, jitter=0.5)
+        mock_random.random.return_value = 0
+        self.assertEqual(policy.next_delay(1, True, 503), 1)
+        mock_random.random.return_value = 1
+        self.assertEqual(policy.next_delay(1, True, 503), 3)
+
+    def test_not_retryable(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.next_delay(1, False, 503))
+        self.assertEqual(policy.stats()['retries'], 0)
+
+    def test_max_attempts(self):
+        policy = RetryPolicy(max_attempts=2)
+        self.assertIsNotNone(policy.next_delay(1, True, 503))
+        self.assertIsNone(policy.next_delay(2, True, 503))
+        self.assertEqual(policy.stats()['gave_up'], 1)
+
+    def test_budget(self):
+        policy = RetryPolicy(max_attempts=10, budget_ratio=0.5,
+                             budget_reserve=2)
+        self.assertIsNotNone(policy.next_delay(1, True, 503))
+        self.assertIsNotNone(policy.next_delay(1, True, 503))
+        self.assertIsNone(policy.next_delay(1, True, 503))
+        policy.start_call()
+        self.assertIsNone(policy.next_delay(1, True, 503))
+        policy.start_call()
+        self.assertIsNotNone(policy.next_delay(1, True, 503))
+        stats = policy.stats()
+        self.assertEqual(stats['budget_exhausted'], 2)
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['retries'], 3)
+
+    def test_retry_after(self):
+        policy = RetryPolicy(max_retry_after=60)
+        self.assertEqual(policy.next_delay(1, True, 429, '12'), 12)
+        self.assertEqual(policy.next_delay(1, True, 429, '3600'), 60)
+
+    @mock.patch('runabove.retry.time')
+    def test_retry_after_date(self, mock_time):
+        mock_time.time.return_value = 1404395889
+        policy = RetryPolicy(jitter=0)
+        delay = policy.next_delay(1, True, 503,
+                                  'Thu, 03 Jul 2014 13:58:19 GMT')
+        self.assertEqual(delay, 10)
+        self.assertEqual(policy.next_delay(1, True, 503, 'soon'), 0.5)
+
+    def test_stats(self):
+        policy = RetryPolicy(jitter=0)
+        policy.start_call()
+        policy.next_delay(1, True, 503)
+        policy.next_delay(2, True, 'ConnectionError')
+        stats = policy.stats()
+        self.assertEqual(stats['reasons'], {503: 1, 'ConnectionError': 1})
+        self.assertEqual(stats['waited'], 1.5)
+        stats['reasons'][503] = 10
+        self.assertEqual(policy.stats()['reasons'][503], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+import unittest
+import os
+import shutil
+import tempfile
+
+import mock
+
+from runabove.skew import MemorySkewStore, FileSkewStore
+
+
+class TestMemorySkewStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemorySkewStore()
+
+    def test_get_unknown(self):
+        self.assertIsNone(self.store.get('https://api'))
+
+    def test_set_and_get(self):
+        self.store.set('https://api', 5)
+        self.assertEqual(self.store.get('https://api'), 5)
+
+    def test_max_age(self):
+        with mock.patch('time.time', return_value=1000):
+            self.store.set('https://api', 5)
+        with mock.patch('time.time', return_value=1030):
+            self.assertEqual(self.store.get('https://api', max_age=60), 5)
+            self.assertIsNone(self.store.get('https://api', max_age=20))
+
+    def test_get_entry(self):
+        with mock.patch('time.time', return_value=1000):
+            self.store.set('https://api', 5)
+        self.assertEqual(self.store.get_entry('https://api'), (5, 1000))
+        self.assertIsNone(self.store.get_entry('https://other'))
+
+
+class TestFileSkewStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'skew.json')
+        self.store = FileSkewStore(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_without_file(self):
+        self.assertIsNone(self.store.get('https://api'))
+
+    def test_shared_between_stores(self):
+        self.store.set('https://api', -3)
+        self.store.set('https://other', 2)
+        other = FileSkewStore(self.path)
+        self.assertEqual(other.get('https://api'), -3)
+        self.assertEqual(other.get('https://other'), 2)
+
+    def test_get_entry(self):
+        with mock.patch('time.time', return_value=1000):
+            self.store.set('https://api', -3)
+        self.assertEqual(self.store.get_entry('https://api'), (-3, 1000))
+
+    def test_max_age(self):
+        with mock.patch('time.time', return_value=1000):
+            self.store.set('https://api', 5)
+        with mock.patch('time.time', return_value=1100):
+            self.assertIsNone(self.store.get('https://api', max_age=60))
+
+    def test_corrupted_file(self):
+        with open(self.path, 'w') as handle:
+            handle.write('not json')
+        self.assertIsNone(self.store.get('https://api'))
+        self.store.set('https://api', 1)
+        self.assertEqual(self.store.get('https://api'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,9 +26,15 @@
 # written authorization from OVH.
 
 import unittest
+import hashlib
+import io
 import json
+import os
+import shutil
+import tempfile
 import mock
 import runabove
+from runabove.ratelimit import RateLimiter
 
 from sys import version_info
 
@@ -184,6 +190,48 @@ class TestContainerManager(unittest.TestCase):
         self.containers._swifts = swifts
         self.containers._swift_call('BHS-1', 'put_container')
 
+    @mock.patch('runabove.storage.ContainerManager._get_swift_client')
+    def test_swift_call_invalid_token(self, mock_get_swift_client):
+        expired = mock.Mock()
+        expired.head_container.side_effect = \
+            runabove.storage.swiftclient.exceptions.ClientException(
+                'Unauthorized', http_status=401)
+        valid = mock.Mock()
+        mock_get_swift_client.side_effect = [
+            {'client': expired, 'endpoint': 'http://endpoint'},
+            {'client': valid, 'endpoint': 'http://endpoint'}
+        ]
+        self.containers._swift_call('BHS-1', 'head_container', 'test')
+        valid.head_container.assert_called_once_with('test')
+        self.mock_client.tokens.invalidate_cache.assert_called_once_with()
+
+    @mock.patch('swiftclient.client.Connection')
+    def test_threaded_swift_call(self, mock_connection):
+        shared = mock.Mock(url='http://endpoint', token='token')
+        mock_connection.return_value.url = shared.url
+        mock_connection.return_value.token = shared.token
+        self.containers.swifts = {
+            'BHS-1': {'client': shared, 'endpoint': 'http://endpoint'}
+        }
+        self.containers._threaded_swift_call('BHS-1', 'put_object', 'a')
+        self.containers._threaded_swift_call('BHS-1', 'put_object', 'b')
+        mock_connection.assert_called_once_with(preauthurl='http://endpoint',
+                                                preauthtoken='token')
+        self.assertEqual(mock_connection.return_value.put_object.call_count,
+                         2)
+        shared.put_object.assert_not_called()
+
+    def test_swift_call_rate_limited(self):
+        self.mock_wrapper.rate_limiter = RateLimiter()
+        client = mock.Mock()
+        self.containers.swifts = {
+            'BHS-1': {'client': client, 'endpoint': 'http://endpoint'}
+        }
+        self.containers._swift_call('BHS-1', 'head_container', 'test')
+        client.head_container.assert_called_once_with('test')
+        stats = self.mock_wrapper.rate_limiter.stats()
+        self.assertEqual(stats['prefixes']['/storage']['calls'], 1)
+
     @mock.patch('runabove.storage.ContainerManager._swift_call')
     def test_get_by_name(self, mock_swift_call):
         container = self.containers.get_by_name(self.region, self.name)
@@ -389,6 +437,59 @@ class TestContainer(unittest.TestCase):
         for obj in object_list:
             self.assertIsInstance(obj, runabove.storage.ObjectStored)
 
+    def test_iter_objects(self):
+        pages = [
+            [{}, [{'name': 'obj1'}, {'name': 'obj2'}]],
+            [{}, [{'name': 'obj3'}, {'subdir': 'dir/'}]],
+            [{}, []]
+        ]
+        self.mock_containers._swift_call.side_effect = pages
+        objects = self.container.iter_objects(prefix='o', delimiter='/',
+                                              page_size=2)
+        self.assertFalse(self.mock_containers._swift_call.called)
+        names = [obj.name for obj in objects]
+        self.assertEqual(names, ['obj1', 'obj2', 'obj3', 'dir/'])
+        self.assertEqual(self.mock_containers._swift_call.call_count, 3)
+        self.mock_containers._swift_call.assert_called_with(
+            self.mock_region.name,
+            'get_container',
+            self.container_name,
+            marker='dir/',
+            limit=2,
+            prefix='o',
+            delimiter='/',
+            end_marker=None
+        )
+
+    def test_iter_objects_last_page(self):
+        answer = json.loads(self.answer_list)
+        self.mock_containers._swift_call.side_effect = [answer, [{}, []]]
+        objects = list(self.container.iter_objects(end_marker='obj3'))
+        self.assertEqual(len(objects), 2)
+        self.assertEqual(self.mock_containers._swift_call.call_count, 2)
+        self.mock_containers._swift_call.assert_called_with(
+            self.mock_region.name,
+            'get_container',
+            self.container_name,
+            marker=answer[1][-1]['name'],
+            limit=1000,
+            prefix=None,
+            delimiter=None,
+            end_marker='obj3'
+        )
+
+    def test_iter_objects_pages_capped_by_server(self):
+        pages = [
+            [{}, [{'name': 'obj%d' % i} for i in range(3)]],
+            [{}, [{'name': 'obj%d' % i} for i in range(3, 5)]],
+            [{}, []]
+        ]
+        self.mock_containers._swift_call.side_effect = pages
+        objects = self.container.iter_objects(page_size=20000)
+        self.assertEqual([obj.name for obj in objects],
+                         ['obj0', 'obj1', 'obj2', 'obj3', 'obj4'])
+        self.assertEqual(self.mock_containers._swift_call.call_count, 3)
+
     def _get_object_by_name(self, download=False):
         swift_answer = self.answer_head_object
         call = 'head_object'
@@ -443,6 +544,119 @@ class TestContainer(unittest.TestCase):
             headers=None
         )
 
+    @mock.patch('runabove.storage.Container.get_object_by_name')
+    def test_create_object_without_fetch(self, mock_get_object_by_name):
+        obj = self.container.create_object('Test', 'content', fetch=False)
+        mock_get_object_by_name.assert_not_called()
+        self.assertIsInstance(obj, runabove.storage.ObjectStored)
+        self.assertEqual(obj.name, 'Test')
+
+    def test_upload_many(self):
+        self.mock_containers._threaded_swift_call.return_value = 'etag'
+        objects = [('obj%d' % i, 'content') for i in range(20)]
+        report = self.container.upload_many(objects, max_workers=3)
+        self.assertEqual(self.mock_containers._threaded_swift_call.call_count,
+                         20)
+        self.mock_containers._threaded_swift_call.assert_any_call(
+            self.mock_region.name,
+            'put_object',
+            self.container_name,
+            'obj7',
+            'content',
+            headers=None
+        )
+        self.assertEqual(len(report.succeeded), 20)
+        self.assertEqual(report.bytes_uploaded, 140)
+        self.assertEqual(sorted(r.name for r in report.results),
+                         sorted(name for name, _ in objects))
+        self.assertGreaterEqual(report.throughput, 0)
+
+    def test_upload_many_with_errors(self):
+        def put(region, action, container, name, content, headers):
+            if name == 'bad':
+                raise runabove.exception.APIError(msg='Failed')
+            return 'etag'
+        self.mock_containers._threaded_swift_call.side_effect = put
+        report = self.container.upload_many([('good', 'a'), ('bad', 'b')])
+        self.assertEqual([r.name for r in report.succeeded], ['good'])
+        self.assertEqual([r.name for r in report.failed], ['bad'])
+        self.assertIsInstance(report.failed[0].error,
+                              runabove.exception.APIError)
+
+    def test_upload_many_with_callable_and_fetch(self):
+        source = mock.Mock()
+        source.return_value.fileno.side_effect = AttributeError
+        self.mock_containers._threaded_swift_call.side_effect = [
+            'etag',
+            TestContainer.answer_head_object
+        ]
+        report = self.container.upload_many([('obj', source)], fetch=True)
+        source.return_value.close.assert_called_once_with()
+        self.assertEqual(report.results[0].obj._meta,
+                         TestContainer.answer_head_object)
+
+    def _create_large_object(self, uploaded=None):
+        content = b'0123456789abcdefghijABCDE'
+        segment_prefix = 'big/slo/25/10/'
+        listing = []
+        for index in uploaded or []:
+            data = content[index * 10:(index + 1) * 10]
+            listing.append({
+                'name': '%s%08d' % (segment_prefix, index),
+                'hash': hashlib.md5(data).hexdigest(),
+                'bytes': len(data)
+            })
+
+        def swift_call(region, action, *args, **kwargs):
+            if action == 'get_container':
+                return [{}, listing]
+        self.mock_containers._swift_call.side_effect = swift_call
+        self.container.create_large_object('big', io.BytesIO(content),
+                                           segment_size=10, fetch=False)
+        put_segments = self.mock_containers._threaded_swift_call.call_args_list
+        manifest_call = self.mock_containers._swift_call.call_args_list[-1]
+        self.assertEqual(manifest_call[0][1:4],
+                         ('put_object', self.container_name, 'big'))
+        self.assertEqual(manifest_call[1]['query_string'],
+                         'multipart-manifest=put')
+        manifest = json.loads(manifest_call[0][4])
+        self.assertEqual([seg['size_bytes'] for seg in manifest],
+                         [10, 10, 5])
+        self.assertEqual(manifest[2]['path'], '/%s_segments/%s%08d' %
+                         (self.container_name, segment_prefix, 2))
+        return sorted(call[0][3] for call in put_segments)
+
+    def test_create_large_object(self):
+        segments = self._create_large_object()
+        self.assertEqual(segments, ['big/slo/25/10/00000000',
+                                    'big/slo/25/10/00000001',
+                                    'big/slo/25/10/00000002'])
+        self.mock_containers._swift_call.assert_any_call(
+            self.mock_region.name,
+            'put_container',
+            self.container_name + '_segments'
+        )
+
+    def test_create_large_object_resume(self):
+        segments = self._create_large_object(uploaded=[0, 2])
+        self.assertEqual(segments, ['big/slo/25/10/00000001'])
+
+    def test_create_large_object_with_failed_segment(self):
+        self.mock_containers._swift_call.return_value = [{}, []]
+        self.mock_containers._threaded_swift_call.side_effect = \
+            runabove.exception.APIError(msg='Failed')
+        with self.assertRaises(runabove.exception.APIError):
+            self.container.create_large_object('big', io.BytesIO(b'x' * 25),
+                                               segment_size=10)
+        self.assertEqual(self.mock_containers._swift_call.call_count, 2)
+
+    @mock.patch('runabove.storage.Container.create_object')
+    def test_create_large_object_small(self, mock_create_object):
+        self.container.create_large_object('small', io.BytesIO(b'abc'),
+                                           segment_size=10)
+        mock_create_object.assert_called_once_with('small', b'abc',
+                                                   meta=None, fetch=True)
+
     @mock.patch('runabove.storage.ObjectStored')
     def test_copy(self, mock_obj):
         to_container = 'CopyTo'
@@ -509,6 +723,9 @@ class TestObjectStored(unittest.TestCase):
             self.obj_name
         )
 
+    def test_has_no_dict(self):
+        self.assertFalse(hasattr(self.obj, '__dict__'))
+
     @mock.patch('runabove.storage.ObjectStored')
     def test_data(self, mock_obj):
         fake_data = 'SomeData'
@@ -546,6 +763,73 @@ class TestObjectStored(unittest.TestCase):
         self.mock_container.get_object_by_name.assert_not_called()
         self.assertEqual(data, fake_data)
 
+    content = b'0123456789abcdefghij'
+
+    def _serve_content(self):
+        def get_object(region, action, container, name, resp_chunk_size,
+                       headers):
+            start, end = 0, len(self.content) - 1
+            if 'Range' in headers:
+                first, last = headers['Range'][len('bytes='):].split('-')
+                if first:
+                    start = int(first)
+                    end = min(int(last), end) if last else end
+                else:
+                    # Suffix range, the last bytes of the object
+                    start = max(len(self.content) - int(last), 0)
+            data = self.content[start:end + 1]
+            chunks = [data[i:i + resp_chunk_size]
+                      for i in range(0, len(data), resp_chunk_size)]
+            return {}, iter(chunks)
+        self.mock_container._manager._threaded_swift_call.side_effect = \
+            get_object
+
+    def test_iter_content(self):
+        self._serve_content()
+        chunks = list(self.obj.iter_content(chunk_size=8))
+        self.assertEqual(chunks, [b'01234567', b'89abcdef', b'ghij'])
+        self.mock_container._manager._threaded_swift_call.\
+            assert_called_once_with(
+                self.mock_container.region.name,
+                'get_object',
+                self.mock_container.name,
+                self.obj_name,
+                resp_chunk_size=8,
+                headers={}
+            )
+
+    def test_read_range(self):
+        self._serve_content()
+        self.assertEqual(self.obj.read_range(5, 9), b'56789')
+        self.assertEqual(self.obj.read_range(15), b'fghij')
+
+    def test_iter_content_up_to_end(self):
+        self._serve_content()
+        self.assertEqual(b''.join(self.obj.iter_content(end=2)), b'012')
+        headers = self.mock_container._manager._threaded_swift_call.\
+            call_args[1]['headers']
+        self.assertEqual(headers, {'Range': 'bytes=0-2'})
+
+    def test_download_to_file_object(self):
+        self._serve_content()
+        destination = io.BytesIO()
+        self.assertEqual(self.obj.download_to(destination, chunk_size=3), 20)
+        self.assertEqual(destination.getvalue(), self.content)
+
+    def test_download_to_path_in_parallel(self):
+        self._serve_content()
+        self.obj._meta = {'content-length': str(len(self.content))}
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'download')
+        written = self.obj.download_to(path, chunk_size=4, max_workers=3,
+                                       part_size=6)
+        self.assertEqual(written, 20)
+        with open(path, 'rb') as handle:
+            self.assertEqual(handle.read(), self.content)
+        self.assertEqual(
+            self.mock_container._manager._threaded_swift_call.call_count, 4)
+
     def test_url(self):
         base_url = 'https://url-of-endpoint/containerName'
         self.mock_container.url = base_url
@@ -28,6 +28,9 @@
 import unittest
 import mock
 import json
+import threading
+import time
+from datetime import datetime
 
 import runabove
 
@@ -101,6 +104,75 @@ class TestToken(unittest.TestCase):
         token = self.token.get()
         self.assertIsInstance(token, runabove.token.Token)
 
+    def _utcnow(self, now):
+        patcher = mock.patch('runabove.token.datetime')
+        mock_datetime = patcher.start()
+        self.addCleanup(patcher.stop)
+        mock_datetime.utcnow.return_value = now
+        mock_datetime.strptime.side_effect = datetime.strptime
+
+    def test_token_cached(self):
+        self._utcnow(datetime(2014, 8, 9, 10, 0, 0))
+        self.mock_wrapper.get.return_value = json.loads(self.answer_token)
+        token = self.token.get()
+        self.assertIs(self.token.get(), token)
+        self.mock_wrapper.get.assert_called_once_with(self.token.basepath)
+        stats = self.token.cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['refreshes'], 1)
+
+    def test_token_expired(self):
+        self._utcnow(datetime(2014, 8, 9, 18, 32, 0))
+        self.mock_wrapper.get.return_value = json.loads(self.answer_token)
+        self.token.get()
+        self.token.get()
+        self.assertEqual(self.mock_wrapper.get.call_count, 2)
+
+    def test_token_refresh_ahead(self):
+        self._utcnow(datetime(2014, 8, 9, 18, 30, 0))
+        self.mock_wrapper.get.return_value = json.loads(self.answer_token)
+        token = self.token.get()
+        self.assertIs(self.token.get(), token)
+        self.token._background_refresh.join()
+        self.assertEqual(self.mock_wrapper.get.call_count, 2)
+        self.assertEqual(self.token.cache_stats()['background_refreshes'], 1)
+
+    def test_token_not_blocked_by_background_refresh(self):
+        self._utcnow(datetime(2014, 8, 9, 18, 30, 0))
+        self.mock_wrapper.get.return_value = json.loads(self.answer_token)
+        token = self.token.get()
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def slow_get(path):
+            fetching.set()
+            release.wait(5)
+            return json.loads(self.answer_token)
+        self.mock_wrapper.get.side_effect = slow_get
+        self.token.get()
+        self.assertTrue(fetching.wait(5))
+        started_at = time.time()
+        self.assertIs(self.token.get(), token)
+        self.assertLess(time.time() - started_at, 1)
+        release.set()
+        self.token._background_refresh.join()
+        self.assertEqual(self.token.cache_stats()['background_refreshes'], 1)
+
+    def test_token_cache_disabled(self):
+        self.token.disable_cache()
+        self.mock_wrapper.get.return_value = json.loads(self.answer_token)
+        self.token.get()
+        self.token.get()
+        self.assertEqual(self.mock_wrapper.get.call_count, 2)
+
+    def test_token_invalidate_cache(self):
+        self._utcnow(datetime(2014, 8, 9, 10, 0, 0))
+        self.mock_wrapper.get.return_value = json.loads(self.answer_token)
+        self.token.get()
+        self.token.invalidate_cache()
+        self.token.get()
+        self.assertEqual(self.mock_wrapper.get.call_count, 2)
+
 class TestTokenObject(unittest.TestCase):
 
     @mock.patch('runabove.token.TokenManager')
@@ -140,6 +212,26 @@ class TestTokenObject(unittest.TestCase):
         self.assertRaises(KeyError, self.token.get_endpoint, 'object-store', 'RBX-1')
         self.assertRaises(KeyError, self.token.get_endpoint, 'compute', 'SBG-1')
 
+    def test_get_endpoint_with_interface(self):
+        mock_token = json.loads(TestToken.answer_token)
+        self.assertEqual(
+            mock_token['token']['catalog'][0]['endpoints'][0],
+            self.token.get_endpoint('object-store', 'BHS-1', 'public')
+        )
+        self.assertRaises(KeyError, self.token.get_endpoint,
+                          'object-store', 'BHS-1', 'internal')
+
+    def test_get_regions(self):
+        self.assertEqual(['BHS-1', 'SBG-1'],
+                         self.token.get_regions('object-store'))
+        self.assertEqual([], self.token.get_regions('compute'))
+
+    def test_get_endpoints(self):
+        endpoints = self.token.get_endpoints('object-store', 'public')
+        self.assertEqual(['BHS-1', 'SBG-1'], sorted(endpoints.keys()))
+        self.assertEqual(endpoints['SBG-1']['url'],
+            'https://storage.sbg-1.runabove.io/v1/AUTH_randomprojectid')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,194 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+import base64
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+import swiftclient
+
+import runabove
+from runabove.exception import ReplayError
+from runabove.transport import RecordedResponse, Recorder, Replayer, \
+    Transport
+from runabove.wrapper_api import WrapperApi
+
+
+class TestTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'recording.jsonl')
+        self.session = mock.Mock()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _api(self, transport):
+        api = WrapperApi('key', 'secret', 'consumer', transport=transport)
+        api._time_delta = 0
+        return api
+
+    def test_base_transport_calls_swift(self):
+        call = mock.Mock(return_value='result')
+        self.assertEqual(Transport().swift_call('BHS-1', 'head_object', call,
+                                                'c', 'o'), 'result')
+        call.assert_called_once_with('c', 'o')
+
+    def _record_api_calls(self):
+        self.session.request.side_effect = [
+            RecordedResponse(200, {'ETag': '"v1"'}, b'[{"id": "a"}]', 0.2),
+            RecordedResponse(404, {}, b'{"message": "Not found"}', 0.1),
+            RecordedResponse(200, {}, b'[]', 0.3),
+        ]
+        recorder = Recorder(self.path, self.session)
+        api = self._api(recorder)
+        self.assertEqual(api.get('/flavor'), [{'id': 'a'}])
+        with self.assertRaises(runabove.exception.ResourceNotFoundError):
+            api.get('/flavor/b')
+        self.assertEqual(api.get('/flavor'), [])
+        recorder.close()
+
+    def test_record_and_replay_api(self):
+        self._record_api_calls()
+        self.assertEqual(self.session.request.call_count, 3)
+        api = self._api(Replayer(self.path))
+        self.assertEqual(api.get('/flavor'), [{'id': 'a'}])
+        with self.assertRaises(runabove.exception.ResourceNotFoundError):
+            api.get('/flavor/b')
+        self.assertEqual(api.get('/flavor'), [])
+        # The last answer is served again once the others are used
+        self.assertEqual(api.get('/flavor'), [])
+        with self.assertRaises(ReplayError):
+            api.get('/image')
+
+    def test_replay_headers_and_latency(self):
+        self._record_api_calls()
+        replayer = Replayer(self.path, latency=True, speed=2)
+        with mock.patch('runabove.transport.time') as mock_time:
+            result = replayer.request('GET',
+                                      WrapperApi.base_url + '/flavor')
+        mock_time.sleep.assert_called_once_with(
+            result.elapsed.total_seconds() / 2)
+        self.assertEqual(result.headers['etag'], '"v1"')
+        self.assertEqual(result.text, '[{"id": "a"}]')
+
+    def test_record_and_replay_gzip(self):
+        self.path += '.gz'
+        self._record_api_calls()
+        api = self._api(Replayer(self.path))
+        self.assertEqual(api.get('/flavor'), [{'id': 'a'}])
+
+    def test_record_and_replay_swift(self):
+        recorder = Recorder(self.path, self.session)
+        connection = mock.Mock()
+        connection.get_container.return_value = ({'x-count': '1'},
+                                                 [{'name': 'o'}])
+        connection.get_object.return_value = ({'etag': 'e'},
+                                              iter([b'ab', b'cd']))
+        connection.head_object.side_effect = \
+            swiftclient.exceptions.ClientException('Not found',
+                                                   http_status=404)
+        upload = mock.Mock()
+
+        self.assertEqual(recorder.swift_call('BHS-1', 'get_container',
+                                             connection.get_container, 'c'),
+                         ({'x-count': '1'}, [{'name': 'o'}]))
+        headers, chunks = recorder.swift_call(
+            'BHS-1', 'get_object', connection.get_object, 'c', 'o',
+            resp_chunk_size=2)
+        self.assertEqual(list(chunks), [b'ab', b'cd'])
+        with self.assertRaises(swiftclient.exceptions.ClientException):
+            recorder.swift_call('BHS-1', 'head_object',
+                                connection.head_object, 'c', 'o')
+        recorder.swift_call('BHS-1', 'put_object', connection.put_object,
+                            'c', 'o', upload)
+        self.assertFalse(upload.read.called)
+        recorder.close()
+
+        replayer = Replayer(self.path)
+        offline = mock.Mock()
+        self.assertEqual(replayer.swift_call('BHS-1', 'get_container',
+                                             offline.get_container, 'c'),
+                         ({'x-count': '1'}, [{'name': 'o'}]))
+        headers, chunks = replayer.swift_call(
+            'BHS-1', 'get_object', offline.get_object, 'c', 'o',
+            resp_chunk_size=2)
+        self.assertEqual(headers, {'etag': 'e'})
+        self.assertEqual(list(chunks), [b'ab', b'cd'])
+        with self.assertRaises(swiftclient.exceptions.ClientException) as cm:
+            replayer.swift_call('BHS-1', 'head_object', offline.head_object,
+                                'c', 'o')
+        self.assertEqual(cm.exception.http_status, 404)
+        replayer.swift_call('BHS-1', 'put_object', offline.put_object,
+                            'c', 'o', mock.Mock())
+        with self.assertRaises(ReplayError):
+            replayer.swift_call('SBG-1', 'get_container',
+                                offline.get_container, 'c')
+        self.assertEqual(offline.mock_calls, [])
+
+    def test_record_swift_bytes_by_digest(self):
+        recorder = Recorder(self.path, self.session)
+        connection = mock.Mock()
+        connection.put_object.return_value = 'etag'
+        payload = b'secret payload' * 100
+        recorder.swift_call('BHS-1', 'put_object', connection.put_object,
+                            'c', 'o', payload)
+        recorder.close()
+        with open(self.path) as recording:
+            line = recording.read()
+        self.assertNotIn('secret', line)
+        self.assertNotIn(base64.b64encode(payload).decode('ascii'), line)
+        self.assertIn('__bytes_md5__', line)
+
+        replayer = Replayer(self.path)
+        offline = mock.Mock()
+        self.assertEqual(replayer.swift_call('BHS-1', 'put_object',
+                                             offline.put_object, 'c', 'o',
+                                             payload), 'etag')
+        with self.assertRaises(ReplayError):
+            replayer.swift_call('BHS-1', 'put_object', offline.put_object,
+                                'c', 'o', b'other payload')
+
+    def test_container_manager_uses_transport(self):
+        api = self._api(mock.Mock(spec=Transport))
+        handler = mock.Mock()
+        containers = runabove.storage.ContainerManager(api, handler)
+        client = mock.Mock()
+        containers.swifts = {
+            'BHS-1': {'client': client, 'endpoint': 'http://endpoint'}
+        }
+        containers._swift_call('BHS-1', 'head_container', 'c')
+        api.transport.swift_call.assert_called_once_with(
+            'BHS-1', 'head_container', client.head_container, 'c')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+import unittest
+import mock
+
+import runabove
+from runabove.waiter import InstanceWaiter
+
+
+class TestInstanceWaiter(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_instances = mock.Mock()
+        self.regions = runabove.region.RegionManager(None, None)
+        self.time = 1000.0
+        patcher = mock.patch('runabove.waiter.time')
+        self.mock_time = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_time.time.side_effect = lambda: self.time
+        self.mock_time.sleep.side_effect = self._sleep
+        self.sleeps = []
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.time += seconds
+
+    def _instance(self, instance_id, region, status):
+        return runabove.instance.Instance(
+            self.mock_instances, instance_id, instance_id, None,
+            self.regions._name_to_obj(region), None, None, None, status, None)
+
+    def test_wait_one_list_per_region(self):
+        instances = [self._instance('a', 'BHS-1', 'BUILD'),
+                     self._instance('b', 'BHS-1', 'BUILD'),
+                     self._instance('c', 'SBG-1', 'BUILD')]
+        self.mock_instances.list_by_region.side_effect = [
+            [self._instance('a', 'BHS-1', 'BUILD'),
+             self._instance('b', 'BHS-1', 'ACTIVE')],
+            [self._instance('c', 'SBG-1', 'ACTIVE')],
+            [self._instance('a', 'BHS-1', 'ACTIVE')],
+        ]
+        waiter = InstanceWaiter(self.mock_instances, jitter=0)
+        for instance in instances:
+            waiter.add(instance)
+        statuses = waiter.wait()
+        self.assertEqual(statuses, {'a': 'ACTIVE', 'b': 'ACTIVE',
+                                    'c': 'ACTIVE'})
+        self.assertEqual(self.mock_instances.list_by_region.call_count, 3)
+        self.assertEqual(instances[0].status, 'ACTIVE')
+        self.assertEqual(self.sleeps, [2])
+
+    def test_wait_deleted_and_callbacks(self):
+        instance = self._instance('a', 'BHS-1', 'ACTIVE')
+        self.mock_instances.list_by_region.side_effect = [
+            [self._instance('a', 'BHS-1', 'DELETING')],
+            []
+        ]
+        changes = []
+        waiter = InstanceWaiter(self.mock_instances, jitter=0)
+        waiter.add(instance, 'DELETED',
+                   callback=lambda i, old, new: changes.append((old, new)))
+        statuses = waiter.wait()
+        self.assertEqual(statuses, {'a': 'DELETED'})
+        self.assertEqual(changes, [('ACTIVE', 'DELETING'),
+                                   ('DELETING', 'DELETED')])
+
+    def test_wait_not_listed_yet(self):
+        instance = self._instance('a', 'BHS-1', None)
+        self.mock_instances.list_by_region.side_effect = [
+            [],
+            [self._instance('a', 'BHS-1', 'BUILD')],
+            [self._instance('a', 'BHS-1', 'ACTIVE')],
+        ]
+        waiter = InstanceWaiter(self.mock_instances, jitter=0)
+        waiter.add(instance)
+        self.assertEqual(waiter.wait(), {'a': 'ACTIVE'})
+        self.assertEqual(self.mock_instances.list_by_region.call_count, 3)
+
+    def test_wait_never_listed_times_out(self):
+        instance = self._instance('a', 'BHS-1', None)
+        self.mock_instances.list_by_region.return_value = []
+        waiter = InstanceWaiter(self.mock_instances, jitter=0)
+        waiter.add(instance)
+        with self.assertRaises(runabove.exception.WaitTimeoutError) as cm:
+            waiter.wait(timeout=10)
+        self.assertEqual(cm.exception.pending, {'a': None})
+
+    def test_wait_deleted_after_being_listed(self):
+        instance = self._instance('a', 'BHS-1', 'BUILD')
+        self.mock_instances.list_by_region.side_effect = [
+            [self._instance('a', 'BHS-1', 'BUILD')],
+            []
+        ]
+        waiter = InstanceWaiter(self.mock_instances, jitter=0)
+        waiter.add(instance)
+        self.assertEqual(waiter.wait(), {'a': 'DELETED'})
+
+    def test_wait_error_stops_tracking(self):
+        instance = self._instance('a', 'BHS-1', 'BUILD')
+        self.mock_instances.list_by_region.return_value = [
+            self._instance('a', 'BHS-1', 'ERROR')
+        ]
+        waiter = InstanceWaiter(self.mock_instances)
+        waiter.add(instance)
+        self.assertEqual(waiter.wait(), {'a': 'ERROR'})
+
+    def test_wait_backoff_and_timeout(self):
+        instance = self._instance('a', 'BHS-1', 'BUILD')
+        self.mock_instances.list_by_region.return_value = [
+            self._instance('a', 'BHS-1', 'BUILD')
+        ]
+        waiter = InstanceWaiter(self.mock_instances, initial_delay=1,
+                                max_delay=8, jitter=0)
+        waiter.add(instance)
+        with self.assertRaises(runabove.exception.WaitTimeoutError) as cm:
+            waiter.wait(timeout=30)
+        self.assertEqual(cm.exception.pending, {'a': 'BUILD'})
+        self.assertEqual(self.sleeps, [1, 2, 4, 8, 8, 7])
+
+    def test_jitter(self):
+        waiter = InstanceWaiter(self.mock_instances, jitter=0.5)
+        for _ in range(100):
+            self.assertTrue(5 <= waiter._jittered(10) <= 15)
+
+
+class TestInstanceWait(unittest.TestCase):
+
+    @mock.patch('runabove.instance.InstanceWaiter')
+    def test_instance_wait_for(self, mock_waiter):
+        manager = runabove.instance.InstanceManager(None, None)
+        instance = runabove.instance.Instance(
+            manager, 'a', 'a', None, None, None, None, None, 'BUILD', None)
+        mock_waiter.return_value.wait.return_value = {'a': 'ACTIVE'}
+        self.assertEqual(instance.wait_for(timeout=10), 'ACTIVE')
+        mock_waiter.return_value.add.assert_called_once_with(instance,
+                                                             'ACTIVE')
+        mock_waiter.return_value.wait.assert_called_once_with(10, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,11 +31,18 @@ import json
 import hashlib
 
 import mock
+import requests
 from mock import patch
 import httpretty
 from httpretty import register_uri, GET, POST, DELETE, PUT
 
 from runabove.wrapper_api import WrapperApi
+from runabove.skew import MemorySkewStore
+from runabove.retry import RetryPolicy
+from runabove.ratelimit import RateLimiter
+from runabove.instrumentation import Observer
+from runabove.http_cache import ResponseCache
+from runabove.codec import Codec
 from runabove.exception import APIError, BadParametersError,\
                                ResourceNotFoundError, NetworkError,\
                                ResourceAlreadyExistsError
@@ -94,6 +101,61 @@ class TestWrapperApi(unittest.TestCase):
         with self.assertRaises(APIError):
             self.api.time_delta()
 
+    def test_time_delta_max_age(self):
+        self.api.skew_max_age = 60
+        self.api._time_delta_at = self.fake_time - 61
+        register_uri(GET, self.actual_base_url + '/time', body='1404395891')
+        self.assertEqual(self.api.time_delta(), 2)
+
+    def test_time_delta_not_expired(self):
+        self.api.skew_max_age = 60
+        self.api._time_delta_at = self.fake_time - 10
+        self.assertEqual(self.api.time_delta(), 0)
+
+    def test_time_delta_from_store(self):
+        self.api._time_delta = None
+        self.api.skew_store = MemorySkewStore()
+        self.api.skew_store.set(self.base_url, 4)
+        self.assertEqual(self.api.time_delta(), 4)
+
+    def test_time_delta_saved_in_store(self):
+        self.api._time_delta = None
+        self.api.skew_store = MemorySkewStore()
+        register_uri(GET, self.actual_base_url + '/time', body='1404395895')
+        self.api.time_delta()
+        self.assertEqual(self.api.skew_store.get(self.base_url), 6)
+
+    def test_time_delta_from_store_keeps_its_age(self):
+        self.api._time_delta = None
+        self.api.skew_max_age = 60
+        self.api.skew_store = MemorySkewStore()
+        with patch('runabove.skew.time.time',
+                   return_value=self.fake_time - 50):
+            self.api.skew_store.set(self.base_url, 4)
+        self.assertEqual(self.api.time_delta(), 4)
+        self.assertEqual(self.api._time_delta_at, self.fake_time - 50)
+        with patch('time.time', return_value=self.fake_time + 11):
+            self.assertFalse(self.api._is_time_delta_fresh())
+
+    def test_time_delta_stored_when_changed(self):
+        self.api.skew_store = mock.Mock(spec=MemorySkewStore)
+        self.api.skew_max_age = 60
+        self.api._set_time_delta(3)
+        self.api._set_time_delta(3)
+        self.api.skew_store.set.assert_called_once_with(self.base_url, 3)
+        self.api._set_time_delta(4)
+        self.assertEqual(self.api.skew_store.set.call_count, 2)
+        with patch('time.time', return_value=self.fake_time + 60):
+            self.api._set_time_delta(4)
+        self.assertEqual(self.api.skew_store.set.call_count, 3)
+
+    def test_time_delta_from_date_header(self):
+        self.api.skew_from_date = True
+        register_uri(GET, self.actual_base_url + '/test', body='{}',
+                     adding_headers={'Date': 'Thu, 03 Jul 2014 13:58:19 GMT'})
+        self.api.raw_call('get', '/test')
+        self.assertEqual(self.api._time_delta, 10)
+
     def _request_credentials(self, redirection=None, status=200):
         access_rules = [{'method': 'GET', 'path': '/storage'}]
         response = {
@@ -270,6 +332,243 @@ class TestWrapperApi(unittest.TestCase):
         with self.assertRaises(APIError):
             self.api.raw_call('get', path)
 
+    def _register_statuses(self, method, statuses, headers=None):
+        register_uri(method, self.actual_base_url + '/test', responses=[
+            httpretty.Response(body='{"message": "Error"}', status=status,
+                               adding_headers=headers)
+            for status in statuses
+        ])
+
+    @patch('time.sleep')
+    def test_raw_call_retry_is_signed_again(self, mock_sleep):
+        self.api.retry_policy = RetryPolicy(jitter=0)
+        self._register_statuses(GET, [503, 502, 200])
+        with patch('time.time') as mock_time:
+            mock_time.return_value = self.fake_time
+            mock_sleep.side_effect = lambda delay: setattr(
+                mock_time, 'return_value', mock_time.return_value + delay)
+            self.api.raw_call('get', '/test')
+        timestamps = [request.headers['X-Ra-Timestamp']
+                      for request in httpretty.latest_requests()
+                      if request.path.endswith('/test')]
+        self.assertEqual(timestamps, ['1404395889', '1404395889',
+                                      '1404395890'])
+        self.assertEqual(mock_sleep.call_args_list,
+                         [mock.call(0.5), mock.call(1.0)])
+        stats = self.api.retry_policy.stats()
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['reasons'], {503: 1, 502: 1})
+
+    @patch('time.sleep')
+    def test_raw_call_retry_gives_up(self, mock_sleep):
+        self._register_statuses(GET, [503, 503, 503, 200])
+        with self.assertRaises(APIError):
+            self.api.raw_call('get', '/test')
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(self.api.retry_policy.stats()['gave_up'], 1)
+
+    @patch('time.sleep')
+    def test_raw_call_retry_after(self, mock_sleep):
+        self._register_statuses(PUT, [429, 200], {'Retry-After': '7'})
+        self.api.raw_call('put', '/test', {'a': 1})
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch('time.sleep')
+    def test_raw_call_post_not_retried(self, mock_sleep):
+        self._register_statuses(POST, [503, 200])
+        with self.assertRaises(APIError):
+            self.api.raw_call('post', '/test', {'a': 1})
+        self.assertFalse(mock_sleep.called)
+
+    @patch('time.sleep')
+    def test_raw_call_post_retry_opt_in(self, mock_sleep):
+        self._register_statuses(POST, [503, 200])
+        self.assertEqual(self.api.raw_call('post', '/test', {'a': 1},
+                                           retry=True),
+                         {'message': 'Error'})
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    @patch('time.sleep')
+    def test_raw_call_network_error(self, mock_sleep):
+        session = self.api._get_session()
+        with patch.object(session, 'request') as mock_request:
+            mock_request.side_effect = \
+                requests.exceptions.ConnectionError('reset')
+            with self.assertRaises(NetworkError):
+                self.api.raw_call('get', '/test')
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertEqual(self.api.retry_policy.stats()['reasons'],
+                         {'ConnectionError': 2})
+
+    @patch('time.sleep')
+    def test_raw_call_time_network_error(self, mock_sleep):
+        self.api._time_delta = None
+        register_uri(GET, self.actual_base_url + '/test', body='{}')
+        session = self.api._get_session()
+        request = session.request
+        answers = [requests.exceptions.ConnectionError('reset')]
+
+        def flaky_request(method, url, **kwargs):
+            if url.endswith('/time') and answers:
+                raise answers.pop()
+            if url.endswith('/time'):
+                return mock.Mock(text=str(int(self.fake_time)))
+            return request(method, url, **kwargs)
+        with patch.object(session, 'request', side_effect=flaky_request):
+            self.assertEqual(self.api.raw_call('get', '/test'), {})
+        self.assertEqual(self.api.retry_policy.stats()['reasons'],
+                         {'ConnectionError': 1})
+
+    @patch('time.sleep')
+    def test_raw_call_time_network_error_wrapped(self, mock_sleep):
+        self.api._time_delta = None
+        session = self.api._get_session()
+        with patch.object(session, 'request') as mock_request:
+            mock_request.side_effect = \
+                requests.exceptions.ConnectionError('reset')
+            with self.assertRaises(NetworkError):
+                self.api.raw_call('get', '/test')
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_raw_call_rate_limited(self):
+        self.api.rate_limiter = RateLimiter(max_concurrency=2)
+        register_uri(GET, self.actual_base_url + '/instance/abc', body='{}')
+        self.api.raw_call('get', '/instance/abc')
+        stats = self.api.rate_limiter.stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['prefixes']['/instance']['calls'], 1)
+
+    @patch('time.sleep')
+    def test_raw_call_signed_after_rate_limit(self, mock_sleep):
+        register_uri(GET, self.actual_base_url + '/test', body='{}')
+        with patch('time.time') as mock_time:
+            mock_time.return_value = self.fake_time
+            mock_sleep.side_effect = lambda delay: setattr(
+                mock_time, 'return_value', mock_time.return_value + delay)
+            self.api.rate_limiter = RateLimiter(rate=0.01, burst=1)
+            self.api.raw_call('get', '/test')
+            self.api.raw_call('get', '/test')
+        mock_sleep.assert_called_once_with(100.0)
+        timestamps = [request.headers['X-Ra-Timestamp']
+                      for request in httpretty.latest_requests()]
+        self.assertEqual(timestamps, ['1404395889', '1404395989'])
+
+    def test_raw_call_observed(self):
+        observer = mock.Mock(spec=Observer)
+        self.api.add_observer(observer)
+        register_uri(GET, self.actual_base_url + '/instance/abc',
+                     body='{"name": "test"}')
+        self.api.raw_call('get', '/instance/abc')
+        observer.before_call.assert_called_once_with(mock.ANY)
+        info = observer.after_call.call_args[0][0]
+        self.assertIs(observer.before_call.call_args[0][0], info)
+        self.assertEqual(info.method, 'GET')
+        self.assertEqual(info.template, '/instance/{id}')
+        self.assertEqual(info.status, 200)
+        self.assertEqual(info.attempts, 1)
+        self.assertEqual(info.response_bytes, 16)
+        self.assertIsNone(info.error)
+        self.api.remove_observer(observer)
+        self.api.raw_call('get', '/instance/abc')
+        self.assertEqual(observer.after_call.call_count, 1)
+
+    def test_raw_call_observed_error(self):
+        observer = mock.Mock(spec=Observer)
+        self.api.add_observer(observer)
+        register_uri(PUT, self.actual_base_url + '/instance/abc', status=404,
+                     body='{"message": "Not found"}')
+        with self.assertRaises(ResourceNotFoundError):
+            self.api.raw_call('put', '/instance/abc', {'name': 'test'})
+        info = observer.after_call.call_args[0][0]
+        self.assertEqual(info.status, 404)
+        self.assertEqual(info.request_bytes, 16)
+        self.assertIsInstance(info.error, ResourceNotFoundError)
+
+    @patch('runabove.wrapper_api.CallInfo')
+    def test_raw_call_not_observed(self, mock_call_info):
+        register_uri(GET, self.actual_base_url + '/test', body='{}')
+        self.api.raw_call('get', '/test')
+        self.assertFalse(mock_call_info.called)
+
+    def test_raw_call_revalidates_cached_answer(self):
+        self.api.response_cache = ResponseCache()
+        register_uri(GET, self.actual_base_url + '/flavor', responses=[
+            httpretty.Response(body='[{"id": "a"}]',
+                               adding_headers={'ETag': '"v1"'}),
+            httpretty.Response(body='', status=304)
+        ])
+        first = self.api.raw_call('get', '/flavor')
+        self.assertEqual(first, [{'id': 'a'}])
+        second = self.api.raw_call('get', '/flavor')
+        self.assertEqual(second, first)
+        self.assertIsNot(second, first)
+        self.assertEqual(httpretty.last_request().headers['If-None-Match'],
+                         '"v1"')
+        self.assertEqual(self.api.response_cache.stats()['revalidated'], 1)
+
+    def test_raw_call_fresh_cached_answer(self):
+        self.api.response_cache = ResponseCache(freshness=60)
+        register_uri(GET, self.actual_base_url + '/region', body='["BHS-1"]')
+        self.api.raw_call('get', '/region')
+        requests_sent = len(httpretty.latest_requests())
+        self.assertEqual(self.api.raw_call('get', '/region'), ['BHS-1'])
+        self.assertEqual(len(httpretty.latest_requests()), requests_sent)
+
+    def test_raw_call_cached_answer_copied(self):
+        self.api.response_cache = ResponseCache(freshness=60)
+        register_uri(GET, self.actual_base_url + '/image', body='[]')
+        self.api.raw_call('get', '/image').append('modified')
+        self.assertEqual(self.api.raw_call('get', '/image'), [])
+
+    def test_raw_call_token_not_cached(self):
+        self.api.response_cache = ResponseCache(
+            freshness=60, cacheable=('/region', '/token'))
+        register_uri(GET, self.actual_base_url + '/token', responses=[
+            httpretty.Response(body='{"X-Auth-Token": "a"}'),
+            httpretty.Response(body='{"X-Auth-Token": "b"}')
+        ])
+        self.assertEqual(self.api.raw_call('get', '/token'),
+                         {'X-Auth-Token': 'a'})
+        self.assertEqual(self.api.raw_call('get', '/token'),
+                         {'X-Auth-Token': 'b'})
+        self.assertEqual(self.api.response_cache.stats()['size'], 0)
+
+    def test_raw_call_instances_not_cached(self):
+        self.api.response_cache = ResponseCache(freshness=60)
+        register_uri(GET, self.actual_base_url + '/instance', responses=[
+            httpretty.Response(body='[{"status": "BUILD"}]'),
+            httpretty.Response(body='[{"status": "ACTIVE"}]')
+        ])
+        self.api.raw_call('get', '/instance', {'region': 'BHS-1'})
+        self.assertEqual(self.api.raw_call('get', '/instance',
+                                           {'region': 'BHS-1'}),
+                         [{'status': 'ACTIVE'}])
+
+    def test_raw_call_write_invalidates_cache(self):
+        self.api.response_cache = ResponseCache(freshness=60)
+        register_uri(GET, self.actual_base_url + '/ssh', body='[]')
+        register_uri(POST, self.actual_base_url + '/ssh', body='{}')
+        self.api.raw_call('get', '/ssh', {'region': 'BHS-1'})
+        self.api.raw_call('post', '/ssh', {'name': 'key'})
+        self.assertEqual(self.api.response_cache.stats()['size'], 0)
+
+    def test_raw_call_with_codec(self):
+        api = WrapperApi(self.application_key, self.application_secret,
+                         self.consumer_key, codec=mock.Mock(spec=Codec))
+        api._time_delta = 0
+        api.codec.encode.return_value = '{"a":1}'
+        api.codec.decode.return_value = {'b': 2}
+        register_uri(POST, self.actual_base_url + '/test', body='{"b": 2}')
+        self.assertEqual(api.raw_call('post', '/test', {'a': 1}), {'b': 2})
+        api.codec.encode.assert_called_once_with({'a': 1})
+        api.codec.decode.assert_called_once_with(b'{"b": 2}')
+        self.assertEqual(httpretty.last_request().body, b'{"a":1}')
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            WrapperApi(self.application_key, self.application_secret,
+                       codec='yaml')
+
     def _external_call(self, method):
         patcher = mock.patch('runabove.wrapper_api.WrapperApi.raw_call')
         self.api.raw_call = patcher.start()
@@ -299,6 +598,38 @@ class TestWrapperApi(unittest.TestCase):
     def test_put(self):
         self._external_call('put')
 
+    def test_session_is_shared(self):
+        register_uri(GET, self.actual_base_url + '/test', body='{}')
+        self.api.raw_call('get', '/test')
+        session = self.api._session
+        self.api.raw_call('get', '/test')
+        self.assertIs(self.api._session, session)
+        self.assertEqual(self.api.pool_stats()['requests'], 2)
+
+    def test_session_pool_size(self):
+        api = WrapperApi(self.application_key, self.application_secret,
+                         pool_connections=2, pool_maxsize=5)
+        adapter = api._get_session().get_adapter(self.base_url)
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 5)
+
+    def test_session_idle_timeout(self):
+        self.api.idle_timeout = 10
+        session = self.api._get_session()
+        self.api._last_used = self.fake_time - 11
+        self.assertIsNot(self.api._get_session(), session)
+
+    def test_close(self):
+        self.api._get_session()
+        self.api.close()
+        self.assertIsNone(self.api._session)
+        self.api.close()
+
+    def test_pool_stats(self):
+        stats = self.api.pool_stats()
+        self.assertEqual(stats, {'requests': 0, 'connections': 0,
+                                 'reused': 0})
+
     def test_encode_for_api_without_modification(self):
         string = 'StringThatDoesNotNeedModification'
         result = self.api.encode_for_api(string)
@@ -28,6 +28,8 @@
 """RunAbove token service library."""
 from __future__ import absolute_import
 
+import threading
+import time
 from datetime import datetime
 
 from .base import Resource, BaseManager
@@ -35,15 +37,133 @@ from .exception import ResourceNotFoundError
 
 
 class TokenManager(BaseManager):
-    """Manage flavors available in RunAbove."""
+    """Manage OpenStack tokens of a RunAbove account.
+
+    Tokens are cached and reused until `cache_margin` seconds before
+    their expiration. When a cached token is used less than
+    `refresh_ahead` seconds before it expires, a new one is requested in
+    the background so callers never wait for it.
+    """
 
     basepath = '/token'
 
+    def __init__(self, *args, **kwargs):
+        super(TokenManager, self).__init__(*args, **kwargs)
+        self.cache_enabled = True
+        self.cache_margin = 60
+        self.refresh_ahead = 300
+        self._token = None
+        # _lock is held while fetching, _background_lock only while
+        # starting the background refresh so that get() never waits
+        self._lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._background_refresh = None
+        self._hits = 0
+        self._refreshes = 0
+        self._background_refreshes = 0
+        self._last_refresh_latency = None
+        self._total_refresh_latency = 0.0
+
     def get(self):
         """Get an OpenStack API Token."""
+        if not self.cache_enabled:
+            return self._fetch()
+        token = self._token
+        if token is not None:
+            remaining = self._remaining(token)
+            if remaining > self.cache_margin:
+                self._hits += 1
+                if remaining <= self.refresh_ahead:
+                    self._refresh_in_background(token)
+                return token
+        return self._refresh(token)
+
+    def enable_cache(self, margin=60, refresh_ahead=300):
+        """Reuse tokens until they are about to expire.
+
+        :param margin: seconds before expiration after which a token is
+            not used anymore
+        :param refresh_ahead: seconds before expiration after which a new
+            token is requested in the background
+        """
+        self.cache_margin = margin
+        self.refresh_ahead = refresh_ahead
+        self.cache_enabled = True
+
+    def disable_cache(self):
+        """Request a new token on every call to `get`."""
+        self.cache_enabled = False
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """Forget the cached token, for example when it was revoked."""
+        self._token = None
+
+    def cache_stats(self):
+        """Get statistics about the token cache.
+
+        Latencies of the requests made to get new tokens are in seconds.
+        """
+        return {
+            'enabled': self.cache_enabled,
+            'hits': self._hits,
+            'refreshes': self._refreshes,
+            'background_refreshes': self._background_refreshes,
+            'last_refresh_latency': self._last_refresh_latency,
+            'total_refresh_latency': self._total_refresh_latency
+        }
+
+    def _fetch(self):
+        """Request a new token to the API."""
         res = self._api.get(self.basepath)
         return self._dict_to_obj(res)
 
+    @staticmethod
+    def _remaining(token):
+        """Get the number of seconds before a token expires."""
+        delta = token.expires_at - datetime.utcnow()
+        return delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+
+    def _refresh(self, stale_token):
+        """Replace `stale_token` by a new token.
+
+        Threads refreshing the same token concurrently wait for the
+        first one and share its result.
+        """
+        with self._lock:
+            if (self._token is not None and self._token is not stale_token
+                    and self._remaining(self._token) > self.cache_margin):
+                return self._token
+            start = time.time()
+            token = self._fetch()
+            latency = time.time() - start
+            self._refreshes += 1
+            self._last_refresh_latency = latency
+            self._total_refresh_latency += latency
+            if self.cache_enabled:
+                self._token = token
+            return token
+
+    def _refresh_in_background(self, token):
+        """Start a thread refreshing `token` if none is running yet."""
+        with self._background_lock:
+            if (self._background_refresh is not None and
+                    self._background_refresh.is_alive()):
+                return
+            self._background_refreshes += 1
+            self._background_refresh = threading.Thread(
+                target=self._background_refresh_target, args=(token,))
+            self._background_refresh.daemon = True
+            self._background_refresh.start()
+
+    def _background_refresh_target(self, token):
+        """Refresh a token, errors are ignored as the token is still valid.
+        """
+        try:
+            self._refresh(token)
+        except Exception:
+            pass
+
     def _iso8601_to_datetime(self, iso8601):
         """Parse iso8601 formated date into a datetime object
 
@@ -81,21 +201,61 @@ class Token(Resource):
         self.roles = roles
         self.issued_at = issued_at
         self.expires_at = expires_at
+        self._index_catalog()
+
+    def _index_catalog(self):
+        """Index the endpoints of the catalog for fast lookups.
+
+        Endpoints are indexed by (type, region, interface) and by
+        (type, region, None) for the first endpoint of a region, which
+        keeps the catalog order when no interface is requested.
+        """
+        self._endpoints = {}
+        self._regions = {}
+        for entry in self.catalog:
+            regions = self._regions.setdefault(entry['type'], [])
+            for endpoint in entry['endpoints']:
+                region = endpoint['region']
+                self._endpoints.setdefault((entry['type'], region, None),
+                                           endpoint)
+                self._endpoints.setdefault((entry['type'], region,
+                                            endpoint.get('interface')),
+                                           endpoint)
+                if region not in regions:
+                    regions.append(region)
 
-    def get_endpoint(self, endpoint_type, region_name):
+    def get_endpoint(self, endpoint_type, region_name, interface=None):
         """Find and return corresponding endpoint from `self.catalog`
 
         param: endpoint_type: endpoint type (identity, compute, network, ...)
         param: region_name: name of the region
+        param: interface: interface of the endpoint (public, internal, ...),
+            the first endpoint of the region if None
         raises: KeyError: when not matching endpoint is found
         """
-        for entry in self.catalog:
-            if entry['type'] != endpoint_type:
-                continue
-            for endpoint in entry['endpoints']:
-                if endpoint['region'] == region_name:
-                    return endpoint
+        try:
+            return self._endpoints[(endpoint_type, region_name, interface)]
+        except KeyError:
+            raise KeyError("No endpoint matching type=%s, region=%s found" %
+                           (endpoint_type, region_name))
+
+    def get_regions(self, endpoint_type):
+        """List the regions providing a type of endpoint.
 
-        raise KeyError("No endpoint matching type=%s, region=%s found" %
-                       (endpoint_type, region_name))
+        param: endpoint_type: endpoint type (identity, compute, network, ...)
+        """
+        return list(self._regions.get(endpoint_type, []))
 
+    def get_endpoints(self, endpoint_type, interface=None):
+        """Get the endpoints of a type indexed by region name.
+
+        param: endpoint_type: endpoint type (identity, compute, network, ...)
+        param: interface: interface of the endpoints, the first endpoint of
+            each region if None
+        """
+        endpoints = {}
+        for region in self._regions.get(endpoint_type, []):
+            endpoint = self._endpoints.get((endpoint_type, region, interface))
+            if endpoint is not None:
+                endpoints[region] = endpoint
+        return endpoints
@@ -0,0 +1,278 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+"""Transports sending the queries of the SDK, to record and replay them.
+
+A transport given to the `WrapperApi` sends the queries to the API and
+the calls to the object storage made by the `ContainerManager`. The
+`Recorder` captures them with their answers in a file, one JSON document
+per line, optionally gzipped. The `Replayer` serves them back without
+any network access, optionally waiting the recorded latency.
+"""
+from __future__ import absolute_import
+
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.structures import CaseInsensitiveDict
+import swiftclient
+
+from .exception import ReplayError
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+class Transport(object):
+    """Base class of transports, sending queries like requests does."""
+
+    def request(self, method, url, headers=None, data=None):
+        """Send an HTTP query.
+
+        :returns: an object with `status_code`, `headers`, `content`,
+            `text` and `elapsed` attributes like a requests response
+        """
+        raise NotImplementedError()
+
+    def swift_call(self, region, action, call, *args, **kwargs):
+        """Call the object storage.
+
+        :param region: name of the region of the storage
+        :param action: name of the swiftclient method called
+        :param call: the swiftclient method
+        """
+        return call(*args, **kwargs)
+
+    def close(self):
+        """Release the resources of the transport."""
+        pass
+
+
+def _open(path, mode):
+    """Open a recording, gzipped if its name ends with '.gz'."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't')
+    return open(path, mode)
+
+
+def _dump(value, digest=False):
+    """Convert a value to JSON.
+
+    Bytes are encoded in base64 and streams, such as files being
+    uploaded, become placeholders: they are not consumed and calls
+    differing only by the content of their streams match the same
+    recording.
+
+    :param digest: replace bytes by their MD5 and length instead, for
+        the arguments of calls which are only matched, never replayed
+    """
+    if isinstance(value, bytes):
+        if digest:
+            return {'__bytes_md5__': hashlib.md5(value).hexdigest(),
+                    'len': len(value)}
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, dict):
+        return dict((str(key), _dump(item, digest))
+                    for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_dump(item, digest) for item in value]
+    if value is None or isinstance(value, (bool, int, float, text_type)):
+        return value
+    return {'__stream__': type(value).__name__}
+
+
+def _load(value):
+    """Convert back a value converted by `_dump`."""
+    if isinstance(value, dict):
+        if '__bytes__' in value:
+            return base64.b64decode(value['__bytes__'])
+        if '__chunks__' in value:
+            return iter([_load(chunk) for chunk in value['__chunks__']])
+        return dict((key, _load(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_load(item) for item in value]
+    return value
+
+
+def _swift_key(region, action, args, kwargs):
+    """Key matching a call to the object storage with its recording.
+
+    Uploaded bytes are keyed by digest so they are not written in full.
+    """
+    return json.dumps([region, action, _dump(args, True),
+                       _dump(kwargs, True)], sort_keys=True)
+
+
+def _http_key(method, url, data):
+    """Key matching an HTTP query with its recording."""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.dumps([method.upper(), url, data or ''])
+
+
+class RecordedResponse(object):
+    """Answer served by the Replayer, like a requests response."""
+
+    def __init__(self, status_code, headers, content, elapsed):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+
+class Recorder(Transport):
+    """Send queries and record them with their answers."""
+
+    def __init__(self, path, session=None):
+        """Start a recording, overwriting the file at `path`.
+
+        :param path: file of the recording, gzipped if it ends with '.gz'
+        :param session: requests session sending the queries, a new one
+            if None
+        """
+        self.path = path
+        self._session = session or requests.Session()
+        self._file = _open(path, 'w')
+        self._lock = threading.Lock()
+
+    def _write(self, entry):
+        """Append an exchange to the recording."""
+        line = json.dumps(entry, sort_keys=True, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def request(self, method, url, headers=None, data=None):
+        started_at = time.time()
+        result = self._session.request(method, url, headers=headers,
+                                       data=data)
+        self._write({
+            'kind': 'http',
+            'key': _http_key(method, url, data),
+            'status': result.status_code,
+            'headers': dict(result.headers),
+            'content': _dump(result.content),
+            'elapsed': round(time.time() - started_at, 6)
+        })
+        return result
+
+    def swift_call(self, region, action, call, *args, **kwargs):
+        entry = {'kind': 'swift',
+                 'key': _swift_key(region, action, args, kwargs)}
+        started_at = time.time()
+        try:
+            result = call(*args, **kwargs)
+        except swiftclient.exceptions.ClientException as e:
+            entry['error'] = {'msg': e.msg, 'status': e.http_status}
+            entry['elapsed'] = round(time.time() - started_at, 6)
+            self._write(entry)
+            raise
+        if (isinstance(result, tuple) and len(result) == 2 and
+                not isinstance(result[1], (bytes, list, dict))):
+            # Object downloaded by chunks, keep them to record them
+            chunks = list(result[1])
+            entry['result'] = [_dump(result[0]),
+                               {'__chunks__': _dump(chunks)}]
+            result = (result[0], iter(chunks))
+        else:
+            entry['result'] = _dump(result)
+        entry['elapsed'] = round(time.time() - started_at, 6)
+        self._write(entry)
+        return result
+
+    def close(self):
+        """Close the recording."""
+        with self._lock:
+            self._file.close()
+
+
+class Replayer(Transport):
+    """Serve recorded answers without calling the API.
+
+    Answers are served in the order they were recorded for identical
+    queries, the last one being served again once they are exhausted.
+    """
+
+    def __init__(self, path, latency=False, speed=1.0):
+        """Load a recording.
+
+        :param path: file written by a Recorder
+        :param latency: wait the recorded duration of each exchange
+        :param speed: factor dividing the recorded durations
+        """
+        self.latency = latency
+        self.speed = speed
+        self._exchanges = {}
+        self._lock = threading.Lock()
+        with _open(path, 'r') as recording:
+            for line in recording:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._exchanges.setdefault(entry['key'],
+                                               deque()).append(entry)
+
+    def _next(self, key):
+        """Get the next recorded exchange matching a key."""
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                raise ReplayError(msg='No recorded answer for %s' % key)
+            if len(exchanges) > 1:
+                entry = exchanges.popleft()
+            else:
+                entry = exchanges[0]
+        if self.latency:
+            time.sleep(entry['elapsed'] / self.speed)
+        return entry
+
+    def request(self, method, url, headers=None, data=None):
+        entry = self._next(_http_key(method, url, data))
+        return RecordedResponse(entry['status'], entry['headers'],
+                                _load(entry['content']), entry['elapsed'])
+
+    def swift_call(self, region, action, call, *args, **kwargs):
+        entry = self._next(_swift_key(region, action, args, kwargs))
+        if 'error' in entry:
+            raise swiftclient.exceptions.ClientException(
+                entry['error']['msg'], http_status=entry['error']['status'])
+        result = _load(entry['result'])
+        if isinstance(result, list) and len(result) == 2:
+            return tuple(result)
+        return result
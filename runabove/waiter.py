@@ -0,0 +1,174 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright (c) 2014, OVH
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Except as contained in this notice, the name of OVH and or its trademarks
+# (and among others RunAbove) shall not be used in advertising or otherwise to
+# promote the sale, use or other dealings in this Software without prior
+# written authorization from OVH.
+
+
+"""Wait for instances to reach a status.
+
+Instances are polled with one list call per region whatever the number
+of instances tracked, with an exponential backoff between polls.
+"""
+from __future__ import absolute_import
+
+import random
+import time
+
+from .exception import WaitTimeoutError
+
+DELETED = 'DELETED'
+ERROR = 'ERROR'
+
+
+class InstanceWaiter(object):
+    """Track instances until they reach their target status.
+
+    Instances missing from the listing of their region are considered
+    to have the status `DELETED` when waiting for their deletion or once
+    they were listed by an earlier poll. Otherwise they are kept pending,
+    as new instances may not be listed yet. Instances in status `ERROR`
+    stop being tracked, whatever their target status.
+    """
+
+    def __init__(self, manager, initial_delay=2, max_delay=30, backoff=2,
+                 jitter=0.5):
+        """Build a waiter.
+
+        :param manager: InstanceManager used to list the instances
+        :param initial_delay: seconds between the first polls
+        :param max_delay: maximum number of seconds between two polls
+        :param backoff: factor applied to the delay after each poll
+            without any status change
+        :param jitter: fraction of the delay randomized so many waiters
+            do not poll the API at the same time
+        """
+        self._manager = manager
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self._tracked = {}
+
+    def add(self, instance, status='ACTIVE', callback=None):
+        """Track an instance.
+
+        :param instance: Instance object to track, its status is updated
+            on each change
+        :param status: status to wait for, `DELETED` to wait for the
+            deletion of the instance
+        :param callback: called with the instance, its previous status
+            and its new status on each change
+        """
+        self._tracked[instance.id] = (instance, status, callback)
+
+    def wait(self, timeout=600, callback=None):
+        """Poll the instances until all of them reached their status.
+
+        :param timeout: seconds after which waiting is abandoned
+        :param callback: called with the instance, its previous status
+            and its new status on each change of any instance
+        :returns: a dict of the final statuses, indexed by instance id
+        :raises WaitTimeoutError: Some instances did not reach their
+            status in time, the exception lists them in `pending`
+        """
+        deadline = time.time() + timeout
+        pending = dict(self._tracked)
+        finished = {}
+        seen = set()
+        delay = self.initial_delay
+        while True:
+            changed = self._poll(pending, finished, callback, seen)
+            if not pending:
+                return finished
+            if changed:
+                delay = self.initial_delay
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise self._timeout_error(pending)
+            time.sleep(min(self._jittered(delay), remaining))
+            delay = min(delay * self.backoff, self.max_delay)
+
+    def _jittered(self, delay):
+        """Randomize a delay by +/- `jitter` of its value."""
+        return delay * (1 + self.jitter * (2 * random.random() - 1))
+
+    @staticmethod
+    def _timeout_error(pending):
+        """Build the error raised when instances are still pending."""
+        return WaitTimeoutError(
+            msg='%d instances did not reach their status in time'
+                % len(pending),
+            pending=dict((instance_id, tracked[0].status)
+                         for instance_id, tracked in pending.items()))
+
+    @staticmethod
+    def _pending_regions(pending):
+        """Get the regions of the pending instances, once each."""
+        regions = {}
+        for instance, _, _ in pending.values():
+            regions.setdefault(instance.region.name, instance.region)
+        return list(regions.values())
+
+    def _poll(self, pending, finished, callback, seen):
+        """List the regions of the pending instances and update them.
+
+        :param seen: ids of the instances listed by earlier polls, updated
+            with the ones listed by this poll
+        :returns: True if the status of an instance changed
+        """
+        statuses = {}
+        for region in self._pending_regions(pending):
+            for listed in self._manager.list_by_region(region):
+                statuses[listed.id] = listed.status
+        return self._update(pending, finished, callback, seen, statuses)
+
+    def _update(self, pending, finished, callback, seen, statuses):
+        """Update the pending instances with the statuses listed.
+
+        :param statuses: dict of the statuses listed, indexed by instance id
+        :returns: True if the status of an instance changed
+        """
+        changed = False
+        for instance_id, tracked in list(pending.items()):
+            instance, target, instance_callback = tracked
+            status = statuses.get(instance_id)
+            if status is not None:
+                seen.add(instance_id)
+            elif target == DELETED or instance_id in seen:
+                status = DELETED
+            else:
+                # Not listed yet, such as a just created instance
+                continue
+            if status != instance.status:
+                changed = True
+                previous = instance.status
+                instance.status = status
+                for notify in (instance_callback, callback):
+                    if notify is not None:
+                        notify(instance, previous, status)
+            if status == target or status in (ERROR, DELETED):
+                finished[instance_id] = status
+                del pending[instance_id]
+        return changed
@@ -32,15 +32,21 @@ It handles requesting credential, signing queries...
 from __future__ import absolute_import
 
 import requests
+from requests.adapters import HTTPAdapter
 import hashlib
+import threading
 import time
 import json
+from email.utils import parsedate_tz, mktime_tz
 
 try:
     from urllib import quote as urllib_quote
 except ImportError:  # Python 3
     from urllib.parse import quote as urllib_quote
 
+from .codec import Codec, get_codec
+from .instrumentation import CallInfo
+from .retry import RetryPolicy
 from .exception import APIError, ResourceNotFoundError, BadParametersError, \
     ResourceAlreadyExistsError, NetworkError
 
@@ -50,7 +56,12 @@ class WrapperApi:
 
     base_url = "https://api.runabove.com/1.0"
 
-    def __init__(self, application_key, application_secret, consumer_key=None):
+    def __init__(self, application_key, application_secret, consumer_key=None,
+                 pool_connections=10, pool_maxsize=10, idle_timeout=None,
+                 skew_store=None, skew_max_age=None, skew_from_date=False,
+                 retry_policy=None, rate_limiter=None, observers=None,
+                 response_cache=None, codec=None, transport=None,
+                 base_url=None):
         """Construct a new wrapper instance.
 
         :param application_key: your application key given by RunAbove
@@ -59,22 +70,213 @@ class WrapperApi:
         on application registration
         :param consumer_key: the consumer key you want to use, if any,
         given after a credential request
+        :param pool_connections: number of per-host connection pools to keep
+        :param pool_maxsize: maximum number of keep-alive connections kept
+        open to one host
+        :param idle_timeout: seconds after which an unused pool is closed
+        and reopened on the next call, None to keep it open forever
+        :param skew_store: SkewStore sharing the clock skew with other
+        wrappers or processes
+        :param skew_max_age: seconds after which the clock skew is computed
+        again, None to compute it only once
+        :param skew_from_date: update the clock skew with the Date header
+        of every answer of the API
+        :param retry_policy: RetryPolicy deciding which failed calls are
+        retried, None for the default one. It can be shared by several
+        wrappers so they share its retry budget
+        :param rate_limiter: RateLimiter shaping the calls, it can be shared
+        by several wrappers to limit their calls together
+        :param observers: instrumentation observers notified of each call
+        :param response_cache: ResponseCache keeping the answers of GET
+        calls, None to always download them
+        :param codec: Codec or name of the codec encoding and decoding
+        JSON, see `codec.get_codec`
+        :param transport: Transport sending the queries instead of the
+        pooled session, such as a `transport.Recorder` or a
+        `transport.Replayer`
+        :param base_url: URL of the API, such as the one of a
+        `local_server.LocalApiServer`, None for RunAbove
         """
         self.application_key = application_key
         self.application_secret = application_secret
         self.consumer_key = consumer_key
+        if base_url is not None:
+            self.base_url = base_url
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self.skew_store = skew_store
+        self.skew_max_age = skew_max_age
+        self.skew_from_date = skew_from_date
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self._observers = tuple(observers or ())
+        self.response_cache = response_cache
+        if not isinstance(codec, Codec):
+            codec = get_codec(codec)
+        self.codec = codec
+        self.transport = transport
         self._time_delta = None
+        self._time_delta_at = None
+        # Delta known to be in the skew store and the time it was stored
+        self._stored_delta = None
+        self._stored_delta_at = None
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._last_used = None
+        self._requests_sent = 0
+        self._closed_connections = 0
+
+    def _get_session(self):
+        """Get the pooled HTTP session shared by all calls.
+
+        The session is created on first use and recycled when it has
+        been idle for more than `idle_timeout` seconds.
+        """
+        with self._session_lock:
+            now = time.time()
+            if (self._session is not None and self.idle_timeout is not None
+                    and now - self._last_used > self.idle_timeout):
+                self._close_session()
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                      pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            self._last_used = now
+            self._requests_sent += 1
+            return self._session
+
+    def _get_transport(self):
+        """Get the transport sending queries, the session by default."""
+        if self.transport is not None:
+            return self.transport
+        return self._get_session()
+
+    def _opened_connections(self):
+        """Count connections opened by the pools of the current session."""
+        if self._session is None:
+            return 0
+        opened = 0
+        for adapter in set(self._session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                opened += pools[key].num_connections
+        return opened
+
+    def _close_session(self):
+        """Close the current session, keeping track of its connections."""
+        self._closed_connections += self._opened_connections()
+        self._session.close()
+        self._session = None
+
+    def close(self):
+        """Close every pooled connection.
+
+        The wrapper can still be used afterwards, a new pool is then
+        opened on the next call.
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._close_session()
+
+    def pool_stats(self):
+        """Get statistics about connection reuse.
+
+        Returns a dict with the number of requests sent, the number of
+        connections opened to send them and the number of requests that
+        reused an already opened connection.
+        """
+        with self._session_lock:
+            connections = self._closed_connections + self._opened_connections()
+            return {
+                'requests': self._requests_sent,
+                'connections': connections,
+                'reused': max(self._requests_sent - connections, 0)
+            }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def time_delta(self):
-        """Get the delta between this computer and RunAbove cluster."""
-        if self._time_delta is None:
-            try:
-                server_time = int(requests.get(self.base_url + "/time").text)
-            except ValueError:
-                raise APIError(msg='Impossible to get time from RunAbove')
-            self._time_delta = server_time - int(time.time())
+        """Get the delta between this computer and RunAbove cluster.
+
+        The delta is taken from the skew store when it knows a recent
+        enough one, otherwise it is asked to the API.
+        """
+        if self._time_delta is not None and self._is_time_delta_fresh():
+            return self._time_delta
+        if self._load_stored_time_delta():
+            return self._time_delta
+        try:
+            server_time = int(
+                self._get_transport().request(
+                    'GET', self.base_url + "/time").text)
+        except ValueError:
+            raise APIError(msg='Impossible to get time from RunAbove')
+        self._set_time_delta(server_time - int(time.time()))
         return self._time_delta
 
+    def _is_time_delta_fresh(self):
+        """Tell if the known delta is recent enough to be used."""
+        if self.skew_max_age is None or self._time_delta_at is None:
+            return True
+        return time.time() - self._time_delta_at < self.skew_max_age
+
+    def _load_stored_time_delta(self):
+        """Take the delta from the skew store if it knows a recent one.
+
+        The delta keeps the age it has in the store, so that it is not
+        used longer than `skew_max_age` in total.
+
+        :returns: True if a delta was loaded
+        """
+        if self.skew_store is None:
+            return False
+        entry = self.skew_store.get_entry(self.base_url, self.skew_max_age)
+        if entry is None:
+            return False
+        self._time_delta, self._time_delta_at = entry
+        self._stored_delta, self._stored_delta_at = entry
+        return True
+
+    def _set_time_delta(self, delta):
+        """Remember a new delta and share it through the skew store.
+
+        The store is only written when the delta changed or when the
+        stored one is older than `skew_max_age`: a FileSkewStore locks
+        and syncs its file on each write.
+        """
+        now = time.time()
+        self._time_delta = delta
+        self._time_delta_at = now
+        if self.skew_store is None:
+            return
+        if delta == self._stored_delta and (
+                self.skew_max_age is None or
+                now - self._stored_delta_at < self.skew_max_age):
+            return
+        self.skew_store.set(self.base_url, delta)
+        self._stored_delta = delta
+        self._stored_delta_at = now
+
+    def _update_time_delta_from_date(self, date):
+        """Compute the delta from the Date header of an answer.
+
+        :param date: value of the header, ignored if it can't be parsed
+        """
+        parsed = parsedate_tz(date) if date else None
+        if parsed is None:
+            return
+        self._set_time_delta(mktime_tz(parsed) - int(time.time()))
+
     def request_credentials(self, access_rules, redirect_url=None):
         """Request a Consumer Key to the API.
 
@@ -96,7 +298,8 @@ class WrapperApi:
         params = {"accessRules": access_rules}
         params["redirection"] = redirect_url
         query_data = json.dumps(params)
-        q = requests.post(
+        q = self._get_transport().request(
+            'POST',
             target_url,
             headers={
                 "X-Ra-Application": self.application_key,
@@ -109,23 +312,203 @@ class WrapperApi:
         self.consumer_key = str(res['consumerKey'])
         return res
 
-    def raw_call(self, method, path, content=None):
+    def raw_call(self, method, path, content=None, retry=None):
         """Sign a given query and return its result.
 
+        Network errors and transient errors of the API are retried as
+        decided by the retry policy, each attempt being signed again.
+
         :param method: the HTTP method of the request (get/post/put/delete)
         :param path: the url you want to request
         :param content: the object you want to send in your request
          (will be automatically serialized to JSON)
+        :param retry: force whether the query can be retried, None to let
+         the retry policy decide from the method
 
         :raises APIError: Error send by api
+        :raises NetworkError: The API could not be reached
+        """
+        observers = self._observers
+        if not observers:
+            return self._call(method, path, content, retry, None)
+        info = CallInfo(method, path)
+        for observer in observers:
+            observer.before_call(info)
+        started_at = time.time()
+        try:
+            return self._call(method, path, content, retry, info)
+        except Exception as e:
+            info.error = e
+            raise
+        finally:
+            info.total = time.time() - started_at
+            for observer in observers:
+                observer.after_call(info)
+
+    def _call(self, method, path, content, retry, info):
+        """Make a call for `raw_call`, timing it in `info` if not None.
+
+        GET calls on cacheable paths are served from the response cache
+        when it holds a fresh answer, and revalidated with a conditional
+        query when it holds a stale one. Other calls invalidate the cached
+        answers of their collection.
+        """
+        cache = self.response_cache
+        get = method.upper() == 'GET'
+        if cache is None or (get and not cache.is_cacheable(path)):
+            result = self._perform(method, path, content, retry, info)
+            return self._decode(result, info)
+        if not get:
+            try:
+                result = self._perform(method, path, content, retry, info)
+                return self._decode(result, info)
+            finally:
+                cache.invalidate(path)
+
+        key = cache.key(path, content)
+        entry = cache.get(key)
+        if entry is not None and cache.is_fresh(entry):
+            if info is not None:
+                info.status = 'cached'
+            return entry.copy()
+        headers = entry.validators() if entry is not None else None
+        result = self._perform(method, path, content, retry, info, headers)
+        if result.status_code == 304 and entry is not None:
+            if info is not None:
+                info.status = result.status_code
+            cache.revalidated(entry)
+            return entry.copy()
+        value = self._decode(result, info)
+        cache.store(key, value, result.headers)
+        return value
+
+    def _perform(self, method, path, content, retry, info, headers=None):
+        """Send a signed query, retrying it as the retry policy decides.
+
+        :param headers: extra headers added to the signed ones
+        :returns: the response of the last attempt
         """
         target_url = self.base_url + path
-        now = str(int(time.time()) + self.time_delta())
 
+        if info is not None:
+            started_at = time.time()
         body = ""
         if content:
-            body = json.dumps(content)
+            body = self.codec.encode(content)
+        if info is not None:
+            info.add_timing('encode', time.time() - started_at)
+            info.request_bytes = len(body)
+
+        policy = self.retry_policy
+        if retry is None:
+            retry = policy.is_retryable(method)
+        policy.start_call()
+        attempt = 0
+        while True:
+            attempt += 1
+            if info is not None:
+                info.attempts = attempt
+            try:
+                result = self._send(method, path, target_url, headers, body,
+                                    info)
+            except requests.exceptions.RequestException as e:
+                delay = policy.next_delay(attempt, retry, type(e).__name__)
+                if delay is None:
+                    raise NetworkError(msg=str(e))
+                self._wait_retry(delay, info)
+                continue
+            if self.skew_from_date:
+                self._update_time_delta_from_date(result.headers.get('Date'))
+            if result.status_code in policy.retry_statuses:
+                delay = policy.next_delay(attempt, retry, result.status_code,
+                                          result.headers.get('Retry-After'))
+                if delay is not None:
+                    self._wait_retry(delay, info)
+                    continue
+            return result
+
+    def _decode(self, result, info):
+        """Decode a response, timing it in `info` if not None."""
+        if info is None:
+            return self._handle_response(result.status_code, result.content)
+        info.status = result.status_code
+        info.response_bytes = len(result.content)
+        started_at = time.time()
+        try:
+            return self._handle_response(result.status_code, result.content)
+        finally:
+            info.add_timing('decode', time.time() - started_at)
+
+    @staticmethod
+    def _wait_retry(delay, info):
+        """Wait before retrying a call."""
+        time.sleep(delay)
+        if info is not None:
+            info.add_timing('retry_wait', delay)
+
+    def _send(self, method, path, target_url, headers, body, info=None):
+        """Sign and send a query, waiting for the rate limiter if any.
+
+        The query is signed once the rate limiter lets it go, so that its
+        timestamp is the time it is sent.
+
+        :param headers: extra headers added to the signed ones
+        :param info: CallInfo where the time spent is added, if any
+        """
+        rate_limiter = self.rate_limiter
+        if rate_limiter is not None:
+            waited = rate_limiter.acquire(path)
+            if info is not None:
+                info.add_timing('queue', waited)
+        try:
+            if info is not None:
+                started_at = time.time()
+            # Getting the time delta may call the API, its network errors
+            # are retried by _perform like the ones of the query
+            now = str(int(time.time()) + self.time_delta())
+            query_headers = self._signed_headers(method, target_url, body,
+                                                 now)
+            if headers:
+                query_headers.update(headers)
+            if info is not None:
+                info.add_timing('sign', time.time() - started_at)
+                started_at = time.time()
+            result = self._get_transport().request(method.upper(),
+                                                   target_url,
+                                                   headers=query_headers,
+                                                   data=body)
+            if info is not None:
+                elapsed = result.elapsed.total_seconds()
+                info.add_timing('response', elapsed)
+                info.add_timing('transfer', max(
+                    time.time() - started_at - elapsed, 0))
+            return result
+        finally:
+            if rate_limiter is not None:
+                rate_limiter.release()
+
+    def add_observer(self, observer):
+        """Register an observer notified before and after each call.
+
+        :param observer: an `instrumentation.Observer`
+        """
+        self._observers = self._observers + (observer,)
 
+    def remove_observer(self, observer):
+        """Stop notifying an observer."""
+        self._observers = tuple(o for o in self._observers
+                                if o is not observer)
+
+    def _signed_headers(self, method, target_url, body, now):
+        """Build the headers authenticating a query.
+
+        :param method: the HTTP method of the request
+        :param target_url: the full url requested
+        :param body: the serialized body of the request
+        :param now: the timestamp of the query, in RunAbove time
+
+        :raises BadParametersError: No consumer key available
+        """
         if not self.consumer_key:
             raise BadParametersError(msg='Cannot call API without'
                                          'Consumer Key')
@@ -141,33 +524,37 @@ class WrapperApi:
                 now
             ]).encode())
         sig = "$1$" + s1.hexdigest()
-        query_headers = {
+        return {
             "X-Ra-Application": self.application_key,
             "X-Ra-Timestamp": now,
             "X-Ra-Consumer": self.consumer_key,
             "X-Ra-Signature": sig,
             "Content-type": "application/json"
         }
-        req = getattr(requests, method.lower())
-        result = req(target_url, headers=query_headers, data=body)
 
-        if result.text:
+    def _handle_response(self, status_code, text):
+        """Decode the answer of the API and raise its errors.
+
+        :param status_code: HTTP status of the answer
+        :param text: body of the answer, as bytes or string
+
+        :raises APIError: Error send by api
+        """
+        if text:
             try:
-                json_result = json.loads(result.text)
+                json_result = self.codec.decode(text)
             except ValueError:
                 raise APIError('API response is not valid')
         else:
             json_result = {}
 
-        if result.status_code == 404:
+        if status_code == 404:
             raise ResourceNotFoundError(msg=json_result.get('message'))
-        if result.status_code == 400:
+        if status_code == 400:
             raise BadParametersError(msg=json_result.get('message'))
-        if result.status_code == 409:
+        if status_code == 409:
             raise ResourceAlreadyExistsError(msg=json_result.get('message'))
-        if result.status_code == 0:
-            raise NetworkError()
-        if result.status_code < 100 or result.status_code >= 300:
+        if status_code < 100 or status_code >= 300:
             raise APIError(msg=json_result.get('message'))
 
         return json_result
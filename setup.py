@@ -41,6 +41,10 @@ setuptools.setup(
     test_suite='runabove.tests',
     install_requires=[
         'python-swiftclient>=2.3.1',
-        'requests>=2.5.1'
-    ]
+        'requests>=2.5.1',
+        'futures>=3.0; python_version < "3"'
+    ],
+    extras_require={
+        'asyncio': ['aiohttp>=3.0']
+    }
 )